@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Compare chat prompt size and per-turn overhead with and without retrieval.
+
+"Before" is the old behavior: the first 20,000 characters of the document
+pasted into every system prompt. "After" loads the stored BM25 index and
+sends only the top passages for the current question. Prompt tokens are
+estimated at four characters per token; model latency and cost scale with
+them.
+
+    python benchmarks/bench_chat_context.py --turns 200
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from bench_session_compression import realistic_session, sentence
+from retrieval import DocumentIndex, estimate_tokens
+
+DOC_LIMIT = 20000
+
+
+def prompt_before(document_text, question):
+    prompt = document_text[:DOC_LIMIT]
+    if len(document_text) > DOC_LIMIT:
+        prompt += f"\n[Document continues - {len(document_text)} total characters]"
+    return prompt
+
+
+def prompt_after(serialized_index, question):
+    index = DocumentIndex.from_json(serialized_index)
+    return "\n\n".join(passage for _, passage in index.search(question))
+
+
+def run(build_prompt, context, questions):
+    sizes, times = [], []
+    for question in questions:
+        start = time.perf_counter()
+        prompt = build_prompt(context, question)
+        times.append(time.perf_counter() - start)
+        sizes.append(estimate_tokens(prompt))
+    return statistics.mean(sizes), statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    document_text = realistic_session(rng)['document_text']
+    questions = [sentence(rng, 10) + '?' for _ in range(args.turns)]
+
+    start = time.perf_counter()
+    serialized = DocumentIndex.build(document_text).to_json()
+    build_ms = (time.perf_counter() - start) * 1000
+
+    before_tokens, before_time = run(prompt_before, document_text, questions)
+    after_tokens, after_time = run(prompt_after, serialized, questions)
+
+    print(f"document: {len(document_text)} chars, index {len(serialized) / 1024:.0f} KB, built once in {build_ms:.1f} ms")
+    print(f"{'':>8} {'doc tokens/turn':>16} {'prep ms/turn':>13}")
+    print(f"{'before':>8} {before_tokens:>16.0f} {before_time * 1000:>13.3f}")
+    print(f"{'after':>8} {after_tokens:>16.0f} {after_time * 1000:>13.3f}")
+    print(f"prompt tokens per turn reduced {before_tokens / after_tokens:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
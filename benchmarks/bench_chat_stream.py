@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare time to first byte of /api/chat and the streaming /api/chat/stream.
+
+Starts the local mock LLM server with a fixed "thinking" delay and per-token
+delay, points the app at it through OPENAI_BASE_URL, and issues chat turns
+through Flask's test client. The blocking endpoint sends nothing until the
+whole completion is in; the streaming endpoint sends the first delta as soon
+as the model produces it.
+
+    python benchmarks/bench_chat_stream.py --turns 10 --think 1.5 --token-delay 0.02
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from mock_llm_server import MockLLMServer
+
+
+def measure(client, path, message):
+    start = time.perf_counter()
+    response = client.post(path, json={'message': message}, buffered=False)
+    chunks = iter(response.response)
+    first = next(chunks, b'')
+    ttfb = time.perf_counter() - start
+    for _ in chunks:
+        pass
+    response.close()
+    return ttfb, time.perf_counter() - start, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, default=10)
+    parser.add_argument('--think', type=float, default=1.5, help='mock model delay before the first token')
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = MockLLMServer(think=args.think, token_delay=args.token_delay).start()
+    os.environ['OPENAI_BASE_URL'] = server.base_url
+    os.environ.setdefault('OPENAI_API_KEY', 'mock')
+    os.environ['LLM_CACHE_MAX_BYTES'] = '0'
+    os.environ.setdefault('SESSION_FILE_DIR', tempfile.mkdtemp(prefix='bench-chat-stream-'))
+
+    from app import app
+
+    print(f"mock model: {args.think:.2f}s to first token, {args.token_delay * 1000:.0f} ms/token")
+    print(f"{'endpoint':>18} {'TTFB p50 s':>11} {'TTFB max s':>11} {'total p50 s':>12}")
+    try:
+        for path in ('/api/chat', '/api/chat/stream'):
+            client = app.test_client()
+            results = [measure(client, path, f"Turn {turn}: led a boarding team of six.")
+                       for turn in range(args.turns)]
+            ttfbs = [ttfb for ttfb, _, _ in results]
+            totals = [total for _, total, _ in results]
+            print(f"{path:>18} {statistics.median(ttfbs):>11.3f} {max(ttfbs):>11.3f} "
+                  f"{statistics.median(totals):>12.3f}")
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
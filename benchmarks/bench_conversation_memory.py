@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Compare chat prompt size per turn with full history and with conversation memory.
+
+Replays an interview turn by turn. "Before" sends every earlier message;
+"after" uses ConversationMemory: a running summary (stubbed at a typical
+300 words) plus the recent messages, within the prompt token budget. The
+background summary refresh is run inline so each turn sees it. Prompt
+tokens are estimated at four characters per token; model latency grows with
+them.
+
+    python benchmarks/bench_conversation_memory.py --turns 20 80 160 320
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from bench_session_compression import sentence
+from conversation_memory import ConversationMemory
+from retrieval import estimate_tokens
+from session_manager import FileSessionManager
+
+SYSTEM = "You are a helpful assistant helping to document Coast Guard achievements for award recommendations."
+
+
+def prompt_tokens(openai_messages):
+    return sum(estimate_tokens(msg['content']) for msg in openai_messages)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--turns', type=int, nargs='+', default=[20, 80, 160, 320])
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    summary = sentence(rng, 300)
+    manager = FileSessionManager(tempfile.mkdtemp(prefix='cgaward-bench-memory-'))
+    memory = ConversationMemory(manager, lambda previous, messages: summary)
+
+    print(f"{'turns':>6} {'before tokens':>14} {'after tokens':>13} {'after prep ms':>14}")
+    for turns in args.turns:
+        session_id = manager.create_session()
+        messages = []
+        before = after = 0
+        prep_times = []
+        for _ in range(turns):
+            messages.append({"role": "user", "content": sentence(rng, 40)})
+            before = estimate_tokens(SYSTEM) + sum(estimate_tokens(msg['content']) for msg in messages)
+
+            start = time.perf_counter()
+            context = memory.build_context(session_id, SYSTEM, messages)
+            prep_times.append(time.perf_counter() - start)
+            after = prompt_tokens(context)
+
+            messages.append({"role": "assistant", "content": sentence(rng, 30)})
+            _, covered = memory.summary_for(session_id, messages)
+            if len(messages) - covered >= memory.verbatim_messages + memory.summary_batch:
+                memory._refresh(session_id, messages)
+        print(f"{turns:>6} {before:>14} {after:>13} {statistics.median(prep_times) * 1000:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Compare python-docx and streaming DOCX text extraction on table-heavy forms.
+
+Generates evaluation-form style documents (a few narrative paragraphs and
+many multi-column tables) and reports latency and tracemalloc peak memory of
+the legacy python-docx extractor and DocumentProcessor.extract_text_from_docx.
+The python-docx column is skipped when the package is not installed.
+
+    python benchmarks/bench_docx_extraction.py --tables 50 200 800
+"""
+
+import argparse
+import io
+import random
+import sys
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from bench_session_compression import sentence
+from docx_text import W_NS
+from document_processor import DocumentProcessor, MAX_EXTRACTED_LENGTH
+
+try:
+    from docx import Document
+except ImportError:
+    Document = None
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+RELS = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="word/document.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+
+
+def paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def evaluation_form(tables, rows=12, columns=4, seed=11):
+    """Build a table-heavy DOCX in memory."""
+    rng = random.Random(seed)
+    body = [paragraph(sentence(rng, 30)) for _ in range(5)]
+    for _ in range(tables):
+        body.append(paragraph(sentence(rng, 6)))
+        body.append('<w:tbl>' + ''.join(
+            '<w:tr>' + ''.join(f'<w:tc>{paragraph(sentence(rng, 8))}</w:tc>' for _ in range(columns)) + '</w:tr>'
+            for _ in range(rows)) + '</w:tbl>')
+    document = (f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{W_NS[1:-1]}"><w:body>'
+                + ''.join(body) + '<w:sectPr/></w:body></w:document>')
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', RELS)
+        archive.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+def legacy_extract(source):
+    """The python-docx implementation: paragraphs first, then every table cell."""
+    doc = Document(source)
+    text = ""
+    for paragraph_ in doc.paragraphs:
+        if paragraph_.text.strip():
+            text += paragraph_.text + "\n"
+    for table in doc.tables:
+        for row in table.rows:
+            for cell in row.cells:
+                if cell.text.strip():
+                    text += cell.text + " "
+            text += "\n"
+    text = text.strip()
+    if len(text) > MAX_EXTRACTED_LENGTH:
+        text = text[:MAX_EXTRACTED_LENGTH] + "... [Content truncated]"
+    return text
+
+
+def measure(func, data, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(io.BytesIO(data), **kwargs)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--tables', type=int, nargs='+', default=[50, 200, 800])
+    args = parser.parse_args()
+
+    processor = DocumentProcessor()
+    print(f"{'tables':>7} {'docx KB':>8} {'python-docx s':>14} {'MB':>6} "
+          f"{'stream s':>9} {'MB':>6} {'stream (no budget) s':>21} {'MB':>6}")
+    for tables in args.tables:
+        data = evaluation_form(tables)
+        if Document is not None:
+            legacy_time, legacy_peak = measure(legacy_extract, data)
+            legacy = f"{legacy_time:>14.3f} {legacy_peak / 1e6:>6.1f}"
+        else:
+            legacy = f"{'n/a':>14} {'':>6}"
+        budget_time, budget_peak = measure(processor.extract_text_from_docx, data)
+        full_time, full_peak = measure(processor.extract_text_from_docx, data, max_length=10 ** 9)
+        print(f"{tables:>7} {len(data) / 1024:>8.0f} {legacy} {budget_time:>9.3f} {budget_peak / 1e6:>6.1f} "
+              f"{full_time:>21.3f} {full_peak / 1e6:>6.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare prompt size of full and incremental achievement analysis as sessions grow.
+
+Simulates an interview where a recommendation is requested after every
+--every messages. The full strategy sends the whole conversation each time;
+the incremental one sends only the messages since the previous analysis plus
+a summary of the data extracted so far (one achievement per user message
+here). Prompt tokens are estimated at four characters per token, and model
+latency is modeled from them with --prefill-tps plus a fixed --base-latency.
+
+    python benchmarks/bench_incremental_analysis.py --messages 20 80 160 320 --every 10
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from bench_session_compression import sentence
+from achievement_extraction import build_analysis_prompt, merge_achievement_data
+from retrieval import estimate_tokens
+
+AWARDEE = {"name": "Jane Doe", "rank": "BM1", "unit": "Station Boston"}
+
+
+def conversation(rng, length):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": sentence(rng, 40 if i % 2 == 0 else 25)}
+            for i in range(length)]
+
+
+def simulate(messages, every, incremental):
+    """Token counts and prompt build times of each analysis over the session."""
+    tokens, build_times = [], []
+    data, analyzed = None, 0
+    for end in range(every, len(messages) + 1, every):
+        start = time.perf_counter()
+        if incremental and data is not None:
+            prompt, inputs = build_analysis_prompt(messages[:end], AWARDEE, previous=data, start=analyzed)
+        else:
+            prompt, inputs = build_analysis_prompt(messages[:end], AWARDEE)
+        build_times.append(time.perf_counter() - start)
+        tokens.append(estimate_tokens(prompt))
+
+        # Stand-in for the model: one achievement per user message analyzed
+        delta = {'achievements': [text[:120] for text in inputs], 'scope': 'Sector'}
+        data = merge_achievement_data(data or {}, delta) if incremental else merge_achievement_data({}, delta)
+        analyzed = end
+    return tokens, build_times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, nargs='+', default=[20, 80, 160, 320])
+    parser.add_argument('--every', type=int, default=10, help='messages between analyses')
+    parser.add_argument('--prefill-tps', type=float, default=2000, help='modeled prompt tokens processed per second')
+    parser.add_argument('--base-latency', type=float, default=8.0, help='modeled seconds per call besides the prompt')
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    print(f"{'messages':>9} {'full last':>10} {'incr last':>10} {'full total':>11} {'incr total':>11} "
+          f"{'full s':>7} {'incr s':>7} {'build ms':>9}")
+    for length in args.messages:
+        messages = conversation(rng, length)
+        full_tokens, _ = simulate(messages, args.every, incremental=False)
+        incr_tokens, build_times = simulate(messages, args.every, incremental=True)
+        latency = lambda tokens: args.base_latency + tokens / args.prefill_tps
+        print(f"{length:>9} {full_tokens[-1]:>10} {incr_tokens[-1]:>10} {sum(full_tokens):>11} "
+              f"{sum(incr_tokens):>11} {latency(full_tokens[-1]):>7.1f} {latency(incr_tokens[-1]):>7.1f} "
+              f"{max(build_times) * 1000:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Compare stdlib json and the fast backend on real payload shapes.
+
+Payloads: a full session file, the GET /api/session response (message
+history) and the JSON export (indent=2). Only decoding uses the fast
+backend; encoding stays on the stdlib so output is byte-identical, which the
+benchmark checks.
+
+    python benchmarks/bench_json_codec.py --repeat 200
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+os.environ.setdefault('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'cgaward-bench-sessions'))
+
+import json_codec
+from bench_session_compression import realistic_session
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    if json_codec.orjson is None:
+        print("orjson is not installed; both loads columns would measure the stdlib")
+        return
+
+    data = realistic_session(random.Random(42))
+    payloads = {
+        'session file': ({'created_at': 1.0, 'last_accessed': 2.0, 'data': data}, {}),
+        '/api/session': ({'messages': data['messages'], 'recommendation': data['recommendation']}, {'sort_keys': True}),
+        'export (indent=2)': (data['export_data'], {'indent': 2, 'default': str}),
+    }
+
+    # Encoding is stdlib either way, so dumps is one column, for scale
+    print(f"{'payload':>18} {'KB':>7} {'dumps':>11} {'json loads':>11} {'fast loads':>11}  (ms)")
+    for name, (obj, options) in payloads.items():
+        text = json.dumps(obj, **options)
+        assert json_codec.dumps(obj, **options) == text
+        assert json_codec.loads(text) == json.loads(text)
+        print(f"{name:>18} {len(text) / 1024:>7.1f} "
+              f"{timed(lambda: json_codec.dumps(obj, **options), args.repeat):>11.3f} "
+              f"{timed(lambda: json.loads(text), args.repeat):>11.3f} "
+              f"{timed(lambda: json_codec.loads(text), args.repeat):>11.3f}")
+
+
+if __name__ == '__main__':
+    main()
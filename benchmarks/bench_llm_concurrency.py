@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Compare LLM call throughput of the thread-per-call and async client paths.
+
+Starts the local mock LLM server and simulates concurrent sessions, each
+making a few sequential calls. The sync path runs every session on a thread
+pool sized like the gunicorn threads that would serve them, with a
+connection per thread. The async path runs all sessions as coroutines on the
+shared event loop, bounded by OPENAI_MAX_CONCURRENCY over one connection
+pool.
+
+    python benchmarks/bench_llm_concurrency.py --sessions 50 --calls 3 --think 0.5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from mock_llm_server import MockLLMServer
+
+
+def session_messages(session, call):
+    return [{"role": "system", "content": "You are a Coast Guard awards assistant."},
+            {"role": "user", "content": f"Session {session}, turn {call}: led a boarding team of six."}]
+
+
+def run_sync(client, sessions, calls, threads):
+    latencies = []
+
+    def session(index):
+        for call in range(calls):
+            start = time.perf_counter()
+            result = client._complete(client._build_request(session_messages(index, call)), "benchmark")
+            assert "error" not in result, result
+            latencies.append(time.perf_counter() - start)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(session, range(sessions)))
+    return latencies
+
+
+def run_async(client, sessions, calls):
+    latencies = []
+
+    async def session(index):
+        for call in range(calls):
+            start = time.perf_counter()
+            result = await client.aio.complete(client._build_request(session_messages(index, call)), "benchmark")
+            assert "error" not in result, result
+            latencies.append(time.perf_counter() - start)
+
+    client.aio.gather(*(session(index) for index in range(sessions)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--calls', type=int, default=3, help='sequential calls per session')
+    parser.add_argument('--threads', type=int, nargs='+', default=[8, 50], help='sync thread pool sizes')
+    parser.add_argument('--think', type=float, default=0.5, help='mock model latency per call')
+    args = parser.parse_args()
+
+    server = MockLLMServer(think=args.think, token_delay=0).start()
+    os.environ['OPENAI_BASE_URL'] = server.base_url
+    os.environ.setdefault('OPENAI_API_KEY', 'mock')
+    os.environ['LLM_CACHE_MAX_BYTES'] = '0'
+    os.environ['OPENAI_RPM_LIMIT'] = os.environ['OPENAI_TPM_LIMIT'] = '0'  # measure concurrency only
+
+    from async_openai_client import MAX_CONCURRENCY
+    from openai_client import OpenAIClient
+    client = OpenAIClient()
+
+    total = args.sessions * args.calls
+    print(f"{args.sessions} sessions x {args.calls} calls, mock latency {args.think:.2f}s")
+    print(f"{'path':>22} {'wall s':>8} {'calls/s':>8} {'p50 s':>7} {'p95 s':>7}")
+
+    def report(label, func):
+        start = time.perf_counter()
+        latencies = sorted(func())
+        wall = time.perf_counter() - start
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"{label:>22} {wall:>8.2f} {total / wall:>8.1f} {statistics.median(latencies):>7.2f} {p95:>7.2f}")
+
+    try:
+        for threads in args.threads:
+            report(f"sync, {threads} threads", lambda: run_sync(client, args.sessions, args.calls, threads))
+        report(f"async, limit {MAX_CONCURRENCY}", lambda: run_async(client, args.sessions, args.calls))
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Load test the chat, recommend, finalize and export flow under gunicorn.
+
+For each gunicorn configuration (extra command-line arguments such as
+``"-w 4 --threads 8"``) the app is started against the local mock LLM server,
+without an OpenAI key, and virtual users each run the whole flow: several
+chat turns, a recommendation, a finalized citation and an export (for docx,
+including the download). Every user has its own session cookie. The mock's
+latency distribution and injected 429s and timeouts are configurable, and
+``--fixtures`` replays recorded replies. Reports completed flows and requests
+per second and p50/p95/p99 latency of every step. A 4xx answer means the
+flow itself is wrong, so it stops the run instead of counting as an error.
+``--app-url`` targets an already running app instead of starting gunicorn.
+
+    python benchmarks/bench_load_test.py --configs "-w 2 --threads 4" "-w 4 --threads 8" --users 20
+"""
+
+import argparse
+import http.cookiejar
+import json
+import os
+import shlex
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / 'src'))
+
+from mock_llm_server import LATENCY_DISTRIBUTIONS, MockLLMServer
+
+STEPS = ('chat', 'recommend', 'finalize', 'export')
+AWARDEE = {'name': 'Jordan Smith', 'rank': 'BM2', 'unit': 'Station Example'}
+TURNS = [
+    "I led a boarding team of six through 14 fisheries inspections this year.",
+    "I trained three new boarding officers, all qualified within four months.",
+    "During a night SAR case I coordinated two small boats and recovered 3 people from the water.",
+    "I rewrote the station's inspection checklist, cutting boarding time by 25 percent.",
+    "I volunteered 120 hours on weekends to repair the station's small boat trailer.",
+    "I coordinated with the state marine police on four joint patrols.",
+]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class FlowError(RuntimeError):
+    """The app rejected a step of the flow as a bad request."""
+
+
+def user_flow(base_url: str, turns: int, export_format: str, timeout: float) -> Dict[str, List]:
+    """
+    Run the whole flow once with a fresh session; returns per-step latencies and errors.
+
+    Raises FlowError on a 4xx answer.
+    """
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    timings: Dict[str, List[float]] = {step: [] for step in STEPS}
+    errors: List[str] = []
+
+    def call(step, path, payload=None):
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        request = urllib.request.Request(base_url + path, data=data, headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with opener.open(request, timeout=timeout) as response:
+                body = response.read()
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500:
+                raise FlowError(f"{step}: {path} answered {e.code}: {e.read().decode('utf-8', 'replace')}") from e
+            errors.append(f"{step}: {e}")
+            return None
+        except (urllib.error.URLError, OSError) as e:
+            errors.append(f"{step}: {e}")
+            return None
+        finally:
+            timings[step].append(time.perf_counter() - start)
+        if response.headers.get_content_type() != 'application/json':
+            return {}
+        result = json.loads(body)
+        if result.get('success') is False:
+            errors.append(f"{step}: {result.get('error')}")
+            return None
+        return result
+
+    for turn in range(turns):
+        call('chat', '/api/chat', {'message': TURNS[turn % len(TURNS)]})
+    recommendation = call('recommend', '/api/recommend', {'awardee_info': AWARDEE})
+    if recommendation is None:
+        return {'timings': timings, 'errors': errors, 'completed': False}
+    # Like the UI, finalize the award that was recommended
+    if call('finalize', '/api/finalize', {'award': recommendation['award'], 'awardee_info': AWARDEE}) is None:
+        return {'timings': timings, 'errors': errors, 'completed': False}
+    exported = call('export', '/api/export', {'format': export_format, 'awardee_info': AWARDEE})
+    if exported and exported.get('download_url'):
+        exported = call('export', exported['download_url'])
+    return {'timings': timings, 'errors': errors, 'completed': exported is not None}
+
+
+def start_app(config: str, mock_url: str, workdir: str, client_timeout: float):
+    """Start gunicorn with config's extra arguments; returns (process, base_url, log path)."""
+    port = free_port()
+    env = dict(os.environ)
+    env.pop('OPENAI_API_KEY', None)  # the local mock needs no key
+    env.update({
+        'OPENAI_BASE_URL': mock_url,
+        'OPENAI_TIMEOUT': str(client_timeout),
+        'FLASK_ENV': 'development',
+        'LOG_LEVEL': 'WARNING',
+        'LOG_FILE': os.path.join(workdir, 'app.log'),
+        'SESSION_FILE_DIR': os.path.join(workdir, 'sessions'),
+        'LLM_CACHE_DIR': os.path.join(workdir, 'llm'),
+        'DOCUMENT_CACHE_DIR': os.path.join(workdir, 'documents'),
+        'OPENAI_RATE_LIMIT_FILE': os.path.join(workdir, 'openai_rate_limit.json'),
+    })
+    log_path = os.path.join(workdir, 'gunicorn.log')
+    command = [sys.executable, '-m', 'gunicorn', '--chdir', str(ROOT / 'src'), 'wsgi:application',
+               '-c', str(ROOT / 'gunicorn_config.py'), '--bind', f'127.0.0.1:{port}'] + shlex.split(config)
+    with open(log_path, 'w') as log:
+        process = subprocess.Popen(command, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {process.returncode}; see {log_path}")
+        try:
+            urllib.request.urlopen(base_url + '/', timeout=2).close()
+            return process, base_url, log_path
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"gunicorn did not start within 60s; see {log_path}")
+
+
+def run(label: str, base_url: str, args) -> Dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        futures = [pool.submit(user_flow, base_url, args.turns, args.export_format, args.request_timeout)
+                   for _ in range(args.users * args.iterations)]
+        outcomes = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+
+    timings = {step: [t for outcome in outcomes for t in outcome['timings'][step]] for step in STEPS}
+    requests = sum(len(values) for values in timings.values())
+    completed = sum(outcome['completed'] for outcome in outcomes)
+    errors = [error for outcome in outcomes for error in outcome['errors']]
+
+    print(f"\n{label}: {completed}/{len(outcomes)} flows in {wall:.1f}s, "
+          f"{completed / wall:.2f} flows/s, {requests / wall:.1f} req/s, {len(errors)} errors")
+    print(f"  {'step':>10} {'count':>6} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7}")
+    for step in STEPS:
+        values = timings[step]
+        print(f"  {step:>10} {len(values):>6} {percentile(values, 0.5):>7.2f} "
+              f"{percentile(values, 0.95):>7.2f} {percentile(values, 0.99):>7.2f}")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+    return {'completed': completed, 'wall': wall, 'errors': len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--configs', nargs='+', default=['-w 2 --threads 4', '-w 4 --threads 8'],
+                        help='extra gunicorn arguments, one string per configuration')
+    parser.add_argument('--app-url', help='load test a running app instead of starting gunicorn')
+    parser.add_argument('--users', type=int, default=20, help='concurrent virtual users')
+    parser.add_argument('--iterations', type=int, default=2, help='flows per user')
+    parser.add_argument('--turns', type=int, default=4, help='chat turns per flow')
+    parser.add_argument('--export-format', choices=['docx', 'json', 'txt'], default='docx')
+    parser.add_argument('--request-timeout', type=float, default=300.0, help='client timeout per app request')
+    parser.add_argument('--client-timeout', type=float, default=30.0, help="app's OpenAI request timeout")
+    parser.add_argument('--think', type=float, default=0.5, help='median mock model latency')
+    parser.add_argument('--latency', choices=LATENCY_DISTRIBUTIONS, default='lognormal')
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--token-delay', type=float, default=0.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of LLM calls answered 429')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of LLM calls left hanging')
+    parser.add_argument('--fixtures', help='directory of recorded mock replies')
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{args.users} users x {args.iterations} flows ({args.turns} chat turns each), "
+          f"mock latency {args.latency} median {args.think:.2f}s, "
+          f"{args.rate_limit_rate:.0%} 429s, {args.timeout_rate:.0%} timeouts")
+
+    def mock():
+        return MockLLMServer(think=args.think, token_delay=args.token_delay, latency=args.latency,
+                             jitter=args.jitter, fixtures=args.fixtures, rate_limit_rate=args.rate_limit_rate,
+                             timeout_rate=args.timeout_rate, hang=args.client_timeout + 5,
+                             seed=args.seed).start()
+
+    if args.app_url:
+        run(args.app_url, args.app_url.rstrip('/'), args)
+        return
+
+    for config in args.configs:
+        server = mock()
+        workdir = tempfile.mkdtemp(prefix='cgaward-load-')
+        process, base_url, log_path = start_app(config, server.base_url, workdir, args.client_timeout)
+        try:
+            run(f"gunicorn {config}", base_url, args)
+            print(f"  mock: {json.dumps(server.stats())}")
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            server.stop()
+            print(f"  gunicorn log: {log_path}")
+
+
+if __name__ == '__main__':
+    main()
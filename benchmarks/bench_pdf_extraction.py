@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare full-document and budgeted PDF text extraction on large PDFs.
+
+The PDFs are generated on the fly (plain text pages with a standard font),
+so no sample documents are needed. For each size the legacy approach (parse
+every page, concatenate, then truncate) is timed against
+DocumentProcessor.extract_text_from_pdf, which stops at the character budget.
+
+    python benchmarks/bench_pdf_extraction.py --pages 100 300 600
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import PyPDF2
+
+from document_processor import DocumentProcessor, MAX_EXTRACTED_LENGTH
+from bench_session_compression import sentence
+
+
+def write_pdf(path, pages, lines_per_page=45, seed=7):
+    """Write a text-only PDF with the given number of pages."""
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page ids are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    page_ids = []
+    for _ in range(pages):
+        lines = [sentence(rng, 12).replace('(', '').replace(')', '') for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 12 TL 40 760 Td " + " ".join(f"({line}) '" for line in lines) + " ET"
+        stream = stream.encode('latin-1')
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id)
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, 'wb') as f:
+        f.write(out)
+
+
+def legacy_extract(file_path):
+    """The pre-budget implementation: every page, string concatenation, then truncate."""
+    text = ""
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        for page_num in range(len(pdf_reader.pages)):
+            text += pdf_reader.pages[page_num].extract_text() + "\n"
+    text = text.strip()
+    if len(text) > MAX_EXTRACTED_LENGTH:
+        text = text[:MAX_EXTRACTED_LENGTH] + "... [Content truncated]"
+    return text
+
+
+def measure(func, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    text = func(path)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return text, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 300, 600])
+    args = parser.parse_args()
+
+    processor = DocumentProcessor()
+    print(f"{'pages':>6} {'legacy s':>9} {'legacy MB':>10} {'budget s':>9} {'budget MB':>10} {'speedup':>8}")
+    for pages in args.pages:
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        try:
+            write_pdf(path, pages)
+            legacy_text, legacy_time, legacy_peak = measure(legacy_extract, path)
+            text, budget_time, budget_peak = measure(processor.extract_text_from_pdf, path)
+            assert text[:1000] == legacy_text[:1000]
+            print(f"{pages:>6} {legacy_time:>9.2f} {legacy_peak / 1e6:>10.1f} "
+                  f"{budget_time:>9.2f} {budget_peak / 1e6:>10.1f} {legacy_time / budget_time:>7.1f}x")
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
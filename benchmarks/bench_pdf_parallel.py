@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Measure the speedup of process-pool PDF extraction over a single process.
+
+Uses the generated PDFs from bench_pdf_extraction. By default the character
+budget is lifted so every page is extracted; pass --max-length 50000 to see
+the effect together with the early stop.
+
+    python benchmarks/bench_pdf_parallel.py --pages 100 200 400 --workers 4
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import document_processor
+from bench_pdf_extraction import write_pdf
+
+
+def timed(processor, path, max_length, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text = processor.extract_text_from_pdf(path, max_length=max_length)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return text, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 200, 400])
+    parser.add_argument('--workers', type=int, default=document_processor.PDF_EXTRACTION_WORKERS)
+    parser.add_argument('--max-length', type=int, default=10 ** 9)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    document_processor.PDF_EXTRACTION_WORKERS = args.workers
+    processor = document_processor.DocumentProcessor()
+    # Start the pool before timing, as a long-running worker would have it
+    document_processor.get_extraction_pool()
+
+    print(f"workers: {args.workers}")
+    print(f"{'pages':>6} {'serial s':>9} {'pool s':>8} {'speedup':>8}")
+    for pages in args.pages:
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        os.close(fd)
+        try:
+            write_pdf(path, pages)
+
+            document_processor.PDF_PARALLEL_MIN_PAGES = pages + 1
+            serial_text, serial = timed(processor, path, args.max_length, args.repeat)
+            document_processor.PDF_PARALLEL_MIN_PAGES = 1
+            pool_text, pooled = timed(processor, path, args.max_length, args.repeat)
+
+            assert pool_text == serial_text
+            print(f"{pages:>6} {serial:>9.2f} {pooled:>8.2f} {serial / pooled:>7.1f}x")
+        finally:
+            os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
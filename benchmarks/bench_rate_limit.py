@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Load test OpenAI calls from several workers against a rate-limited mock API.
+
+Starts the mock LLM server with a request quota and runs worker processes,
+like gunicorn workers, that each issue many concurrent calls through
+OpenAIClient's async path. "baseline" disables the shared rate limiter and
+adaptive concurrency, so every worker retries 429s on its own exponential
+backoff; "limited" shares one request budget between the workers through
+the limiter's state file and honors Retry-After. The quota period is
+shortened (``--period``) on both sides so the run takes seconds, not
+minutes.
+
+    python benchmarks/bench_rate_limit.py --workers 4 --calls 40 --rpm 30 --period 10
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from mock_llm_server import MockLLMServer
+
+
+def worker(env, calls, results):
+    os.environ.update(env)
+    from openai_client import OpenAIClient
+    client = OpenAIClient()
+    latencies = []
+    failures = 0
+
+    async def call(index):
+        nonlocal failures
+        messages = [{"role": "system", "content": "You are a Coast Guard awards assistant."},
+                    {"role": "user", "content": f"Worker {os.getpid()}, call {index}: led a boarding team."}]
+        start = time.perf_counter()
+        result = await client.aio.complete(client._build_request(messages), "load test")
+        if "error" in result:
+            failures += 1
+        else:
+            latencies.append(time.perf_counter() - start)
+
+    client.aio.gather(*(call(index) for index in range(calls)))
+    results.put((latencies, failures, client.aio.stats()['retries']))
+
+
+def run(mode, args):
+    server = MockLLMServer(think=args.think, token_delay=0, rpm=args.rpm, quota_period=args.period).start()
+    limited = mode == 'limited'
+    env = {
+        'OPENAI_BASE_URL': server.base_url,
+        'OPENAI_API_KEY': os.environ.get('OPENAI_API_KEY', 'mock'),
+        'LLM_CACHE_MAX_BYTES': '0',
+        'OPENAI_RPM_LIMIT': str(args.rpm if limited else 0),
+        'OPENAI_TPM_LIMIT': '0',
+        'OPENAI_RATE_LIMIT_PERIOD': str(args.period),
+        'OPENAI_RATE_LIMIT_FILE': os.path.join(tempfile.mkdtemp(prefix='cgaward-bench-ratelimit-'), 'limits.json'),
+        'OPENAI_ADAPTIVE_CONCURRENCY': 'true' if limited else 'false',
+    }
+
+    context = multiprocessing.get_context('spawn')  # fresh imports read the mode's environment
+    results = context.Queue()
+    start = time.perf_counter()
+    processes = [context.Process(target=worker, args=(env, args.calls, results)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - start
+    server.stop()
+
+    latencies = sorted(latency for outcome in outcomes for latency in outcome[0])
+    failures = sum(outcome[1] for outcome in outcomes)
+    retries = sum(outcome[2] for outcome in outcomes)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else float('nan')
+    median = statistics.median(latencies) if latencies else float('nan')
+    print(f"{mode:>9} {wall:>7.1f} {len(latencies):>6} {failures:>6} {server.rate_limited:>6} "
+          f"{retries:>8} {median:>7.2f} {p95:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--calls', type=int, default=40, help='concurrent calls per worker')
+    parser.add_argument('--rpm', type=int, default=30, help='mock request quota per period')
+    parser.add_argument('--period', type=float, default=10.0, help='quota period in seconds')
+    parser.add_argument('--think', type=float, default=0.3, help='mock model latency per call')
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers x {args.calls} calls, quota {args.rpm} requests per {args.period:.0f}s")
+    print(f"{'mode':>9} {'wall s':>7} {'ok':>6} {'failed':>6} {'429s':>6} {'retries':>8} {'p50 s':>7} {'p95 s':>7}")
+    for mode in ('baseline', 'limited'):
+        run(mode, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark session throughput when several app processes share one store.
+
+Each process simulates requests that read a session and write one key back,
+the pattern used by every API endpoint. The Redis backend runs against the
+local stand-in server unless --url points at a real one.
+
+    python benchmarks/bench_session_backend.py --processes 1 2 4 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+os.environ.setdefault('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'cgaward-bench-sessions'))
+
+from mock_resp_server import MockRespServer
+from session_manager import FileSessionManager, RedisSessionManager
+
+MESSAGE = {"role": "user", "content": "Led a 12-person boarding team through 40 law enforcement boardings. " * 5}
+
+
+def build_manager(backend: str, target: str):
+    if backend == 'redis':
+        return RedisSessionManager(target, pool_size=2)
+    return FileSessionManager(target)
+
+
+def worker(backend, target, session_ids, requests, results):
+    manager = build_manager(backend, target)
+    rng = random.Random(os.getpid())
+    start = time.perf_counter()
+    for i in range(requests):
+        session_id = rng.choice(session_ids)
+        data = manager.get_session_data(session_id) or {}
+        messages = data.get('messages', [])[-10:]
+        messages.append(MESSAGE)
+        manager.update_session_data(session_id, {'messages': messages, 'counter': i})
+    results.put(time.perf_counter() - start)
+
+
+def run(backend, target, processes, sessions, requests):
+    manager = build_manager(backend, target)
+    session_ids = [manager.create_session() for _ in range(sessions)]
+
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker, args=(backend, target, session_ids, requests, results))
+             for _ in range(processes)]
+    start = time.perf_counter()
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    wall = time.perf_counter() - start
+
+    for session_id in session_ids:
+        manager.delete_session(session_id)
+
+    total = processes * requests
+    return total / wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--sessions', type=int, default=50)
+    parser.add_argument('--requests', type=int, default=500, help='requests per process')
+    parser.add_argument('--url', help='Redis URL to benchmark instead of the stand-in server')
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server = MockRespServer().start()
+        url = server.url
+
+    session_dir = tempfile.mkdtemp(prefix='cgaward-bench-')
+    print(f"{'processes':>10} {'file req/s':>12} {'redis req/s':>12}")
+    try:
+        for n in args.processes:
+            file_rate = run('file', session_dir, n, args.sessions, args.requests)
+            redis_rate = run('redis', url, n, args.sessions, args.requests)
+            print(f"{n:>10} {file_rate:>12.0f} {redis_rate:>12.0f}")
+    finally:
+        if server:
+            server.stop()
+
+
+if __name__ == '__main__':
+    main()
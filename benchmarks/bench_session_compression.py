@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Report disk footprint and read/write latency of file sessions per codec.
+
+The session is shaped like a real one after upload, recommendation and
+export: extracted document text, LLM analysis, message history, the
+recommendation and export_data that repeats the messages.
+
+    python benchmarks/bench_session_compression.py --sessions 200
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+os.environ.setdefault('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'cgaward-bench-sessions'))
+
+from session_compression import CODECS, ValueCompressor
+from session_manager import FileSessionManager
+
+WORDS = (
+    "coordinated led supervised qualified trained boarding search rescue cutter station sector district "
+    "crew personnel readiness inspection maintenance engineering operations law enforcement patrol "
+    "vessel small boat coxswain response mission hours cases lives saved dollars percent improvement "
+    "program initiative developed implemented managed planning logistics budget safety compliance "
+    "the a of and to in for with by during over across while as on at from"
+).split()
+
+
+def sentence(rng, words=18):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def realistic_session(rng):
+    document_text = ' '.join(sentence(rng) for _ in range(400))[:50000]
+    analysis = '\n'.join(f"- {sentence(rng, 25)}" for _ in range(40))
+    messages = []
+    for i in range(30):
+        messages.append({"role": "user", "content": sentence(rng, 40), "timestamp": f"2025-01-01T10:{i:02d}:00"})
+        messages.append({"role": "assistant", "content": sentence(rng, 30), "timestamp": f"2025-01-01T10:{i:02d}:30"})
+    messages.insert(0, {"role": "user", "content": f"Document content and analysis: {analysis}"})
+    achievement_data = {key: [sentence(rng, 15) for _ in range(8)]
+                        for key in ('achievements', 'impacts', 'leadership_details', 'innovation_details', 'challenges')}
+    achievement_data.update(scope="District", time_period="June 2023 to June 2025", justification=sentence(rng, 60))
+    recommendation = {
+        "award": "Coast Guard Commendation Medal",
+        "explanation": "<p>" + ' '.join(sentence(rng) for _ in range(20)) + "</p>",
+        "achievement_data": achievement_data,
+        "scores": {f"criterion_{i}": round(rng.uniform(0, 10), 1) for i in range(12)},
+        "suggestions": [sentence(rng, 12) for _ in range(6)],
+    }
+    return {
+        "document_text": document_text,
+        "document_analysis": analysis,
+        "messages": messages,
+        "achievement_data": achievement_data,
+        "recommendation": recommendation,
+        "export_data": {"messages": messages, "achievement_data": achievement_data,
+                        "recommendation": recommendation, "awardee_info": {"name": "Jane Doe", "rank": "BM1"}},
+    }
+
+
+def run(codec, sessions, payloads):
+    session_dir = tempfile.mkdtemp(prefix='cgaward-bench-')
+    compressor = ValueCompressor(codec, threshold=2048) if codec != 'none' else None
+    manager = FileSessionManager(session_dir, compressor=compressor, sweep_interval=3600)
+    try:
+        ids = [manager.create_session() for _ in range(sessions)]
+
+        write_times = []
+        for session_id, payload in zip(ids, payloads):
+            start = time.perf_counter()
+            manager.update_session_data(session_id, payload)
+            write_times.append(time.perf_counter() - start)
+
+        read_times = []
+        for session_id in ids:
+            start = time.perf_counter()
+            manager.get_session_data(session_id)
+            read_times.append(time.perf_counter() - start)
+
+        disk = sum(os.path.getsize(manager._get_session_path(session_id)) for session_id in ids)
+        return disk, statistics.median(write_times), statistics.median(read_times)
+    finally:
+        manager.sweeper.stop()
+        shutil.rmtree(session_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sessions', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    payloads = [realistic_session(rng) for _ in range(args.sessions)]
+
+    print(f"{'codec':>6} {'disk MB':>9} {'per session KB':>15} {'write ms':>9} {'read ms':>8}")
+    for codec in ['none'] + sorted(CODECS):
+        disk, write, read = run(codec, args.sessions, payloads)
+        print(f"{codec:>6} {disk / 1e6:>9.2f} {disk / args.sessions / 1024:>15.1f} "
+              f"{write * 1000:>9.2f} {read * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+"""
+Prompt building and merging for achievement extraction.
+
+A full analysis sends the whole conversation. Once a session has extracted
+data, later analyses send only the messages after the last analyzed one,
+with a compact summary of what is already known. The model returns the same
+JSON structure for just the new details, and merge_achievement_data folds
+them into the stored data, dropping items that repeat or are contained in
+existing ones.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Fields of the achievement JSON and the defaults used when the model omits them
+ACHIEVEMENT_FIELDS: Dict[str, Any] = {
+    'achievements': [],
+    'impacts': [],
+    'leadership_details': [],
+    'innovation_details': [],
+    'challenges': [],
+    'scope': 'Not specified',
+    'time_period': 'Not specified',
+    'valor_indicators': [],
+    'quantifiable_metrics': [],
+    'awards_received': [],
+    'collaboration': [],
+    'training_provided': [],
+    'above_beyond_indicators': [],
+    'emergency_response': [],
+    'justification': 'Based on the provided accomplishments and their significance to Coast Guard operations'
+}
+
+FULL_TASK = """You are an expert Coast Guard personnel analyst. Analyze this complete conversation 
+to extract ALL achievements, impacts, and award-relevant details."""
+
+INCREMENTAL_TASK = """You are an expert Coast Guard personnel analyst. Details have already been extracted
+from the earlier part of this conversation (summarized below). Analyze the NEW MESSAGES
+to extract achievements, impacts, and award-relevant details that are not already captured."""
+
+ANALYSIS_PROMPT = """
+{task}
+
+AWARDEE INFORMATION:
+{awardee_info}
+
+{conversation}
+
+Extract comprehensive data and return ONLY valid JSON with this EXACT structure:
+{{
+    "achievements": [
+        "List ALL significant accomplishments, projects, initiatives, and responsibilities mentioned"
+    ],
+    "impacts": [
+        "List ALL quantifiable results, outcomes, improvements, and benefits mentioned"
+    ],
+    "leadership_details": [
+        "List ALL leadership roles, supervision, training provided, and management responsibilities"
+    ],
+    "innovation_details": [
+        "List ALL creative solutions, new processes, improvements, and first-time initiatives"
+    ],
+    "challenges": [
+        "List ALL obstacles, difficulties, constraints, and complex situations overcome"
+    ],
+    "scope": "Detailed description of organizational reach (individual/unit/sector/district/area/coast guard-wide/national/international)",
+    "time_period": "Duration or timeframe of accomplishments (be specific: days/weeks/months/years)",
+    "valor_indicators": [
+        "List ONLY actual life-saving actions, rescue operations where lives were saved, or heroic acts during real emergencies (NOT prevention, planning, or potential hazards)"
+    ],
+    "quantifiable_metrics": [
+        "List ALL specific numbers, percentages, dollar amounts, time savings, or measurable results"
+    ],
+    "awards_received": [
+        "List ANY awards, commendations, recognitions, or formal acknowledgments mentioned"
+    ],
+    "collaboration": [
+        "List inter-agency work, joint operations, multi-unit coordination, or external partnerships"
+    ],
+    "training_provided": [
+        "List training delivered to others, knowledge transfer, mentoring, or skill development activities"
+    ],
+    "above_beyond_indicators": [
+        "List ANY voluntary overtime, extra duties, personal sacrifice, or exceptional effort beyond normal duties"
+    ],
+    "emergency_response": [
+        "List ANY emergency situations, crisis response, urgent missions, or time-critical operations"
+    ],
+    "justification": "Comprehensive summary explaining why these accomplishments are significant and noteworthy for Coast Guard awards"
+}}
+
+CRITICAL EXTRACTION INSTRUCTIONS:
+- Extract EVERY achievement mentioned, regardless of size or perceived importance
+- Include ALL quantifiable data: exact numbers, percentages, dollar amounts, timeframes, personnel counts
+- Capture leadership at ANY level: formal supervision, informal leadership, project management, team coordination
+- Note ANY innovation, process improvement, creative solution, or new approach
+- PRIORITIZE achievements with quantifiable impacts and measurable results
+- For each achievement, identify the ACTION (what was done), IMPACT (what changed), and RESULT (the measurable outcome)
+- Link achievements to their specific impacts whenever possible
+- Include ALL challenges: resource constraints, time pressure, difficult conditions, complex problems
+- Look for scope indicators: individual/team/unit/sector/district/area/coast guard-wide/national/international
+- Identify valor: life-saving, rescue operations, dangerous conditions, personal risk
+
+IMPORTANT CONTEXT - Coast Guard Rank Expectations:
+- Consider the awardee's rank when evaluating achievements
+- Junior enlisted (E-1 to E-4) are not expected to lead large teams or have organization-wide impact
+- Mid-level enlisted (E-5 to E-7) typically lead teams of 5-30 people and impact their unit
+- Senior enlisted (E-8 to E-9) lead larger groups and may have sector/district impact
+- Junior officers (O-1 to O-3) lead divisions/departments with unit-level impact
+- Senior officers (O-4+) are expected to have sector/district/area-wide impact
+- Be realistic about what constitutes exceptional performance for each rank level
+- Extract collaboration: inter-agency, joint operations, partnerships, coordination efforts
+- Find training activities: instruction given, mentoring provided, knowledge transfer
+- Identify above-and-beyond: voluntary work, extra hours, personal sacrifice, exceptional effort
+- Note emergency response: crisis situations, urgent missions, disaster response
+- Pay attention to IMPLIED accomplishments from context and follow-up details
+- Be specific and detailed - avoid generic statements
+
+Return ONLY the JSON object with no additional text, formatting, or explanations.
+"""
+
+REFRESH_NOTE = "\n\nIMPORTANT: This is a REFRESH analysis. Provide alternative phrasing and extract any additional details that may have been missed in previous analysis. Look for subtle details, implied accomplishments, and context clues."
+
+INCREMENTAL_NOTE = "\n\nIMPORTANT: This is an INCREMENTAL analysis. List only items found in the NEW MESSAGES that are not already in the summary of extracted details, and return empty lists where there is nothing new. For scope, time_period and justification, describe ALL accomplishments, both already extracted and new."
+
+# Limits for the summary of existing data sent with an incremental analysis
+SUMMARY_MAX_ITEMS = 12
+SUMMARY_MAX_CHARS = 160
+
+PLACEHOLDER_VALUES = {'', 'not specified', 'none', 'n/a', 'unknown'}
+
+
+def conversation_lines(messages: List[Dict], start: int = 0) -> Tuple[List[str], List[str]]:
+    """
+    Format messages from index start as numbered transcript lines.
+
+    Returns the lines and the user messages among them.
+    """
+    lines = []
+    user_inputs = []
+    for i, msg in enumerate(messages[start:], start):
+        role = msg.get('role', 'unknown')
+        content = msg.get('content', '').strip()
+
+        if role == 'user' and content:
+            user_inputs.append(content)
+            lines.append(f"USER {i}: {content}")
+        elif role == 'assistant' and content:
+            lines.append(f"ASSISTANT {i}: {content}")
+    return lines, user_inputs
+
+
+def summarize_achievement_data(data: Dict[str, Any], max_items: int = SUMMARY_MAX_ITEMS,
+                               max_chars: int = SUMMARY_MAX_CHARS) -> str:
+    """Compact text listing of extracted data for an incremental prompt."""
+    lines = []
+    for field, default in ACHIEVEMENT_FIELDS.items():
+        value = data.get(field)
+        if not value or field == 'justification':
+            continue
+        if isinstance(default, list):
+            items = [item if len(item) <= max_chars else item[:max_chars - 3] + '...' for item in value[:max_items]]
+            more = f" (+{len(value) - max_items} more)" if len(value) > max_items else ''
+            lines.append(f"{field}: " + '; '.join(items) + more)
+        else:
+            lines.append(f"{field}: {value}")
+    return '\n'.join(lines) or 'Nothing extracted yet.'
+
+
+def build_analysis_prompt(messages: List[Dict], awardee_info: Dict, refresh: bool = False,
+                          previous: Optional[Dict] = None, start: int = 0) -> Tuple[str, List[str]]:
+    """
+    Build the achievement analysis prompt.
+
+    With previous data and start > 0 only messages[start:] are included, plus
+    the message before them for context and a summary of previous. Returns
+    the prompt and the user messages it covers.
+    """
+    incremental = previous is not None and start > 0
+    lines, user_inputs = conversation_lines(messages, start if incremental else 0)
+
+    if incremental:
+        context_lines, _ = conversation_lines(messages[:start], start - 1)
+        conversation = "ALREADY EXTRACTED (summary):\n" + summarize_achievement_data(previous)
+        if context_lines:
+            conversation += "\n\nEARLIER CONTEXT:\n" + '\n'.join(context_lines)
+        conversation += "\n\nNEW MESSAGES:\n" + '\n'.join(lines)
+    else:
+        conversation = "FULL CONVERSATION:\n" + '\n'.join(lines)
+
+    prompt = ANALYSIS_PROMPT.format(
+        task=INCREMENTAL_TASK if incremental else FULL_TASK,
+        awardee_info=json.dumps(awardee_info, indent=2),
+        conversation=conversation,
+    )
+    if refresh:
+        prompt += REFRESH_NOTE
+    if incremental:
+        prompt += INCREMENTAL_NOTE
+    return prompt, user_inputs
+
+
+def _normalize(item: str) -> str:
+    """Lowercase words of item, space-padded so containment checks match whole words."""
+    return ' ' + ' '.join(re.findall(r"[a-z0-9$%]+", item.lower())) + ' '
+
+
+def merge_achievement_data(previous: Dict[str, Any], delta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge newly extracted details into previously extracted data.
+
+    List items already present (ignoring case and punctuation) are skipped;
+    an item that contains an existing one replaces it as the more detailed
+    version. Text fields take the new value unless it is a placeholder.
+    """
+    merged = {}
+    for field, default in ACHIEVEMENT_FIELDS.items():
+        old = previous.get(field)
+        new = delta.get(field)
+        if isinstance(default, list):
+            items = list(old or [])
+            keys = [_normalize(item) for item in items]
+            for item in new or []:
+                key = _normalize(str(item))
+                if not key.strip() or any(key in existing for existing in keys):
+                    continue
+                contained = [i for i, existing in enumerate(keys) if existing.strip() and existing in key]
+                if contained:
+                    items[contained[0]] = item
+                    keys[contained[0]] = key
+                    # Drop any other entries the new item also covers
+                    for i in reversed(contained[1:]):
+                        del items[i]
+                        del keys[i]
+                else:
+                    items.append(item)
+                    keys.append(key)
+            merged[field] = items
+        else:
+            value = new if isinstance(new, str) and new.strip().lower() not in PLACEHOLDER_VALUES else old
+            merged[field] = value or default
+    return merged
@@ -4,7 +4,6 @@ Main Flask application for the Coast Guard Award Generator.
 
 import os
 import sys
-import json
 import logging
 from datetime import datetime
 from io import BytesIO
@@ -25,7 +24,7 @@ else:
     if src_dir.exists():
         sys.path.insert(0, str(src_dir))
 
-from flask import Flask, render_template, request, jsonify, session, send_file, make_response
+from flask import Flask, Response, render_template, request, jsonify, session, send_file, make_response
 from flask_cors import CORS
 from docx import Document
 from docx.shared import Inches, Pt
@@ -47,9 +46,13 @@ try:
     )
     from session_manager import (
         store_session_data, get_session_data, clear_session_data,
-        get_or_create_session_id
+        get_or_create_session_id, session_manager, get_document_index, append_messages
     )
     from cg_docx_export import generate_cg_compliant_docx
+    from conversation_memory import ConversationMemory
+    from llm_telemetry import llm_telemetry
+    from orchestration import LLM_STAGE_TIMEOUT, Stage, flow_runner
+    import json_codec
     print("All imports successful")
 except ImportError as e:
     import traceback
@@ -90,6 +93,9 @@ app = Flask(__name__,
 
 # Apply configuration
 app.config.from_object(current_config)
+# Decode request bodies with the fast JSON backend when it is installed
+app.json = json_codec.FastJSONProvider(app)
+logger.info(f"Using {json_codec.BACKEND} for JSON decoding")
 
 # Set up CORS
 CORS(app, origins=current_config.CORS_ORIGINS)
@@ -98,11 +104,8 @@ CORS(app, origins=current_config.CORS_ORIGINS)
 try:
     award_engine = AwardEngine()
     openai_client = OpenAIClient()
+    conversation_memory = ConversationMemory(session_manager, openai_client.summarize_conversation)
     logger.info("Services initialized successfully")
-    
-    # Clean up old sessions on startup
-    from session_manager import session_manager
-    session_manager.cleanup_old_sessions()
 except Exception as e:
     logger.error(f"Failed to initialize services: {e}")
     raise
@@ -149,13 +152,15 @@ def clear_session():
     })
 
 
-@app.route('/api/chat', methods=['POST'])
-@handle_errors
-def api_chat():
-    """Handle chat messages and store conversation history."""
-    # Validate input
-    data = MessageValidator.validate(request.get_json())
-    message = data['message']
+def prepare_chat(message):
+    """
+    Append the user's message to the stored conversation and build the
+    OpenAI messages for the reply.
+
+    Returns the updated conversation (not yet stored; its last entry is the
+    user's message) and the OpenAI messages.
+    """
+    session_id = get_or_create_session_id(session)
     
     # Get existing messages from file-based session
     messages = get_session_data(session, 'messages') or []
@@ -167,48 +172,53 @@ def api_chat():
         "timestamp": datetime.now().isoformat()
     })
     
-    # Check if we have document context
-    document_text = get_session_data(session, 'document_text')
-    document_analysis = get_session_data(session, 'document_analysis')
-    
     # Prepare messages for OpenAI
     system_content = "You are a helpful assistant helping to document Coast Guard achievements for award recommendations. Acknowledge the user's input and encourage them to continue sharing details."
     
-    # Add document context to system message if available
-    if document_text:
-        # Include more of the document for better retrieval
-        doc_limit = 20000  # Increased limit for document context
-        system_content += f"\n\nIMPORTANT: You have access to a previously uploaded document. When the user asks about specific details from 'the document' or 'the uploaded document', you can refer to this content:\n\n{document_text[:doc_limit]}"
-        if len(document_text) > doc_limit:
-            system_content += f"\n[Document continues - {len(document_text)} total characters]"
-        system_content += "\n\nWhen answering questions about the document, cite specific sections or details from the above content."
-    
-    openai_messages = [
-        {"role": "system", "content": system_content}
-    ]
-    
-    # Add conversation history
-    for msg in messages:
-        if msg.get('role') in ['user', 'assistant'] and msg.get('content'):
-            openai_messages.append({
-                "role": msg['role'],
-                "content": msg['content']
-            })
+    # Add only the passages of the uploaded document relevant to this message
+    document_index = get_document_index(session)
+    if document_index:
+        passages = document_index.search(message)
+        excerpts = "\n\n".join(f"[Passage {position + 1}/{len(document_index.chunks)}] {passage}"
+                                for position, passage in passages)
+        system_content += f"\n\nIMPORTANT: You have access to a previously uploaded document. When the user asks about specific details from 'the document' or 'the uploaded document', you can refer to these excerpts, selected as the most relevant to the current question:\n\n{excerpts}"
+        system_content += "\n\nWhen answering questions about the document, cite specific sections or details from the above excerpts. If the answer is not in them, say so rather than guessing."
+    
+    # Summary of older turns plus the recent ones, within the prompt budget
+    openai_messages = conversation_memory.build_context(session_id, system_content, messages)
     
     logger.debug(f"Sending {len(openai_messages)} messages to OpenAI")
+    return messages, openai_messages
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json_codec.dumps(data)}\n\n"
+
+
+@app.route('/api/chat', methods=['POST'])
+@handle_errors
+def api_chat():
+    """Handle chat messages and store conversation history."""
+    # Validate input
+    data = MessageValidator.validate(request.get_json())
+    messages, openai_messages = prepare_chat(data['message'])
     
     # Generate AI response
     ai_response = openai_client.chat_completion(openai_messages)
     
     # Add AI response to messages
-    messages.append({
+    reply = {
         "role": "assistant",
         "content": ai_response.get("content", "I understand. Please continue."),
         "timestamp": datetime.now().isoformat()
-    })
+    }
     
-    # Store updated messages in file-based session
-    store_session_data(session, 'messages', messages)
+    # Append both turns to the stored conversation, keeping anything saved
+    # meanwhile (such as a finished upload's analysis)
+    session_id = get_or_create_session_id(session)
+    messages = append_messages(session_id, [messages[-1], reply]) or messages + [reply]
+    conversation_memory.maybe_refresh(session_id, messages)
     
     logger.info(f"Chat interaction completed. Total messages: {len(messages)}")
     
@@ -220,6 +230,105 @@ def api_chat():
     })
 
 
+@app.route('/api/chat/stream', methods=['POST'])
+@handle_errors
+def api_chat_stream():
+    """
+    Stream the assistant's reply as Server-Sent Events.
+
+    Sends ``delta`` events with content fragments as the model produces them
+    and a final ``done`` event, or an ``error`` event if the stream fails.
+    The conversation is stored when the stream ends, including a partial
+    reply if the client disconnects; a failed stream stores only the part of
+    the reply that was sent.
+    """
+    data = MessageValidator.validate(request.get_json())
+    # Resolve the session before streaming; the cookie goes out with the headers
+    session_id = get_or_create_session_id(session)
+    messages, openai_messages = prepare_chat(data['message'])
+    
+    def generate():
+        parts = []
+        
+        def store(content):
+            reply = {
+                "role": "assistant",
+                "content": content,
+                "timestamp": datetime.now().isoformat()
+            }
+            stored = append_messages(session_id, [messages[-1], reply]) or messages + [reply]
+            conversation_memory.maybe_refresh(session_id, stored)
+            logger.info(f"Chat stream completed. Total messages: {len(stored)}")
+            return stored
+        
+        try:
+            for delta in openai_client.stream_chat_completion(openai_messages):
+                parts.append(delta)
+                yield sse_event('delta', {"content": delta})
+        except GeneratorExit:
+            # The client disconnected; keep what it was shown
+            store(''.join(parts) or "I understand. Please continue.")
+            raise
+        except Exception as e:
+            logger.error(f"Chat stream failed: {e}", exc_info=True)
+            # Only a reply the user actually saw is stored
+            stored = store(''.join(parts)) if parts else messages
+            yield sse_event('error', {
+                "success": False,
+                "error": "An unexpected error occurred",
+                "message_count": len(stored)
+            })
+            return
+        
+        reply = ''.join(parts) or "I understand. Please continue."
+        stored = store(reply)
+        yield sse_event('done', {
+            "success": True,
+            "message": reply,
+            "message_count": len(stored)
+        })
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Disable proxy buffering
+    })
+
+
+def analyze_session_achievements(messages, awardee_info, refresh=False):
+    """
+    Extract achievement data from the conversation, incrementally when possible.
+
+    The session keeps the last extracted data with the number of messages it
+    covers. If the awardee is unchanged, only messages added since then are
+    analyzed and merged in; with no new messages the stored data is reused.
+    Refresh always re-analyzes the whole conversation.
+    """
+    previous = get_session_data(session, 'achievement_data')
+    state = get_session_data(session, 'achievement_state') or {}
+    analyzed = state.get('analyzed_messages', 0)
+    
+    if previous and not refresh and state.get('awardee_info') == awardee_info and 0 < analyzed <= len(messages):
+        if analyzed == len(messages):
+            logger.info("No new messages since the last analysis; reusing achievement data")
+            achievement_data = previous
+        else:
+            achievement_data = openai_client.analyze_achievements(messages, awardee_info,
+                                                                  previous=previous, start=analyzed)
+    else:
+        achievement_data = openai_client.analyze_achievements(messages, awardee_info, refresh=refresh)
+    
+    # Validate achievement data
+    achievement_data = AchievementDataValidator.validate(achievement_data)
+    
+    # Store the analysis in file-based session with the messages it covers
+    store_session_data(session, 'achievement_data', achievement_data)
+    store_session_data(session, 'achievement_state', {
+        'analyzed_messages': len(messages),
+        'awardee_info': awardee_info
+    })
+    return achievement_data
+
+
 @app.route('/api/recommend', methods=['POST'])
 @handle_errors
 def api_recommend():
@@ -245,14 +354,8 @@ def api_recommend():
     
     logger.info(f"Analyzing {len(user_messages)} user messages with {len(messages)} total messages")
     
-    # Analyze messages
-    achievement_data = openai_client.analyze_achievements(messages, awardee_info)
-    
-    # Validate achievement data
-    achievement_data = AchievementDataValidator.validate(achievement_data)
-    
-    # Store the analysis in file-based session
-    store_session_data(session, 'achievement_data', achievement_data)
+    # Analyze new messages and merge them into the stored analysis
+    achievement_data = analyze_session_achievements(messages, awardee_info)
     store_session_data(session, 'awardee_info', awardee_info)
     
     # Score the achievements with rank calibration
@@ -263,10 +366,9 @@ def api_recommend():
     recommendation = award_engine.recommend_award(scores)
     award = recommendation["award"]
     
-    # Generate explanation
+    # Generate explanation and improvement suggestions (rule based, so
+    # cheaper inline than on the stage pool)
     explanation = award_engine.generate_explanation(award, achievement_data, scores)
-    
-    # Generate improvement suggestions
     suggestions = award_engine.generate_improvement_suggestions(award, achievement_data)
     
     # Store recommendation in file-based session
@@ -311,14 +413,8 @@ def api_refresh():
     
     logger.info("Refreshing recommendation with alternative analysis")
     
-    # Analyze messages with refresh flag
-    achievement_data = openai_client.analyze_achievements(messages, awardee_info, refresh=True)
-    
-    # Validate achievement data
-    achievement_data = AchievementDataValidator.validate(achievement_data)
-    
-    # Update file-based session
-    store_session_data(session, 'achievement_data', achievement_data)
+    # Re-analyze the whole conversation with refresh flag
+    achievement_data = analyze_session_achievements(messages, awardee_info, refresh=True)
     
     # Score and recommend with rank calibration
     awardee_rank = awardee_info.get('rank', '')
@@ -326,7 +422,7 @@ def api_refresh():
     recommendation = award_engine.recommend_award(scores)
     award = recommendation["award"]
     
-    # Generate explanation and suggestions
+    # Generate explanation and suggestions (rule based, so run inline)
     explanation = award_engine.generate_explanation(award, achievement_data, scores)
     suggestions = award_engine.generate_improvement_suggestions(award, achievement_data)
     
@@ -376,14 +472,19 @@ def api_improve():
     
     logger.info(f"Generating improvement suggestions for {current_award}")
     
-    # Generate improvement suggestions
-    suggestions = openai_client.generate_improvement_suggestions(
-        current_award, achievement_data, awardee_info
-    )
-    
-    # Get current scores for reference with rank calibration
+    # Generate improvement suggestions while scoring with rank calibration
     awardee_rank = awardee_info.get('rank', '')
-    current_scores = award_engine.score_achievements(achievement_data, awardee_rank)
+    flow = flow_runner.run('improve', [
+        # The model call is cancelled with the stage rather than left holding a concurrency slot
+        Stage('suggestions',
+              lambda: openai_client.generate_improvement_suggestions(current_award, achievement_data, awardee_info,
+                                                                     timeout=LLM_STAGE_TIMEOUT),
+              timeout=LLM_STAGE_TIMEOUT,
+              fallback=lambda: award_engine.generate_improvement_suggestions(current_award, achievement_data)),
+        Stage('scoring', lambda: award_engine.score_achievements(achievement_data, awardee_rank)),
+    ])
+    suggestions = flow.results['suggestions']
+    current_scores = flow.results['scoring']
     
     # Store improvement suggestions in file-based session
     improvement_data = {
@@ -450,50 +551,105 @@ def api_finalize():
 @app.route('/api/upload', methods=['POST'])
 @handle_errors
 def api_upload():
-    """Handle document upload and text extraction."""
+    """Accept a document upload and start extracting and analyzing it in the background."""
     # Check if file is in request
     if 'file' not in request.files:
         raise ValidationError('No file provided')
     
     file = request.files['file']
     
-    # Process the file
+    # Copy the file out of the request; the slow work happens in a job
     from document_processor import document_processor
-    success, message, extracted_text = document_processor.process_file(file)
-    
-    if success:
-        logger.info(f"Successfully processed file: {file.filename}")
-        
-        # Analyze the document for achievements
-        analysis = document_processor.analyze_document_for_achievements(extracted_text)
-        
-        # Store document analysis in session for later use
-        if analysis:
-            store_session_data(session, 'document_analysis', analysis)
-            # Also store the original extracted text for retrieval
-            store_session_data(session, 'document_text', extracted_text)
-            
-            # Add a user message with the document analysis
-            messages = get_session_data(session, 'messages') or []
-            messages.append({
-                "role": "user",
-                "content": f"Document content and analysis: {analysis}",
-                "timestamp": datetime.now().isoformat()
-            })
-            store_session_data(session, 'messages', messages)
-        
-        return jsonify({
-            'success': True,
-            'message': f"Successfully analyzed {file.filename}",
-            'analysis': analysis,
-            'extracted_text': analysis  # Send analysis as extracted_text for compatibility
-        })
-    else:
+    success, message, upload = document_processor.spool_file(file)
+    
+    if not success:
         logger.warning(f"Failed to process file: {message}")
         return jsonify({
             'success': False,
             'error': message
         }), 400
+    
+    from upload_jobs import upload_jobs
+    job = upload_jobs.submit(get_or_create_session_id(session), upload)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': f"/api/upload/{job['job_id']}"
+    }), 202
+
+
+@app.route('/api/upload/batch', methods=['POST'])
+@handle_errors
+def api_upload_batch():
+    """Accept several documents at once; they are extracted in parallel and analyzed together."""
+    files = request.files.getlist('files')
+    if not files:
+        raise ValidationError('No files provided')
+    if len(files) > current_config.MAX_BATCH_FILES:
+        raise ValidationError(f'Too many files. Maximum is {current_config.MAX_BATCH_FILES} per upload')
+    
+    from document_processor import document_processor
+    uploads = []
+    rejected = []
+    for file in files:
+        success, message, upload = document_processor.spool_file(file)
+        if success:
+            uploads.append(upload)
+        else:
+            rejected.append({'filename': file.filename, 'error': message})
+    
+    if not uploads:
+        return jsonify({
+            'success': False,
+            'error': 'None of the files could be processed',
+            'rejected': rejected
+        }), 400
+    
+    from upload_jobs import upload_jobs
+    job = upload_jobs.submit_batch(get_or_create_session_id(session), uploads)
+    
+    return jsonify({
+        'success': True,
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': f"/api/upload/{job['job_id']}",
+        'rejected': rejected
+    }), 202
+
+
+@app.route('/api/upload/<job_id>', methods=['GET'])
+@handle_errors
+def api_upload_status(job_id):
+    """Report the progress of an upload job; includes the analysis once completed."""
+    from upload_jobs import upload_jobs, COMPLETED
+    session_id = session.get('sid')
+    job = upload_jobs.get_status(session_id, job_id) if session_id else None
+    if job is None:
+        return jsonify({'success': False, 'error': 'Upload job not found'}), 404
+    
+    response = {
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'filename': job['filename'],
+        'pages_extracted': job.get('pages_extracted'),
+        'total_pages': job.get('total_pages'),
+        'error': job.get('error')
+    }
+    if 'files' in job:
+        # Batch uploads: per-file status, extraction time and duplicates
+        response.update(files=job['files'], files_extracted=job.get('files_extracted'),
+                        analysis_ms=job.get('analysis_ms'))
+    if job['status'] == COMPLETED:
+        response.update({
+            'message': f"Successfully analyzed {job['filename']}" if job.get('analysis') else
+                       f"Stored {job['filename']}, but its analysis did not finish. You can still ask about the document in the chat.",
+            'analysis': job.get('analysis'),
+            'extracted_text': job.get('analysis')  # Send analysis as extracted_text for compatibility
+        })
+    return jsonify(response)
 
 
 @app.route('/api/export', methods=['POST'])
@@ -546,7 +702,7 @@ def api_export():
         
     elif export_format == 'json':
         filename = f"award_package_{name}_{timestamp}.json"
-        content = json.dumps(export_data, indent=2, default=str)
+        content = json_codec.dumps(export_data, indent=2, default=str)
         mimetype = 'application/json'
         
     elif export_format == 'txt':
@@ -651,6 +807,24 @@ def save_session():
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics():
+    """Expose in-process performance metrics for this worker."""
+    from document_processor import document_processor
+    cache = session_manager.cache
+    document_cache = document_processor.cache
+    return jsonify({
+        "pid": os.getpid(),
+        "session_cache": cache.stats() if cache else None,
+        "document_cache": document_cache.stats() if document_cache else None,
+        "llm_cache": openai_client.cache.stats() if openai_client.cache else None,
+        "openai_async": openai_client.aio.stats() if openai_client.use_async else None,
+        "llm_single_flight": openai_client.single_flight.stats(),
+        "llm_calls": llm_telemetry.stats(),
+        "flows": flow_runner.stats()
+    })
+
+
 @app.route('/api/debug/session', methods=['GET'])
 def debug_session():
     """Debug endpoint to check session state (development only)."""
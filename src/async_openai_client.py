@@ -0,0 +1,239 @@
+"""
+Async OpenAI calls on a process-wide event loop.
+
+Each worker process runs one asyncio loop in a daemon thread. All calls go
+through one ``AsyncOpenAI`` client on that loop, so they share one pooled
+HTTP connection set (``OPENAI_MAX_CONNECTIONS``). An adaptive (AIMD) limit,
+capped at ``OPENAI_MAX_CONCURRENCY``, bounds how many are in flight at once,
+and every call first takes its estimated tokens from the rate limiter that
+all worker processes share. Rate limit responses honor ``Retry-After`` for
+every worker. Waits and retry backoff use ``asyncio.sleep``, and the rate
+limiter's locked state file is read and written in a worker thread, so the
+loop stays free for other calls while one waits.
+
+Synchronous code, such as Flask views, submits a coroutine with
+``AsyncOpenAIClient.run`` and waits only for its own result; if it stops
+waiting (``timeout``), the call is cancelled on the loop. ``gather`` issues
+several calls concurrently from one request. ``run`` raises LoopUnavailable
+when the loop is not running or is the caller's own thread, so callers can
+fall back to a blocking request.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Awaitable, Dict, List, Optional
+
+from openai import AsyncOpenAI, RateLimitError
+
+from llm_telemetry import llm_telemetry
+from rate_limiter import ADAPTIVE, AdaptiveConcurrency, estimate_request_tokens, rate_limiter, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.getenv('OPENAI_MAX_CONCURRENCY', '16'))
+MAX_CONNECTIONS = int(os.getenv('OPENAI_MAX_CONNECTIONS', '32'))
+REQUEST_TIMEOUT = float(os.getenv('OPENAI_TIMEOUT', '90'))  # seconds; reasoning models are slow
+
+_lock = threading.Lock()
+_state: Dict[str, Any] = {'pid': None}
+
+
+class LoopUnavailable(RuntimeError):
+    """The shared event loop cannot run a coroutine for this caller."""
+
+
+def _shared() -> Dict[str, Any]:
+    """Event loop, HTTP client and concurrency limit of this process (threads do not survive fork)."""
+    if _state['pid'] != os.getpid():
+        with _lock:
+            if _state['pid'] != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name='openai-async', daemon=True)
+                thread.start()
+
+                async def setup():
+                    import httpx
+                    limits = httpx.Limits(max_connections=MAX_CONNECTIONS,
+                                          max_keepalive_connections=MAX_CONNECTIONS)
+                    return httpx.AsyncClient(limits=limits, timeout=REQUEST_TIMEOUT)
+
+                http_client = asyncio.run_coroutine_threadsafe(setup(), loop).result()
+                _state.update(loop=loop, http_client=http_client,
+                              concurrency=AdaptiveConcurrency(MAX_CONCURRENCY, adaptive=ADAPTIVE),
+                              clients={}, calls=0, retries=0, rate_limited=0, pid=os.getpid())
+    return _state
+
+
+class AsyncOpenAIClient:
+    """
+    Async counterpart of OpenAIClient's API calls.
+
+    Shares the wrapped client's model, request building, response cache and
+    error mapping, and returns the same message dict or ``{"error": ...}``.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def _api(self, state: Dict[str, Any]) -> AsyncOpenAI:
+        """AsyncOpenAI for this client's credentials, on the shared connection pool."""
+        key = (self.client.api_key, os.getenv("OPENAI_BASE_URL") or None)
+        api = state['clients'].get(key)
+        if api is None:
+            api = AsyncOpenAI(api_key=key[0], base_url=key[1], http_client=state['http_client'],
+                              timeout=REQUEST_TIMEOUT, max_retries=0)  # We handle retries ourselves
+            state['clients'][key] = api
+        return api
+
+    async def complete(self, kwargs: Dict, context: str) -> Dict:
+        """Send a prepared request, retrying rate limits and timeouts without blocking the loop."""
+        state = _shared()
+        api = self._api(state)
+        concurrency = state['concurrency']
+        max_retries = self.client.max_retries
+        retry_delay = self.client.retry_delay
+        estimated = estimate_request_tokens(kwargs)
+        call = llm_telemetry.start(context, kwargs['model'])
+        # Latency is judged against earlier calls of the same kind
+        kind = f"{kwargs['model']}:{context}"
+
+        for attempt in range(max_retries):
+            if rate_limiter:
+                wait = await asyncio.to_thread(rate_limiter.reserve, estimated)
+                while wait > 0:
+                    await asyncio.sleep(wait)
+                    wait = await asyncio.to_thread(rate_limiter.reserve, estimated)
+
+            await concurrency.acquire()
+            state['calls'] += 1
+            start_time = time.time()
+            latency = None
+            throttled = False
+            try:
+                logger.info(f"Making async OpenAI API call (attempt {attempt + 1}/{max_retries}) for {context}")
+                response = await api.chat.completions.create(**kwargs)
+                latency = time.time() - start_time
+                logger.info(f"OpenAI API call completed in {latency:.2f}s for {context}")
+                if rate_limiter and getattr(response, 'usage', None):
+                    await asyncio.to_thread(rate_limiter.adjust, response.usage.total_tokens - estimated)
+                call.succeeded(getattr(response, 'usage', None))
+                return response.choices[0].message.model_dump()
+
+            except RateLimitError as e:
+                throttled = True
+                state['rate_limited'] += 1
+                retry_after = retry_after_seconds(e)
+                if retry_after and rate_limiter:
+                    # Every worker holds off, not just this call
+                    await asyncio.to_thread(rate_limiter.block_for, retry_after)
+                if attempt == max_retries - 1:
+                    call.failed(e)
+                    return self.client._handle_api_error(e, context)
+                # Exponential backoff with jitter so parallel callers spread out
+                delay = max(retry_after or 0, retry_delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+                logger.info(f"Rate limit hit, retrying in {delay:.1f} seconds...")
+
+            except asyncio.CancelledError:
+                # The caller stopped waiting; the request is abandoned
+                call.failed('Cancelled')
+                raise
+
+            except Exception as e:
+                if "timeout" not in str(e).lower() or attempt == max_retries - 1:
+                    call.failed(e)
+                    return self.client._handle_api_error(e, context)
+                latency = time.time() - start_time
+                delay = retry_delay
+                logger.info(f"Timeout on attempt {attempt + 1}, retrying...")
+
+            finally:
+                concurrency.release(latency, throttled, kind)
+
+            # Back off without holding a concurrency slot
+            state['retries'] += 1
+            call.retried()
+            await asyncio.sleep(delay)
+
+        call.failed('RetriesExhausted')
+        return {"error": f"Failed after {max_retries} attempts"}
+
+    async def make_api_call(self, messages: List[Dict], temperature: float = 0.7,
+                            max_tokens: Optional[int] = None, context: str = "API call",
+                            refresh: bool = False) -> Dict:
+        """Async equivalent of OpenAIClient._make_api_call, including the response cache."""
+        kwargs = self.client._build_request(messages, temperature, max_tokens)
+        cache = self.client.cache
+
+        if cache:
+            cached = cache.get(kwargs, context, refresh=refresh)
+            if cached is not None:
+                logger.info(f"Serving {context} from LLM response cache")
+                llm_telemetry.record_cache_hit(context, kwargs['model'])
+                return cached
+
+        result = await self.complete(kwargs, context)
+        if cache and "error" not in result and result.get("content"):
+            cache.set(kwargs, context, result)
+        return result
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the shared loop and wait for its result from synchronous code.
+
+        Cancels the coroutine if the timeout passes first. Raises
+        LoopUnavailable (without running it) when the loop has stopped or
+        could not be started, or when called from the loop's own thread,
+        where waiting would deadlock.
+        """
+        try:
+            loop = _shared()['loop']
+        except RuntimeError as e:  # e.g. no new threads at interpreter shutdown
+            coro.close()
+            raise LoopUnavailable(f"OpenAI event loop could not be started: {e}") from e
+        if not loop.is_running() or loop.is_closed():
+            coro.close()
+            raise LoopUnavailable("OpenAI event loop is not running")
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            coro.close()
+            raise LoopUnavailable("Called from the OpenAI event loop's own thread")
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # Stop the request instead of leaving it to finish for nobody
+            future.cancel()
+            raise
+
+    def gather(self, *coros: Awaitable, timeout: Optional[float] = None) -> List[Any]:
+        """Run several coroutines concurrently and return their results in order."""
+        async def gather_all():
+            return await asyncio.gather(*coros)
+        return self.run(gather_all(), timeout)
+
+    @staticmethod
+    def stats() -> Dict[str, Any]:
+        state = _state
+        if state['pid'] != os.getpid():
+            stats = {'max_concurrency': MAX_CONCURRENCY, 'max_connections': MAX_CONNECTIONS,
+                     'calls': 0, 'retries': 0, 'rate_limited': 0}
+        else:
+            stats = {
+                'max_concurrency': MAX_CONCURRENCY,
+                'max_connections': MAX_CONNECTIONS,
+                'calls': state['calls'],
+                'retries': state['retries'],
+                'rate_limited': state['rate_limited'],
+                'concurrency': state['concurrency'].stats(),
+            }
+        stats['rate_limiter'] = rate_limiter.stats() if rate_limiter else None
+        return stats
@@ -0,0 +1,135 @@
+"""
+Content-addressed store for large, frequently duplicated session values such
+as the text extracted from uploaded documents.
+
+Blobs are keyed by the SHA-256 of their content, so identical uploads from
+many members are stored once and sessions only keep the digest. Each
+referencing session leaves a marker file, the reference count is the number
+of markers, and blobs without live references are collected by the session
+sweeper.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from typing import Callable, Optional
+
+from session_compression import ValueCompressor, unpack_bytes
+
+logger = logging.getLogger(__name__)
+
+DIGEST_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+REFS_SUFFIX = '.refs'
+BLOB_SUFFIX = '.blob'
+
+
+def content_digest(content: str) -> str:
+    """SHA-256 hex digest used as the blob key."""
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class FileBlobStore:
+    """Reference-counted blobs in a directory next to the session files."""
+
+    def __init__(self, root: str, compressor: Optional[ValueCompressor] = None,
+                 lock: Optional[Callable] = None):
+        self.root = root
+        self.compressor = compressor
+        self._lock = lock or (lambda path: contextlib.nullcontext())
+
+    def _blob_path(self, digest: str) -> str:
+        if not DIGEST_PATTERN.match(digest):
+            raise ValueError(f"Invalid blob digest: {digest!r}")
+        return os.path.join(self.root, digest + BLOB_SUFFIX)
+
+    def _refs_dir(self, digest: str) -> str:
+        return os.path.join(self.root, digest + REFS_SUFFIX)
+
+    def put(self, content: str, owner: str) -> str:
+        """Store content (once) and record a reference from ``owner``."""
+        digest = content_digest(content)
+        path = self._blob_path(digest)
+
+        with self._lock(path):
+            if not os.path.exists(path):
+                os.makedirs(self.root, exist_ok=True)
+                raw = content.encode('utf-8')
+                if self.compressor:
+                    raw = self.compressor.pack_bytes(raw)
+                fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='.tmp-')
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(raw)
+                    os.replace(tmp_path, path)
+                except BaseException:
+                    with contextlib.suppress(OSError):
+                        os.remove(tmp_path)
+                    raise
+            else:
+                logger.info(f"Reusing stored blob {digest[:12]}")
+
+            refs_dir = self._refs_dir(digest)
+            os.makedirs(refs_dir, exist_ok=True)
+            open(os.path.join(refs_dir, owner), 'a').close()
+
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        return unpack_bytes(raw).decode('utf-8')
+
+    def refcount(self, digest: str) -> int:
+        try:
+            return len(os.listdir(self._refs_dir(digest)))
+        except FileNotFoundError:
+            return 0
+
+    def collect_garbage(self, is_live: Callable[[str], bool]) -> int:
+        """
+        Drop references whose owner is gone and delete unreferenced blobs.
+
+        Returns the number of blobs removed.
+        """
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return 0
+
+        removed = 0
+        for name in names:
+            if not name.endswith(BLOB_SUFFIX):
+                continue
+            digest = name[:-len(BLOB_SUFFIX)]
+            path = os.path.join(self.root, name)
+            refs_dir = self._refs_dir(digest)
+
+            with self._lock(path):
+                try:
+                    owners = os.listdir(refs_dir)
+                except FileNotFoundError:
+                    owners = []
+                live = 0
+                for owner in owners:
+                    if is_live(owner):
+                        live += 1
+                    else:
+                        with contextlib.suppress(FileNotFoundError):
+                            os.remove(os.path.join(refs_dir, owner))
+                if live:
+                    continue
+                with contextlib.suppress(OSError):
+                    os.rmdir(refs_dir)
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    removed += 1
+
+        if removed:
+            logger.info(f"Removed {removed} unreferenced blobs")
+        return removed
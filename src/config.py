@@ -5,6 +5,7 @@ Configuration management for the Coast Guard Award Generator.
 import os
 import logging
 from pathlib import Path
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -16,6 +17,14 @@ SRC_DIR = BASE_DIR / "src"
 STATIC_DIR = SRC_DIR / "static"
 TEMPLATES_DIR = SRC_DIR / "templates"
 
+LOCAL_HOSTS = {'localhost', '127.0.0.1', '::1'}
+
+
+def is_local_base_url(url):
+    """True for an API base URL on this machine, such as src/mock_llm_server.py."""
+    return bool(url) and urlparse(url).hostname in LOCAL_HOSTS
+
+
 # Application settings
 class Config:
     """Base configuration class."""
@@ -29,11 +38,14 @@ class Config:
     OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'o4-mini-2025-04-16')  # O4 reasoning model
     OPENAI_MAX_RETRIES = int(os.getenv('OPENAI_MAX_RETRIES', '3'))
     OPENAI_RETRY_DELAY = int(os.getenv('OPENAI_RETRY_DELAY', '1'))
+    OPENAI_BASE_URL = os.getenv('OPENAI_BASE_URL')  # e.g. http://127.0.0.1:8001/v1 for src/mock_llm_server.py
     
     # Session settings
     SESSION_TYPE = os.getenv('SESSION_TYPE', 'filesystem')
     SESSION_FILE_DIR = os.getenv('SESSION_FILE_DIR', str(BASE_DIR / 'sessions'))
     PERMANENT_SESSION_LIFETIME = int(os.getenv('SESSION_LIFETIME', '86400'))  # 24 hours
+    SESSION_REDIS_URL = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0')  # Used when SESSION_TYPE=redis
+    SESSION_REDIS_POOL_SIZE = int(os.getenv('SESSION_REDIS_POOL_SIZE', '10'))
     
     # Logging settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -45,8 +57,9 @@ class Config:
     MAX_EXPORT_SIZE = int(os.getenv('MAX_EXPORT_SIZE', '10485760'))  # 10MB
     
     # Upload settings
-    UPLOAD_FOLDER = os.path.join(BASE_DIR, 'uploads')
+    UPLOAD_SPOOL_SIZE = int(os.getenv('UPLOAD_SPOOL_SIZE', '2097152'))  # Larger uploads spill to a temp file
     MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', '10485760'))  # 10MB
+    MAX_BATCH_FILES = int(os.getenv('MAX_BATCH_FILES', '10'))  # Files per /api/upload/batch request
     
     # Security settings
     ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '*').split(',')
@@ -57,7 +70,8 @@ class Config:
         """Validate required configuration."""
         errors = []
         
-        if not cls.OPENAI_API_KEY:
+        # A local stand-in API (load tests, development) needs no key
+        if not cls.OPENAI_API_KEY and not is_local_base_url(cls.OPENAI_BASE_URL):
             errors.append("OPENAI_API_KEY environment variable is required")
         
         if errors:
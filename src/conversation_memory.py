@@ -0,0 +1,149 @@
+"""
+Bounded chat context: a running summary plus the most recent turns.
+
+Every chat turn used to replay the whole conversation. ConversationMemory
+keeps the last ``verbatim_messages`` messages word for word and folds older
+ones into a summary stored in the session under ``conversation_summary``.
+The summary is refreshed on a background thread once enough messages have
+fallen out of the verbatim window, so no chat turn waits for it; a request
+arriving while a refresh runs is remembered and handled right after. Building
+the prompt also enforces a token budget, dropping the oldest unsummarized
+messages first if a few long turns would exceed it.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from retrieval import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_KEY = 'conversation_summary'
+VERBATIM_MESSAGES = int(os.getenv('CHAT_VERBATIM_MESSAGES', '12'))
+PROMPT_TOKEN_BUDGET = int(os.getenv('CHAT_PROMPT_TOKEN_BUDGET', '6000'))
+# Messages allowed to pile up beyond the verbatim window before resummarizing
+SUMMARY_BATCH = 6
+
+
+def _anchor(message: Dict[str, Any]) -> str:
+    """Fingerprint of the last summarized message, to detect a replaced conversation."""
+    return hashlib.sha256(f"{message.get('role')}:{message.get('content')}".encode('utf-8')).hexdigest()[:16]
+
+
+class ConversationMemory:
+    """Builds chat context from a stored summary and recent messages, and keeps the summary current."""
+
+    def __init__(self, manager, summarize: Callable[[str, List[Dict[str, Any]]], Optional[str]],
+                 verbatim_messages: int = VERBATIM_MESSAGES, token_budget: int = PROMPT_TOKEN_BUDGET,
+                 summary_batch: int = SUMMARY_BATCH):
+        self.manager = manager
+        self.summarize = summarize
+        self.verbatim_messages = verbatim_messages
+        self.token_budget = token_budget
+        self.summary_batch = summary_batch
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        # session id -> [future of the running refresh, newest messages to refresh with next]
+        self._refreshing: Dict[str, list] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Thread pool of this process (threads do not survive fork)."""
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-summary')
+                    self._executor_pid = os.getpid()
+                    self._refreshing = {}
+        return self._executor
+
+    def summary_for(self, session_id: str, messages: List[Dict[str, Any]]) -> Tuple[str, int]:
+        """Return the stored summary and how many leading messages it covers, if it still matches."""
+        stored = (self.manager.get_session_data(session_id) or {}).get(SUMMARY_KEY)
+        if not stored:
+            return '', 0
+        covered = stored.get('covered', 0)
+        if covered > len(messages) or (covered and stored.get('anchor') != _anchor(messages[covered - 1])):
+            return '', 0
+        return stored.get('text', ''), covered
+
+    def build_context(self, session_id: str, system_content: str,
+                      messages: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+        """
+        OpenAI messages for the next reply: system prompt with the summary,
+        then the unsummarized messages that fit in the token budget.
+        """
+        summary, covered = self.summary_for(session_id, messages)
+        if summary:
+            system_content += f"\n\nSUMMARY OF THE EARLIER CONVERSATION:\n{summary}"
+
+        recent = [{"role": msg['role'], "content": msg['content']}
+                  for msg in messages[covered:]
+                  if msg.get('role') in ('user', 'assistant') and msg.get('content')]
+
+        used = estimate_tokens(system_content)
+        kept = []
+        for msg in reversed(recent):
+            cost = estimate_tokens(msg['content'])
+            if kept and used + cost > self.token_budget:
+                logger.info(f"Chat context over budget; dropping {len(recent) - len(kept)} older messages")
+                break
+            kept.append(msg)
+            used += cost
+        return [{"role": "system", "content": system_content}] + kept[::-1]
+
+    def maybe_refresh(self, session_id: str, messages: List[Dict[str, Any]]) -> Optional[Future]:
+        """
+        Start a background summary update if too many messages are outside the verbatim window.
+
+        If the session's summary is already being refreshed, the messages
+        are kept and summarized once that refresh finishes. Returns a future
+        that completes when the summary is up to date with messages, or None
+        if no update was needed.
+        """
+        _, covered = self.summary_for(session_id, messages)
+        if len(messages) - covered < self.verbatim_messages + self.summary_batch:
+            return None
+        executor = self._get_executor()
+        with self._lock:
+            running = self._refreshing.get(session_id)
+            if running is not None:
+                running[1] = list(messages)
+                return running[0]
+            running = self._refreshing[session_id] = [None, None]
+            # The task takes the lock before finishing, so the future is set first
+            running[0] = executor.submit(self._refresh_until_current, session_id, list(messages))
+            return running[0]
+
+    def _refresh_until_current(self, session_id: str, messages: List[Dict[str, Any]]):
+        """Refresh, then again with any messages that arrived meanwhile."""
+        while messages is not None:
+            self._refresh(session_id, messages)
+            with self._lock:
+                running = self._refreshing[session_id]
+                messages, running[1] = running[1], None
+                if messages is None:
+                    del self._refreshing[session_id]
+
+    def _refresh(self, session_id: str, messages: List[Dict[str, Any]]):
+        try:
+            summary, covered = self.summary_for(session_id, messages)
+            end = len(messages) - self.verbatim_messages
+            if end <= covered:
+                return
+            text = self.summarize(summary, messages[covered:end])
+            if not text:
+                logger.warning(f"Conversation summary for session {session_id} failed; keeping the previous one")
+                return
+            self.manager.update_session_data(session_id, {SUMMARY_KEY: {
+                'text': text,
+                'covered': end,
+                'anchor': _anchor(messages[end - 1]),
+            }})
+            logger.info(f"Summarized messages {covered}-{end} of session {session_id}")
+        except Exception as e:
+            logger.error(f"Conversation summary for session {session_id} failed: {e}", exc_info=True)
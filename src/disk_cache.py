@@ -0,0 +1,197 @@
+"""
+Persistent, size-bounded LRU cache on the local filesystem.
+
+Each entry is one file named by the SHA-256 of its key, written atomically
+and shared by every worker process on the host. Reads bump the file's
+access time, and when the directory grows past ``max_bytes`` the least
+recently used entries are evicted down to ``EVICT_TO`` of the limit. Values
+are anything json_codec can encode; entries may carry a TTL. The directory
+is created by the first write, not when the cache is built.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+ENTRY_SUFFIX = '.entry'
+TEMP_FILE_PREFIX = '.tmp-'
+EVICT_TO = 0.9
+# Default parent of the document and LLM caches and the rate limiter's state
+CACHE_ROOT = os.getenv('CACHE_DIR', 'cache')
+
+
+class DiskLRUCache:
+    """LRU cache of JSON values stored as one file per entry."""
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024,
+                 default_ttl: Optional[float] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._lock = threading.Lock()
+        # Bytes on disk as last seen by this process; other processes'
+        # writes are picked up by the scan that runs before evicting
+        self._size = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + ENTRY_SUFFIX)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = json_codec.loads(f.read())
+        except FileNotFoundError:
+            entry = None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {os.path.basename(path)}: {e}")
+            self._remove(path)
+            entry = None
+
+        if entry is not None and entry.get('key') != key:
+            entry = None  # hash collision
+        if entry is not None and entry.get('expires_at') and entry['expires_at'] < time.time():
+            self._remove(path)
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+
+        try:
+            # Record the access for LRU ordering
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return entry['value']
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store value under key, evicting old entries if the cache is full."""
+        ttl = self.default_ttl if ttl is None else ttl
+        entry = {
+            'key': key,
+            'created_at': time.time(),
+            'expires_at': time.time() + ttl if ttl else None,
+            'value': value,
+        }
+        data = json_codec.dumps(entry).encode('utf-8')
+        path = self._path(key)
+
+        try:
+            old_size = os.path.getsize(path)
+        except FileNotFoundError:
+            old_size = 0
+
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=TEMP_FILE_PREFIX)
+        except FileNotFoundError:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=TEMP_FILE_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            self.writes += 1
+            if self._size is not None:
+                self._size += len(data) - old_size
+            over = self._size is None or self._size > self.max_bytes
+        if over:
+            self._evict()
+
+    def delete(self, key: str):
+        self._remove(self._path(key))
+
+    def clear(self):
+        names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+        for name in names:
+            if name.endswith(ENTRY_SUFFIX):
+                self._remove(os.path.join(self.directory, name))
+        with self._lock:
+            self._size = 0
+
+    def _remove(self, path: str):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        with self._lock:
+            if self._size is not None:
+                self._size -= size
+
+    def _evict(self):
+        """Rescan the directory and drop least recently used entries until under the limit."""
+        entries = []
+        total = 0
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(ENTRY_SUFFIX):
+                        continue
+                    try:
+                        stat_result = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    last_access = max(stat_result.st_atime, stat_result.st_mtime)
+                    entries.append((last_access, stat_result.st_size, entry.path))
+                    total += stat_result.st_size
+        except FileNotFoundError:
+            pass  # removed since the write
+
+        evicted = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TO
+            entries.sort()
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+
+        with self._lock:
+            self._size = total
+            self.evictions += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} entries from {self.directory}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'writes': self.writes,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+            }
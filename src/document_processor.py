@@ -2,13 +2,22 @@
 Document processor for extracting text from PDF and Word documents.
 """
 
+import hashlib
 import os
 import logging
-from typing import Optional, Tuple
+import multiprocessing
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor
+from typing import BinaryIO, Callable, Iterator, List, NamedTuple, Optional, Tuple, Union
 import PyPDF2
-from docx import Document
 from werkzeug.utils import secure_filename
 
+from disk_cache import CACHE_ROOT, DiskLRUCache
+from docx_text import iter_docx_text
+
 logger = logging.getLogger(__name__)
 
 # Allowed file extensions and their MIME types
@@ -20,14 +29,111 @@ ALLOWED_EXTENSIONS = {
 
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_EXTRACTED_LENGTH = 50000  # Maximum characters to extract (increased for full documents)
+MAX_ANALYSIS_LENGTH = 15000  # Characters of document text sent for achievement analysis
+# Uploads are buffered in memory up to this size, then spill to an anonymous temp file
+UPLOAD_SPOOL_SIZE = int(os.getenv('UPLOAD_SPOOL_SIZE', str(2 * 1024 * 1024)))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# PDFs with at least PDF_PARALLEL_MIN_PAGES pages are extracted by a process
+# pool of PDF_EXTRACTION_WORKERS processes (0 disables it)
+def _available_cores() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+PDF_EXTRACTION_WORKERS = int(os.getenv('PDF_EXTRACTION_WORKERS', str(_available_cores())))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '40'))
+PDF_PAGES_PER_TASK = 8
+
+# Bump when extraction output or the analysis prompt changes, so cached
+# results from the old version are no longer used
+EXTRACTION_VERSION = 1
+ANALYSIS_PROMPT_VERSION = 1
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# Last PDF parsed by this pool process, keyed by path and file identity
+_worker_reader: Optional[Tuple[tuple, PyPDF2.PdfReader]] = None
+
+
+def get_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """Process pool shared by all requests of this worker, created on first use."""
+    global _pool, _pool_pid
+    if PDF_EXTRACTION_WORKERS <= 1:
+        return None
+    if _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                # A pool inherited through fork belongs to the parent. Forking a
+                # threaded server can copy held locks, so pool processes come
+                # from a fork server (or spawn where there is none)
+                method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                _pool = ProcessPoolExecutor(max_workers=PDF_EXTRACTION_WORKERS,
+                                            mp_context=multiprocessing.get_context(method))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+def discard_extraction_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next extraction starts a new one."""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+            _pool_pid = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def extract_pdf_page_range(path: str, start: int, stop: int, max_length: int) -> List[str]:
+    """
+    Extract the text of pages [start, stop) of the PDF at path, stopping
+    early past max_length characters.
+
+    Runs in a pool process. The parsed document is kept until a task for
+    another file arrives, so ranges of one PDF that land on the same
+    process parse its structure once.
+    """
+    global _worker_reader
+    info = os.stat(path)
+    key = (path, info.st_ino, info.st_size, info.st_mtime_ns)
+    if _worker_reader is None or _worker_reader[0] != key:
+        _worker_reader = (key, PyPDF2.PdfReader(path))
+    pdf_reader = _worker_reader[1]
+    texts = []
+    length = 0
+    for page_num in range(start, stop):
+        page_text = pdf_reader.pages[page_num].extract_text() or ""
+        texts.append(page_text)
+        length += len(page_text) + 1
+        if length > max_length:
+            break
+    return texts
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload stream exceeds MAX_FILE_SIZE."""
+
+
+class SpooledUpload(NamedTuple):
+    """An upload copied out of the request, ready to be extracted later."""
+    filename: str
+    extension: str
+    buffer: tempfile.SpooledTemporaryFile
+    sha256: str
 
 
 class DocumentProcessor:
     """Handles document upload and text extraction."""
     
-    def __init__(self, upload_folder: str = "uploads"):
-        self.upload_folder = upload_folder
-        os.makedirs(upload_folder, exist_ok=True)
+    def __init__(self, spool_size: int = UPLOAD_SPOOL_SIZE, max_file_size: int = MAX_FILE_SIZE,
+                 cache: Optional[DiskLRUCache] = None):
+        self.spool_size = spool_size
+        self.max_file_size = max_file_size
+        # Extracted text and analyses of previously seen files
+        self.cache = cache
     
     def allowed_file(self, filename: str) -> bool:
         """Check if file extension is allowed."""
@@ -35,75 +141,181 @@ class DocumentProcessor:
                filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
     
     def validate_file(self, file) -> Tuple[bool, str]:
-        """Validate uploaded file."""
+        """Validate uploaded file name; the size is checked while reading it."""
         if not file or file.filename == '':
             return False, "No file selected"
         
         if not self.allowed_file(file.filename):
             return False, "Invalid file type. Only PDF and Word documents are allowed"
         
-        # Check file size (Flask's request.files objects don't have a direct size property)
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)  # Reset file pointer
+        return True, "Valid"
+    
+    def spool_upload(self, file) -> Tuple[tempfile.SpooledTemporaryFile, str]:
+        """
+        Copy an upload stream into a private buffer, enforcing the size cap.
         
-        if file_size > MAX_FILE_SIZE:
-            return False, f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
+        The buffer stays in memory up to spool_size bytes and then moves to
+        an anonymous temporary file, so concurrent uploads never share a path
+        and nothing is left on disk. Returns the buffer and the SHA-256 of the
+        file. Raises UploadTooLarge past max_file_size.
+        """
+        stream = getattr(file, 'stream', file)
+        buffer = tempfile.SpooledTemporaryFile(max_size=self.spool_size)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            while True:
+                chunk = stream.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > self.max_file_size:
+                    raise UploadTooLarge(f"Upload exceeds {self.max_file_size} bytes")
+                digest.update(chunk)
+                buffer.write(chunk)
+        except BaseException:
+            buffer.close()
+            raise
+        buffer.seek(0)
+        return buffer, digest.hexdigest()
+    
+    def iter_pdf_pages(self, pdf_reader, start: int = 0) -> Iterator[str]:
+        """Yield the text of each page from start on, parsing pages only as they are consumed."""
+        for page_num in range(start, len(pdf_reader.pages)):
+            yield pdf_reader.pages[page_num].extract_text() or ""
+    
+    def iter_pdf_pages_parallel(self, pool: ProcessPoolExecutor, source: Union[str, BinaryIO],
+                                pdf_reader, max_length: int) -> Iterator[str]:
+        """
+        Yield page texts in order while the pool extracts page ranges ahead.
         
-        return True, "Valid"
+        Pool processes read the PDF from a path (a temporary copy for file
+        objects) rather than receiving its bytes with every task. Only a few
+        ranges per worker are in flight at a time, so when the consumer stops
+        at the character budget the remaining pages are never parsed. If the
+        pool breaks, the remaining pages are extracted in this process.
+        """
+        num_pages = len(pdf_reader.pages)
+        if isinstance(source, str):
+            path, temporary = source, None
+        else:
+            source.seek(0)
+            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as copy:
+                shutil.copyfileobj(source, copy)
+            path = temporary = copy.name
+        
+        per_task = max(1, min(PDF_PAGES_PER_TASK, -(-num_pages // PDF_EXTRACTION_WORKERS)))
+        ranges = iter(range(0, num_pages, per_task))
+        pending = deque()
+        pages_done = 0
+        
+        def submit():
+            start = next(ranges, None)
+            if start is not None:
+                pending.append(pool.submit(extract_pdf_page_range, path, start,
+                                           min(start + per_task, num_pages), max_length))
+        
+        try:
+            for _ in range(PDF_EXTRACTION_WORKERS * 2):
+                submit()
+            while pending:
+                texts = pending.popleft().result()
+                submit()
+                for text in texts:
+                    pages_done += 1
+                    yield text
+        except BrokenExecutor as e:
+            logger.warning(f"PDF extraction pool failed ({e}); extracting pages "
+                           f"{pages_done + 1}-{num_pages} in this process")
+            discard_extraction_pool(pool)
+            pending.clear()
+            yield from self.iter_pdf_pages(pdf_reader, pages_done)
+        finally:
+            for future in pending:
+                future.cancel()
+            if temporary:
+                # Results of ranges still running are never read
+                os.unlink(temporary)
     
-    def extract_text_from_pdf(self, file_path: str) -> Optional[str]:
-        """Extract text from PDF file."""
+    def extract_text_from_pdf(self, source: Union[str, BinaryIO],
+                              max_length: int = MAX_EXTRACTED_LENGTH,
+                              progress: Optional[Callable[[int, int], None]] = None) -> Optional[str]:
+        """
+        Extract text from a PDF given as a path or a binary file object.
+        
+        Pages are parsed one at a time and parsing stops once max_length
+        characters have been collected, so long documents only pay for the
+        pages that fit in the budget. progress, if given, is called with
+        (pages extracted, total pages) after each page.
+        """
         try:
-            text = ""
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                num_pages = len(pdf_reader.pages)
-                
-                # Extract text from each page
-                for page_num in range(num_pages):
-                    page = pdf_reader.pages[page_num]
-                    page_text = page.extract_text()
-                    text += page_text + "\n"
-                
-                # Clean up the text
-                text = text.strip()
-                
-                # Limit text length
-                if len(text) > MAX_EXTRACTED_LENGTH:
-                    text = text[:MAX_EXTRACTED_LENGTH] + "... [Content truncated]"
-                
-                return text
+            parts = []
+            length = 0
+            pdf_reader = PyPDF2.PdfReader(source)
+            num_pages = len(pdf_reader.pages)
+            
+            pool = get_extraction_pool() if num_pages >= PDF_PARALLEL_MIN_PAGES else None
+            if pool is not None:
+                pages = self.iter_pdf_pages_parallel(pool, source, pdf_reader, max_length)
+            else:
+                pages = self.iter_pdf_pages(pdf_reader)
+            
+            pages_read = 0
+            for page_text in pages:
+                parts.append(page_text)
+                length += len(page_text) + 1
+                pages_read += 1
+                if progress:
+                    progress(pages_read, num_pages)
+                if length > max_length:
+                    break
+            
+            if pool is not None:
+                # Cancel page ranges queued beyond the budget
+                pages.close()
+            
+            # Clean up the text
+            text = "\n".join(parts).strip()
+            skipped_pages = num_pages - pages_read
+            
+            # Limit text length
+            if len(text) > max_length or skipped_pages:
+                text = text[:max_length] + "... [Content truncated]"
+                logger.info(f"PDF text budget reached after {pages_read} of {num_pages} pages; "
+                            f"skipped {skipped_pages} pages")
+            
+            return text
                 
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {e}")
             return None
     
-    def extract_text_from_docx(self, file_path: str) -> Optional[str]:
-        """Extract text from DOCX file."""
+    def extract_text_from_docx(self, source: Union[str, BinaryIO],
+                               max_length: int = MAX_EXTRACTED_LENGTH) -> Optional[str]:
+        """
+        Extract text from a DOCX given as a path or a binary file object.
+        
+        Paragraphs and table rows are streamed from word/document.xml in
+        document order, and parsing stops once max_length characters have
+        been collected.
+        """
         try:
-            doc = Document(file_path)
-            text = ""
-            
-            # Extract text from paragraphs
-            for paragraph in doc.paragraphs:
-                if paragraph.text.strip():
-                    text += paragraph.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        if cell.text.strip():
-                            text += cell.text + " "
-                    text += "\n"
+            parts = []
+            length = 0
+            blocks = iter_docx_text(source)
+            for block in blocks:
+                parts.append(block)
+                length += len(block) + 1
+                if length > max_length:
+                    break
+            blocks.close()
             
             # Clean up the text
-            text = text.strip()
+            text = "\n".join(parts).strip()
             
             # Limit text length
-            if len(text) > MAX_EXTRACTED_LENGTH:
-                text = text[:MAX_EXTRACTED_LENGTH] + "... [Content truncated]"
+            if len(text) > max_length:
+                text = text[:max_length] + "... [Content truncated]"
             
             return text
             
@@ -111,45 +323,61 @@ class DocumentProcessor:
             logger.error(f"Error extracting text from DOCX: {e}")
             return None
     
-    def extract_text_from_doc(self, file_path: str) -> Optional[str]:
+    def extract_text_from_doc(self, source: Union[str, BinaryIO],
+                              max_length: int = MAX_EXTRACTED_LENGTH) -> Optional[str]:
         """Extract text from DOC file (legacy format)."""
         # For now, we'll treat .doc files as .docx
         # Full .doc support would require python-docx2txt or similar
-        return self.extract_text_from_docx(file_path)
+        return self.extract_text_from_docx(source, max_length)
     
-    def process_file(self, file) -> Tuple[bool, str, Optional[str]]:
-        """Process uploaded file and extract text."""
+    def spool_file(self, file) -> Tuple[bool, str, Optional[SpooledUpload]]:
+        """Validate an upload and copy it out of the request stream."""
         # Validate file
         is_valid, message = self.validate_file(file)
         if not is_valid:
             return False, message, None
         
-        # Secure filename
+        # Secure filename (only used for messages; nothing is written under it)
         filename = secure_filename(file.filename)
         file_extension = filename.rsplit('.', 1)[1].lower()
         
-        # Save file temporarily
-        file_path = os.path.join(self.upload_folder, filename)
         try:
-            file.save(file_path)
-            
-            # Extract text based on file type
-            if file_extension == 'pdf':
-                extracted_text = self.extract_text_from_pdf(file_path)
-            elif file_extension == 'docx':
-                extracted_text = self.extract_text_from_docx(file_path)
-            elif file_extension == 'doc':
-                extracted_text = self.extract_text_from_doc(file_path)
-            else:
-                return False, "Unsupported file type", None
+            buffer, file_hash = self.spool_upload(file)
+        except UploadTooLarge:
+            return False, f"File too large. Maximum size is {self.max_file_size // (1024*1024)}MB", None
+        
+        return True, "Valid", SpooledUpload(filename, file_extension, buffer, file_hash)
+    
+    def extract_upload(self, upload: SpooledUpload, max_length: int = MAX_EXTRACTED_LENGTH,
+                       progress: Optional[Callable[[int, int], None]] = None) -> Tuple[bool, str, Optional[str]]:
+        """Extract the text of a spooled upload, closing its buffer."""
+        filename, file_extension, buffer, file_hash = upload
+        try:
+            cache_key = f"extract:v{EXTRACTION_VERSION}:{file_extension}:{max_length}:{file_hash}"
+            extracted_text = self.cache.get(cache_key) if self.cache else None
             
-            # Clean up - remove temporary file
-            os.remove(file_path)
+            if extracted_text is not None:
+                buffer.close()
+                logger.info(f"Using cached text for {filename} ({file_hash[:12]})")
+            else:
+                with buffer:
+                    # Extract text based on file type
+                    if file_extension == 'pdf':
+                        extracted_text = self.extract_text_from_pdf(buffer, max_length, progress=progress)
+                    elif file_extension == 'docx':
+                        extracted_text = self.extract_text_from_docx(buffer, max_length)
+                    elif file_extension == 'doc':
+                        extracted_text = self.extract_text_from_doc(buffer, max_length)
+                    else:
+                        return False, "Unsupported file type", None
+                
+                if extracted_text:
+                    # Clean up whitespace
+                    extracted_text = ' '.join(extracted_text.split())
+                    if self.cache:
+                        self.cache.set(cache_key, extracted_text)
             
             if extracted_text:
-                # Clean up whitespace
-                extracted_text = ' '.join(extracted_text.split())
-                
                 # Create summary message
                 word_count = len(extracted_text.split())
                 message = f"Successfully extracted {word_count} words from {filename}"
@@ -160,15 +388,46 @@ class DocumentProcessor:
                 
         except Exception as e:
             logger.error(f"Error processing file: {e}")
-            # Clean up on error
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            buffer.close()
             return False, f"Error processing file: {str(e)}", None
     
+    def process_file(self, file) -> Tuple[bool, str, Optional[str]]:
+        """Process uploaded file and extract text."""
+        success, message, upload = self.spool_file(file)
+        if not success:
+            return False, message, None
+        return self.extract_upload(upload)
+    
+    @staticmethod
+    def combine_documents(documents: List[Tuple[str, str]], per_document: Optional[int] = None) -> str:
+        """Join (filename, text) pairs into one context, optionally truncating each text."""
+        return "\n\n".join(f"=== Document: {name} ===\n{text[:per_document]}" for name, text in documents)
+    
+    def analyze_documents(self, documents: List[Tuple[str, str]]) -> str:
+        """Analyze several documents with a single call, giving each an equal share of the input."""
+        if len(documents) == 1:
+            return self.analyze_document_for_achievements(documents[0][1])
+        headers = sum(len(name) + 20 for name, _ in documents)
+        return self.analyze_document_for_achievements(
+            self.combine_documents(documents, (MAX_ANALYSIS_LENGTH - headers) // len(documents)))
+    
     def analyze_document_for_achievements(self, text: str) -> str:
         """Analyze document text to extract achievement information."""
         try:
-            from openai_client import OpenAIClient
+            from openai_client import OpenAIClient, DEFAULT_MODEL
+            
+            # The same document analyzed with the same prompt and model gives
+            # an equivalent answer, so re-uploads skip the LLM entirely
+            cache_key = None
+            if self.cache:
+                model = os.getenv("OPENAI_MODEL", DEFAULT_MODEL)
+                text_hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+                cache_key = f"analysis:v{ANALYSIS_PROMPT_VERSION}:{model}:{text_hash}"
+                analysis = self.cache.get(cache_key)
+                if analysis is not None:
+                    logger.info(f"Using cached document analysis ({text_hash[:12]})")
+                    return analysis
+            
             client = OpenAIClient()
             
             # Create a specific prompt for analyzing the document
@@ -196,16 +455,30 @@ Provide a comprehensive analysis that helps build a strong award recommendation.
 
             messages = [
                 {"role": "system", "content": "You are a military achievement analyst helping to identify accomplishments for award recommendations. Be specific and focus on concrete achievements."},
-                {"role": "user", "content": analysis_prompt.format(text=text[:15000])}  # Increased limit for better analysis
+                {"role": "user", "content": analysis_prompt.format(text=text[:MAX_ANALYSIS_LENGTH])}  # Increased limit for better analysis
             ]
             
-            response = client.chat_completion(messages)
-            return response.get("content", "No achievements identified.")
+            result = client._make_api_call(messages, temperature=0.7, context="document analysis")
+            if "error" in result:
+                return result["error"]
+            
+            analysis = result.get("content") or "No achievements identified."
+            if cache_key and result.get("content"):
+                self.cache.set(cache_key, analysis)
+            return analysis
             
         except Exception as e:
             logger.error(f"Error analyzing document: {e}")
             return f"Error analyzing document: {str(e)}"
 
 
+def create_document_cache() -> Optional[DiskLRUCache]:
+    """Build the on-disk extraction/analysis cache from the environment (None when disabled)."""
+    max_bytes = int(os.getenv('DOCUMENT_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+    if max_bytes <= 0:
+        return None
+    return DiskLRUCache(os.getenv('DOCUMENT_CACHE_DIR', os.path.join(CACHE_ROOT, 'documents')), max_bytes)
+
+
 # Global document processor instance
-document_processor = DocumentProcessor()
\ No newline at end of file
+document_processor = DocumentProcessor(cache=create_document_cache())
\ No newline at end of file
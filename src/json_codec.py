@@ -0,0 +1,53 @@
+"""
+JSON encoding/decoding with an optional fast backend.
+
+Decoding uses orjson when it is installed and falls back to the standard
+library otherwise, or whenever orjson cannot handle a document (for example
+integers above 64 bits or NaN written by the stdlib encoder). Encoding always
+uses the standard library: session files, cache entries and API responses
+must stay byte-for-byte what they were (``", "`` separators, ASCII escapes,
+Flask's date format), and orjson cannot produce that format without a
+rewrite pass that costs more than it saves.
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    from flask.json.provider import DefaultJSONProvider
+except ImportError:
+    DefaultJSONProvider = None
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+
+def dumps(obj: Any, indent: Optional[int] = None, sort_keys: bool = False,
+          default: Optional[Callable] = None) -> str:
+    """Encode obj to a JSON string, byte-identical to json.dumps."""
+    return json.dumps(obj, indent=indent, sort_keys=sort_keys, default=default)
+
+
+def loads(data: Union[str, bytes, bytearray]) -> Any:
+    """Decode a JSON document."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except ValueError:
+            pass
+    return json.loads(data)
+
+
+if DefaultJSONProvider is not None:
+
+    class FastJSONProvider(DefaultJSONProvider):
+        """Flask JSON provider that decodes request bodies with the fast backend."""
+
+        def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+            if kwargs:
+                return super().loads(s, **kwargs)
+            return loads(s)
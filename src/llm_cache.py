@@ -0,0 +1,100 @@
+"""
+Persistent cache of LLM completions.
+
+Requests are keyed by a canonical form of everything that determines the
+response: model, messages (role, name and content only) and sampling
+parameters, serialized with sorted keys and hashed. Whether a call site is
+cached, and for how long, is set per call context in ``CALL_POLICIES``;
+a caller can also ask to refresh, which skips the lookup but stores the new
+response. Storage is a DiskLRUCache, so entries are shared between worker
+processes and evicted least-recently-used.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, Optional
+
+from disk_cache import CACHE_ROOT, DiskLRUCache
+
+# Bump when the cached value format or canonical form changes
+CACHE_VERSION = 1
+DEFAULT_TTL = int(os.getenv('LLM_CACHE_TTL', str(24 * 60 * 60)))
+
+# Call contexts whose responses are cached, with their TTL in seconds (None
+# uses DEFAULT_TTL). Chat is conversational and document analysis already has
+# its own cache in DocumentProcessor, so neither is listed.
+CALL_POLICIES: Dict[str, Optional[int]] = {
+    'achievement analysis': None,
+    'improvement suggestions': None,
+    'award citation drafting': None,
+}
+
+MESSAGE_FIELDS = ('role', 'name', 'content')
+
+
+def canonical_request(request: Dict[str, Any]) -> str:
+    """Serialize a chat completion request so equivalent requests compare equal."""
+    canonical = dict(request)
+    canonical['messages'] = [
+        {field: message[field] for field in MESSAGE_FIELDS if message.get(field) is not None}
+        for message in request.get('messages', [])
+    ]
+    return json.dumps(canonical, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+
+
+def request_key(request: Dict[str, Any]) -> str:
+    digest = hashlib.sha256(canonical_request(request).encode('utf-8')).hexdigest()
+    return f"llm:v{CACHE_VERSION}:{digest}"
+
+
+class LLMResponseCache:
+    """Looks up and stores completions for the call contexts that allow it."""
+
+    def __init__(self, store: DiskLRUCache, policies: Optional[Dict[str, Optional[int]]] = None,
+                 default_ttl: int = DEFAULT_TTL):
+        self.store = store
+        self.policies = CALL_POLICIES if policies is None else policies
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._contexts: Dict[str, Dict[str, int]] = {}
+
+    def enabled_for(self, context: str) -> bool:
+        return context in self.policies
+
+    def _count(self, context: str, outcome: str):
+        with self._lock:
+            counts = self._contexts.setdefault(context, {'hits': 0, 'misses': 0, 'refreshes': 0})
+            counts[outcome] += 1
+
+    def get(self, request: Dict[str, Any], context: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Return the cached response for request, or None on a miss, refresh or uncached context."""
+        if not self.enabled_for(context):
+            return None
+        if refresh:
+            self._count(context, 'refreshes')
+            return None
+        response = self.store.get(request_key(request))
+        self._count(context, 'hits' if response is not None else 'misses')
+        return response
+
+    def set(self, request: Dict[str, Any], context: str, response: Dict[str, Any]):
+        if not self.enabled_for(context):
+            return
+        ttl = self.policies[context]
+        self.store.set(request_key(request), response, ttl=self.default_ttl if ttl is None else ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.store.stats()
+        with self._lock:
+            stats['contexts'] = {context: dict(counts) for context, counts in self._contexts.items()}
+        return stats
+
+
+def create_llm_cache() -> Optional[LLMResponseCache]:
+    """Build the completion cache from the environment (None when disabled)."""
+    max_bytes = int(os.getenv('LLM_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    if max_bytes <= 0:
+        return None
+    return LLMResponseCache(DiskLRUCache(os.getenv('LLM_CACHE_DIR', os.path.join(CACHE_ROOT, 'llm')), max_bytes))
@@ -0,0 +1,244 @@
+"""
+Telemetry of LLM calls.
+
+Every OpenAI call produces one record: call site (the ``context`` passed to
+``_make_api_call``), model, prompt/completion/reasoning tokens, latency
+including retries, retry count, whether it was served from the response
+cache, and the error class if it failed. Records are aggregated per call
+site into fixed-bucket histograms of latency and tokens, exposed by
+``stats()`` on ``/api/metrics``. With ``LLM_TELEMETRY_LOG`` set they are
+also appended to a JSONL file, rolled over to ``.1``, ``.2``... once it
+exceeds ``LLM_TELEMETRY_LOG_MAX_BYTES``, for offline analysis.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; concurrent rollovers are then possible
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Upper bucket bounds; larger values fall in a final overflow bucket
+LATENCY_BUCKETS_MS = (100, 250, 500, 1000, 2000, 5000, 10000, 20000, 30000, 60000, 90000, 120000)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000)
+
+
+class CallRecord(NamedTuple):
+    timestamp: float
+    context: str
+    model: str
+    latency_ms: float
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    reasoning_tokens: Optional[int] = None
+    retries: int = 0
+    cache_hit: bool = False
+    error: Optional[str] = None
+    streamed: bool = False
+
+
+def usage_counts(usage: Any) -> Dict[str, Optional[int]]:
+    """Prompt, completion and reasoning tokens from an API usage object or dict."""
+    def get(obj, name):
+        return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+    if usage is None:
+        return {'prompt_tokens': None, 'completion_tokens': None, 'reasoning_tokens': None}
+    details = get(usage, 'completion_tokens_details')
+    return {
+        'prompt_tokens': get(usage, 'prompt_tokens'),
+        'completion_tokens': get(usage, 'completion_tokens'),
+        'reasoning_tokens': get(details, 'reasoning_tokens') if details is not None else None,
+    }
+
+
+class Histogram:
+    """Counts of observations per fixed bucket, with percentiles estimated from bucket bounds."""
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        index = next((i for i, bound in enumerate(self.bounds) if value <= bound), len(self.bounds))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of observations (None past the last bound)."""
+        if not self.count:
+            return None
+        needed = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= needed:
+                return self.bounds[index] if index < len(self.bounds) else None
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}" for bound in self.bounds] + ['overflow']
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 1) if self.count else None,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': dict(zip(labels, self.counts)),
+        }
+
+
+class _SiteStats:
+    def __init__(self):
+        self.calls = 0
+        self.cache_hits = 0
+        self.retries = 0
+        self.errors: Dict[str, int] = {}
+        self.models: Dict[str, int] = {}
+        self.tokens = {'prompt': 0, 'completion': 0, 'reasoning': 0}
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.prompt_tokens = Histogram(TOKEN_BUCKETS)
+        self.completion_tokens = Histogram(TOKEN_BUCKETS)
+
+
+class LLMCall:
+    """An API call being timed; finish it with succeeded() or failed()."""
+
+    def __init__(self, telemetry: 'LLMTelemetry', context: str, model: str, streamed: bool = False):
+        self.telemetry = telemetry
+        self.context = context
+        self.model = model
+        self.streamed = streamed
+        self.retries = 0
+        self._start = time.perf_counter()
+
+    def retried(self):
+        self.retries += 1
+
+    def succeeded(self, usage: Any = None):
+        self._finish(usage_counts(usage), None)
+
+    def failed(self, error: Any):
+        self._finish(usage_counts(None), error if isinstance(error, str) else type(error).__name__)
+
+    def _finish(self, tokens: Dict[str, Optional[int]], error: Optional[str]):
+        self.telemetry.record(CallRecord(
+            timestamp=time.time(), context=self.context, model=self.model,
+            latency_ms=round((time.perf_counter() - self._start) * 1000, 1),
+            retries=self.retries, error=error, streamed=self.streamed, **tokens))
+
+
+class LLMTelemetry:
+    """Aggregates call records per call site and optionally appends them to a JSONL log."""
+
+    def __init__(self, log_path: Optional[str] = None, log_max_bytes: int = 10 * 1024 * 1024,
+                 log_backups: int = 5):
+        self.log_path = log_path
+        self.log_max_bytes = log_max_bytes
+        self.log_backups = log_backups
+        if log_path and os.path.dirname(log_path):
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._sites: Dict[str, _SiteStats] = {}
+
+    def start(self, context: str, model: str, streamed: bool = False) -> LLMCall:
+        return LLMCall(self, context, model, streamed)
+
+    def record_cache_hit(self, context: str, model: str):
+        self.record(CallRecord(timestamp=time.time(), context=context, model=model, latency_ms=0.0, cache_hit=True))
+
+    def record(self, record: CallRecord):
+        with self._lock:
+            site = self._sites.setdefault(record.context, _SiteStats())
+            site.calls += 1
+            site.models[record.model] = site.models.get(record.model, 0) + 1
+            if record.cache_hit:
+                site.cache_hits += 1
+            else:
+                site.retries += record.retries
+                site.latency.observe(record.latency_ms)
+                if record.error:
+                    site.errors[record.error] = site.errors.get(record.error, 0) + 1
+                if record.prompt_tokens is not None:
+                    site.tokens['prompt'] += record.prompt_tokens
+                    site.prompt_tokens.observe(record.prompt_tokens)
+                if record.completion_tokens is not None:
+                    site.tokens['completion'] += record.completion_tokens
+                    site.completion_tokens.observe(record.completion_tokens)
+                site.tokens['reasoning'] += record.reasoning_tokens or 0
+
+        if self.log_path:
+            try:
+                self._append(record)
+            except OSError as e:
+                logger.warning(f"Could not write LLM telemetry to {self.log_path}: {e}")
+
+    def _append(self, record: CallRecord):
+        line = json.dumps(dict(record._asdict(), pid=os.getpid()), separators=(',', ':')) + '\n'
+        while True:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                opened = os.fstat(f.fileno())
+                try:
+                    current = os.stat(self.log_path).st_ino
+                except FileNotFoundError:
+                    current = None
+                if current != opened.st_ino:
+                    # Another worker rolled the log over while we waited for the lock
+                    continue
+                if not opened.st_size or opened.st_size + len(line) <= self.log_max_bytes:
+                    f.write(line)
+                    return
+                # The line then goes to the new log, under that file's own lock
+                self._roll_over()
+
+    def _roll_over(self):
+        """Shift path.1 .. path.N-1 up by one and move the full log to path.1 (called under the log's lock)."""
+        for index in range(self.log_backups - 1, 0, -1):
+            source = f"{self.log_path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.log_path}.{index + 1}")
+        if self.log_backups > 0:
+            os.replace(self.log_path, f"{self.log_path}.1")
+        else:
+            os.truncate(self.log_path, 0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                context: {
+                    'calls': site.calls,
+                    'cache_hits': site.cache_hits,
+                    'retries': site.retries,
+                    'errors': dict(site.errors),
+                    'models': dict(site.models),
+                    'tokens': dict(site.tokens),
+                    'latency_ms': site.latency.snapshot(),
+                    'prompt_tokens': site.prompt_tokens.snapshot(),
+                    'completion_tokens': site.completion_tokens.snapshot(),
+                }
+                for context, site in self._sites.items()
+            }
+
+
+def create_llm_telemetry() -> LLMTelemetry:
+    """Build telemetry from the environment (JSONL log only when LLM_TELEMETRY_LOG is set)."""
+    return LLMTelemetry(os.getenv('LLM_TELEMETRY_LOG') or None,
+                        int(os.getenv('LLM_TELEMETRY_LOG_MAX_BYTES', str(10 * 1024 * 1024))),
+                        int(os.getenv('LLM_TELEMETRY_LOG_BACKUPS', '5')))
+
+
+# Shared by every client in the process
+llm_telemetry = create_llm_telemetry()
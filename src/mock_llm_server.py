@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Minimal stand-in for the OpenAI chat completions API.
+
+Serves ``POST /v1/chat/completions`` either as one JSON body or streamed as
+``chat.completion.chunk`` Server-Sent Events, after a "thinking" delay drawn
+from a configurable distribution and a per-token delay. Point the app at it
+with ``OPENAI_BASE_URL=http://127.0.0.1:8001/v1`` to develop or load test
+without an API key or network access.
+
+Replies come from, in order:
+
+- a fixture in ``--fixtures``: ``<prompt hash>.json`` holding ``{"content": ...}``,
+  where the hash covers the request's messages (see ``prompt_hash``). With
+  ``--record-from https://api.openai.com/v1`` a missing fixture is fetched
+  from that API (using this process's ``OPENAI_API_KEY``) and saved;
+- a synthesized answer for prompts that expect JSON: an achievement
+  analysis built from the transcript's user lines, or a suggestions array;
+- the canned reply.
+
+Optional request and token quotas per period (``--rpm``, ``--tpm``) are
+enforced over a sliding window like the real API: requests beyond them get
+a 429 ``rate_limit_exceeded`` error with a ``Retry-After`` header. Faults
+can also be injected at random: 429s (``--rate-limit-rate``) and requests
+that hang without an answer (``--timeout-rate``, for ``--hang`` seconds).
+
+    python src/mock_llm_server.py --port 8001 --think 2.0 --latency lognormal --rpm 60
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import urllib.request
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+from achievement_extraction import ACHIEVEMENT_FIELDS
+from llm_cache import canonical_request
+from retrieval import estimate_tokens
+
+DEFAULT_REPLY = (
+    "Thank you for sharing those details. Leading the boarding team through twelve "
+    "inspections while training three new members shows strong initiative. Could you "
+    "tell me how many hours the effort took and what changed for the unit as a result?"
+)
+
+LATENCY_DISTRIBUTIONS = ('fixed', 'uniform', 'lognormal')
+
+# Markers of prompts whose callers parse JSON out of the reply
+ANALYSIS_MARKER = 'return ONLY valid JSON with this EXACT structure'
+SUGGESTIONS_MARKER = 'Return a JSON array of suggestion strings'
+USER_LINE = re.compile(r'^USER \d+: (.+)$', re.MULTILINE)
+
+SUGGESTIONS = [
+    "Add specific numbers: How many personnel did you supervise?",
+    "Quantify the time or cost savings achieved",
+    "Describe the scope of impact beyond your unit",
+    "Explain the obstacles you overcame and how",
+    "State the time period the accomplishments cover",
+]
+
+
+def prompt_hash(messages: List[Dict[str, Any]]) -> str:
+    """Fixture key for a request: hash of its messages' roles and contents."""
+    return hashlib.sha256(canonical_request({'messages': messages}).encode('utf-8')).hexdigest()
+
+
+def synthesize_analysis(prompt: str) -> str:
+    """Schema-valid achievement analysis JSON built from the transcript's user lines."""
+    user_lines = [line.strip() for line in USER_LINE.findall(prompt)]
+    data = {field: list(default) if isinstance(default, list) else default
+            for field, default in ACHIEVEMENT_FIELDS.items()}
+    data['achievements'] = user_lines[:8]
+    data['quantifiable_metrics'] = [line for line in user_lines if re.search(r'\d', line)][:8]
+    data['leadership_details'] = [line for line in user_lines if re.search(r'\b(led|supervis|train)', line, re.I)][:5]
+    data['scope'] = 'Unit level'
+    data['time_period'] = '12 months'
+    return json.dumps(data)
+
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if self.path.rstrip('/') != '/v1/chat/completions':
+            self._send_json(404, {'error': {'message': f'Unknown path {self.path}', 'type': 'invalid_request_error'}})
+            return
+
+        length = int(self.headers.get('Content-Length') or 0)
+        request = json.loads(self.rfile.read(length) or b'{}')
+        model = request.get('model', 'mock')
+        messages = request.get('messages', [])
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        prompt_tokens = sum(estimate_tokens(msg.get('content') or '') for msg in messages)
+
+        fault = self.server.inject_fault()
+        if fault == 'timeout':
+            time.sleep(self.server.hang)
+            self.close_connection = True  # drop the request without an answer
+            return
+        retry_after = 1.0 if fault == 'rate_limit' else \
+            self.server.admit(prompt_tokens + (request.get('max_tokens') or estimate_tokens(self.server.reply)))
+        if retry_after is not None:
+            self._send_rate_limited(retry_after)
+            return
+
+        reply = self.server.reply_for(request)
+        tokens = reply.split(' ')
+        time.sleep(self.server.sample_latency())
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': len(tokens),
+                 'total_tokens': prompt_tokens + len(tokens)}
+        if request.get('stream'):
+            include_usage = (request.get('stream_options') or {}).get('include_usage')
+            self._stream(completion_id, model, tokens, usage if include_usage else None)
+        else:
+            time.sleep(self.server.token_delay * len(tokens))
+            self._send_json(200, {
+                'id': completion_id,
+                'object': 'chat.completion',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{
+                    'index': 0,
+                    'message': {'role': 'assistant', 'content': reply},
+                    'finish_reason': 'stop',
+                }],
+                'usage': usage,
+            })
+
+    def _send_rate_limited(self, retry_after):
+        self._send_json(429, {'error': {
+            'message': f'Rate limit reached. Please try again in {retry_after:.1f}s.',
+            'type': 'requests',
+            'code': 'rate_limit_exceeded',
+        }}, headers={'Retry-After': str(math.ceil(retry_after)), 'Retry-After-Ms': str(int(retry_after * 1000))})
+
+    def _stream(self, completion_id, model, tokens, usage=None):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def chunk(delta, finish_reason=None, usage=None):
+            payload = {
+                'id': completion_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}] if delta is not None else [],
+            }
+            if usage:
+                payload['usage'] = usage
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        try:
+            chunk({'role': 'assistant', 'content': ''})
+            for i, token in enumerate(tokens):
+                chunk({'content': token if i == 0 else ' ' + token})
+                time.sleep(self.server.token_delay)
+            chunk({}, finish_reason='stop')
+            if usage:
+                chunk(None, usage=usage)  # like stream_options.include_usage
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering chat completion requests with fixture, synthesized or canned replies."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, think: float = 1.0,
+                 token_delay: float = 0.02, reply: str = DEFAULT_REPLY, verbose: bool = False,
+                 rpm: Optional[int] = None, tpm: Optional[int] = None, quota_period: float = 60.0,
+                 latency: str = 'fixed', jitter: float = 0.5, fixtures: Optional[str] = None,
+                 record_from: Optional[str] = None, rate_limit_rate: float = 0.0,
+                 timeout_rate: float = 0.0, hang: float = 120.0, seed: Optional[int] = None):
+        super().__init__((host, port), MockLLMHandler)
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency must be one of {LATENCY_DISTRIBUTIONS}")
+        self.think = think
+        self.token_delay = token_delay
+        self.reply = reply
+        self.verbose = verbose
+        self.rpm = rpm
+        self.tpm = tpm
+        self.quota_period = quota_period
+        self.latency = latency
+        self.jitter = jitter
+        self.fixtures = fixtures
+        self.record_from = record_from
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self.hang = hang
+        if fixtures:
+            os.makedirs(fixtures, exist_ok=True)
+
+        self._thread = None
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._window: deque = deque()  # (time, tokens) of admitted requests
+        self.served = 0
+        self.rate_limited = 0
+        self.counts = {'fixture': 0, 'recorded': 0, 'synthesized': 0, 'canned': 0,
+                       'injected_rate_limits': 0, 'injected_timeouts': 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def sample_latency(self) -> float:
+        """Seconds before the first token: think exactly, uniformly ± jitter, or lognormal with median think."""
+        with self._lock:
+            if self.latency == 'uniform':
+                return max(0.0, self._random.uniform(self.think * (1 - self.jitter), self.think * (1 + self.jitter)))
+            if self.latency == 'lognormal':
+                return self.think * self._random.lognormvariate(0, self.jitter)
+            return self.think
+
+    def inject_fault(self) -> Optional[str]:
+        """'rate_limit', 'timeout' or None, at the configured rates."""
+        with self._lock:
+            draw = self._random.random()
+        if draw < self.rate_limit_rate:
+            self._count('injected_rate_limits')
+            return 'rate_limit'
+        if draw < self.rate_limit_rate + self.timeout_rate:
+            self._count('injected_timeouts')
+            return 'timeout'
+        return None
+
+    def admit(self, tokens: int) -> Optional[float]:
+        """Count a request against the quotas; returns seconds to wait if it exceeds them."""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and self._window[0][0] <= now - self.quota_period:
+                self._window.popleft()
+
+            over_requests = self.rpm is not None and len(self._window) + 1 > self.rpm
+            over_tokens = self.tpm is not None and sum(t for _, t in self._window) + tokens > self.tpm
+            if over_requests or over_tokens:
+                self.rate_limited += 1
+                # Until the oldest admitted request leaves the window
+                oldest = self._window[0][0] if self._window else now
+                return max(0.1, oldest + self.quota_period - now)
+
+            self._window.append((now, tokens))
+            self.served += 1
+            return None
+
+    def reply_for(self, request: Dict[str, Any]) -> str:
+        messages = request.get('messages', [])
+        if self.fixtures:
+            path = os.path.join(self.fixtures, prompt_hash(messages) + '.json')
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    self._count('fixture')
+                    return json.load(f)['content']
+            if self.record_from:
+                content = self._record(request, path)
+                if content is not None:
+                    return content
+
+        prompt = '\n'.join(msg.get('content') or '' for msg in messages)
+        if ANALYSIS_MARKER in prompt:
+            self._count('synthesized')
+            return synthesize_analysis(prompt)
+        if SUGGESTIONS_MARKER in prompt:
+            self._count('synthesized')
+            return json.dumps(SUGGESTIONS)
+        self._count('canned')
+        return self.reply
+
+    def _record(self, request: Dict[str, Any], path: str) -> Optional[str]:
+        """Fetch the reply from the upstream API and save it as a fixture."""
+        upstream = dict(request, stream=False)
+        http_request = urllib.request.Request(
+            self.record_from.rstrip('/') + '/chat/completions', data=json.dumps(upstream).encode('utf-8'),
+            headers={'Content-Type': 'application/json',
+                     'Authorization': f"Bearer {os.getenv('OPENAI_API_KEY', '')}"})
+        try:
+            with urllib.request.urlopen(http_request, timeout=120) as response:
+                content = json.loads(response.read())['choices'][0]['message']['content']
+        except Exception as e:
+            print(f"Recording from {self.record_from} failed: {e}")
+            return None
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'content': content, 'model': request.get('model')}, f, indent=2)
+        self._count('recorded')
+        return content
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.counts, served=self.served, rate_limited=self.rate_limited)
+
+    def start(self) -> 'MockLLMServer':
+        """Serve from a background thread and return self."""
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-llm-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--think', type=float, default=1.0, help='seconds before the first token (median)')
+    parser.add_argument('--latency', choices=LATENCY_DISTRIBUTIONS, default='fixed',
+                        help='distribution of the thinking delay')
+    parser.add_argument('--jitter', type=float, default=0.5,
+                        help='relative spread for uniform, sigma for lognormal latency')
+    parser.add_argument('--token-delay', type=float, default=0.02, help='seconds between tokens')
+    parser.add_argument('--fixtures', help='directory of recorded replies keyed by prompt hash')
+    parser.add_argument('--record-from', help='API base URL to record missing fixtures from')
+    parser.add_argument('--rpm', type=int, help='requests allowed per quota period')
+    parser.add_argument('--tpm', type=int, help='tokens allowed per quota period')
+    parser.add_argument('--quota-period', type=float, default=60.0, help='seconds per quota period')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='fraction of requests answered 429')
+    parser.add_argument('--timeout-rate', type=float, default=0.0, help='fraction of requests left hanging')
+    parser.add_argument('--hang', type=float, default=120.0, help='seconds a hanging request is held')
+    parser.add_argument('--seed', type=int, help='random seed for latency and faults')
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    server = MockLLMServer(args.host, args.port, think=args.think, token_delay=args.token_delay,
+                           verbose=args.verbose, rpm=args.rpm, tpm=args.tpm, quota_period=args.quota_period,
+                           latency=args.latency, jitter=args.jitter, fixtures=args.fixtures,
+                           record_from=args.record_from, rate_limit_rate=args.rate_limit_rate,
+                           timeout_rate=args.timeout_rate, hang=args.hang, seed=args.seed)
+    print(f"Mock LLM server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,385 @@
+"""
+In-process stand-in for a Redis-compatible server.
+
+Implements the subset of commands used by the session store so the networked
+backend can be tested and benchmarked without a real Redis install:
+
+    python src/mock_resp_server.py --port 6390
+"""
+
+import argparse
+import fnmatch
+import socket
+import socketserver
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+class _Store:
+    """Keyspace with lazy, millisecond-resolution expiry."""
+
+    def __init__(self):
+        self.data: Dict[bytes, Any] = {}
+        self.expires: Dict[bytes, float] = {}
+        # Bumped on every write to a key, so WATCH can tell it changed
+        self.revisions: Dict[bytes, int] = {}
+        self.lock = threading.Lock()
+
+    def _alive(self, key: bytes) -> bool:
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.time():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+            return False
+        return key in self.data
+
+    def get(self, key: bytes, kind: type = None):
+        if not self._alive(key):
+            return None
+        value = self.data[key]
+        if kind is not None and not isinstance(value, kind):
+            raise _WrongType()
+        return value
+
+    def remove(self, key: bytes) -> bool:
+        self.expires.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+
+# Commands that modify the keys they name (all arguments for DEL, else the first)
+WRITE_COMMANDS = {'SET', 'DEL', 'EXPIRE', 'PEXPIRE', 'PERSIST', 'INCR', 'INCRBY',
+                  'HSET', 'HMSET', 'HSETNX', 'HDEL', 'HINCRBY'}
+
+
+class _WrongType(Exception):
+    pass
+
+
+class _CommandError(Exception):
+    pass
+
+
+def _int(value: bytes) -> int:
+    try:
+        return int(value)
+    except ValueError:
+        raise _CommandError("ERR value is not an integer or out of range")
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        while True:
+            try:
+                args = self._read_command()
+            except (ConnectionError, OSError):
+                return
+            if args is None:
+                return
+            self.wfile.write(self._dispatch(args))
+
+    def _read_command(self) -> Optional[list]:
+        line = self.rfile.readline()
+        if not line:
+            return None
+        if not line.startswith(b'*'):
+            # Inline command, e.g. from telnet
+            return line.split()
+        args = []
+        for _ in range(int(line[1:-2])):
+            header = self.rfile.readline()
+            length = int(header[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _dispatch(self, args: list) -> bytes:
+        if not args:
+            return _error("ERR empty command")
+        name = args[0].decode('ascii', 'replace').upper()
+        store = self.server.store
+
+        # WATCH: remember the keys' revisions; EXEC aborts if any changed
+        if name == 'WATCH':
+            with store.lock:
+                self._watched = getattr(self, '_watched', None) or {}
+                self._watched.update((key, store.revisions.get(key, 0)) for key in args[1:])
+            return b'+OK\r\n'
+        if name == 'UNWATCH':
+            self._watched = None
+            return b'+OK\r\n'
+
+        # MULTI/EXEC: queue commands and run them under a single lock hold
+        if name == 'MULTI':
+            self._queued = []
+            return b'+OK\r\n'
+        queued = getattr(self, '_queued', None)
+        if queued is not None:
+            if name == 'DISCARD':
+                self._queued = self._watched = None
+                return b'+OK\r\n'
+            if name != 'EXEC':
+                queued.append((name, args[1:]))
+                return b'+QUEUED\r\n'
+            watched = getattr(self, '_watched', None) or {}
+            self._queued = self._watched = None
+            with store.lock:
+                if any(store.revisions.get(key, 0) != revision for key, revision in watched.items()):
+                    return b'*-1\r\n'
+                replies = [self._run(store, queued_name, queued_args) for queued_name, queued_args in queued]
+            return b'*%d\r\n' % len(replies) + b''.join(replies)
+        if name == 'EXEC':
+            return _error("ERR EXEC without MULTI")
+
+        with store.lock:
+            return self._run(store, name, args[1:])
+
+    def _run(self, store, name: str, args: list) -> bytes:
+        method = getattr(self, f'cmd_{name.lower()}', None)
+        if method is None:
+            return _error(f"ERR unknown command '{name}'")
+        try:
+            reply = method(store, *args)
+        except _WrongType:
+            return _error("WRONGTYPE Operation against a key holding the wrong kind of value")
+        except _CommandError as e:
+            return _error(str(e))
+        except TypeError:
+            return _error(f"ERR wrong number of arguments for '{name.lower()}' command")
+        if name in WRITE_COMMANDS:
+            for key in (args if name == 'DEL' else args[:1]):
+                store.revisions[key] = store.revisions.get(key, 0) + 1
+        return reply
+
+    # Connection -----------------------------------------------------------
+
+    def cmd_ping(self, store, message=None):
+        return _bulk(message) if message is not None else b'+PONG\r\n'
+
+    def cmd_auth(self, store, *credentials):
+        return b'+OK\r\n'
+
+    def cmd_select(self, store, db):
+        return b'+OK\r\n'
+
+    def cmd_flushdb(self, store, *options):
+        store.data.clear()
+        store.expires.clear()
+        return b'+OK\r\n'
+
+    def cmd_dbsize(self, store):
+        return _integer(sum(1 for key in list(store.data) if store._alive(key)))
+
+    # Keys -----------------------------------------------------------------
+
+    def cmd_del(self, store, *keys):
+        return _integer(sum(1 for key in keys if store._alive(key) and store.remove(key)))
+
+    def cmd_exists(self, store, *keys):
+        return _integer(sum(1 for key in keys if store._alive(key)))
+
+    def cmd_keys(self, store, pattern):
+        pattern = pattern.decode('utf-8')
+        return _array([key for key in list(store.data)
+                       if store._alive(key) and fnmatch.fnmatchcase(key.decode('utf-8'), pattern)])
+
+    def cmd_expire(self, store, key, seconds):
+        return self.cmd_pexpire(store, key, str(_int(seconds) * 1000).encode())
+
+    def cmd_pexpire(self, store, key, millis):
+        if not store._alive(key):
+            return _integer(0)
+        store.expires[key] = time.time() + _int(millis) / 1000.0
+        return _integer(1)
+
+    def cmd_persist(self, store, key):
+        return _integer(1 if store._alive(key) and store.expires.pop(key, None) else 0)
+
+    def cmd_ttl(self, store, key):
+        return self._ttl(store, key, 1)
+
+    def cmd_pttl(self, store, key):
+        return self._ttl(store, key, 1000)
+
+    def _ttl(self, store, key, scale):
+        if not store._alive(key):
+            return _integer(-2)
+        deadline = store.expires.get(key)
+        if deadline is None:
+            return _integer(-1)
+        return _integer(int(round((deadline - time.time()) * scale)))
+
+    # Strings --------------------------------------------------------------
+
+    def cmd_get(self, store, key):
+        return _bulk(store.get(key, bytes))
+
+    def cmd_mget(self, store, *keys):
+        values = []
+        for key in keys:
+            value = store.get(key)
+            values.append(value if isinstance(value, bytes) else None)
+        return _array(values)
+
+    def cmd_set(self, store, key, value, *options):
+        expires_at = None
+        mode = None
+        options = [opt.upper() for opt in options]
+        i = 0
+        while i < len(options):
+            opt = options[i]
+            if opt in (b'EX', b'PX'):
+                amount = _int(options[i + 1])
+                expires_at = time.time() + (amount if opt == b'EX' else amount / 1000.0)
+                i += 2
+                continue
+            if opt in (b'NX', b'XX'):
+                mode = opt
+            i += 1
+
+        exists = store._alive(key)
+        if (mode == b'NX' and exists) or (mode == b'XX' and not exists):
+            return _bulk(None)
+
+        store.data[key] = value
+        store.expires.pop(key, None)
+        if expires_at is not None:
+            store.expires[key] = expires_at
+        return b'+OK\r\n'
+
+    def cmd_incr(self, store, key):
+        return self.cmd_incrby(store, key, b'1')
+
+    def cmd_incrby(self, store, key, amount):
+        current = store.get(key, bytes)
+        value = _int(current or b'0') + _int(amount)
+        store.data[key] = str(value).encode()
+        return _integer(value)
+
+    # Hashes ---------------------------------------------------------------
+
+    def _hash(self, store, key, create=False) -> Optional[dict]:
+        value = store.get(key, dict)
+        if value is None and create:
+            value = store.data[key] = {}
+        return value
+
+    def cmd_hset(self, store, key, *pairs):
+        if not pairs or len(pairs) % 2:
+            raise TypeError()
+        mapping = self._hash(store, key, create=True)
+        added = 0
+        for field, value in zip(pairs[::2], pairs[1::2]):
+            added += field not in mapping
+            mapping[field] = value
+        return _integer(added)
+
+    cmd_hmset = cmd_hset
+
+    def cmd_hsetnx(self, store, key, field, value):
+        mapping = self._hash(store, key, create=True)
+        if field in mapping:
+            return _integer(0)
+        mapping[field] = value
+        return _integer(1)
+
+    def cmd_hget(self, store, key, field):
+        return _bulk((self._hash(store, key) or {}).get(field))
+
+    def cmd_hmget(self, store, key, *fields):
+        mapping = self._hash(store, key) or {}
+        return _array([mapping.get(field) for field in fields])
+
+    def cmd_hgetall(self, store, key):
+        mapping = self._hash(store, key) or {}
+        flat = []
+        for field, value in mapping.items():
+            flat.extend((field, value))
+        return _array(flat)
+
+    def cmd_hdel(self, store, key, *fields):
+        mapping = self._hash(store, key) or {}
+        removed = sum(1 for field in fields if mapping.pop(field, None) is not None)
+        if not mapping:
+            store.remove(key)
+        return _integer(removed)
+
+    def cmd_hlen(self, store, key):
+        return _integer(len(self._hash(store, key) or {}))
+
+    def cmd_hincrby(self, store, key, field, amount):
+        mapping = self._hash(store, key, create=True)
+        value = _int(mapping.get(field, b'0')) + _int(amount)
+        mapping[field] = str(value).encode()
+        return _integer(value)
+
+
+def _error(message: str) -> bytes:
+    return f"-{message}\r\n".encode('utf-8')
+
+
+def _integer(value: int) -> bytes:
+    return b':%d\r\n' % value
+
+
+def _bulk(value: Optional[bytes]) -> bytes:
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def _array(values) -> bytes:
+    return b'*%d\r\n' % len(values) + b''.join(_bulk(value) for value in values)
+
+
+class MockRespServer(socketserver.ThreadingTCPServer):
+    """Threaded TCP server speaking enough RESP for the session store."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0):
+        super().__init__((host, port), _Handler)
+        self.store = _Store()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"redis://{host}:{port}/0"
+
+    def start(self) -> 'MockRespServer':
+        """Serve from a background thread and return self."""
+        self._thread = threading.Thread(target=self.serve_forever, name='mock-resp-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Redis-compatible stand-in server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=6390)
+    args = parser.parse_args()
+
+    server = MockRespServer(args.host, args.port)
+    print(f"Mock RESP server listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
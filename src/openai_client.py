@@ -7,7 +7,7 @@ import sys
 import json
 import time
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from pathlib import Path
 
 # Add the src directory to Python path for imports to work in both local and deployed environments
@@ -26,6 +26,14 @@ from openai import (
     APIStatusError
 )
 
+from achievement_extraction import ACHIEVEMENT_FIELDS, build_analysis_prompt, merge_achievement_data
+from async_openai_client import REQUEST_TIMEOUT, AsyncOpenAIClient, LoopUnavailable
+from config import is_local_base_url
+from llm_cache import create_llm_cache, request_key
+from llm_telemetry import llm_telemetry
+from rate_limiter import estimate_request_tokens, rate_limiter, retry_after_seconds
+from single_flight import get_single_flight
+
 # Import citation formatter at module level
 try:
     from citation_formatter import CitationFormatter
@@ -38,6 +46,8 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_MODEL = "o4-mini-2025-04-16"
+
 
 class OpenAIClient:
     """
@@ -47,22 +57,41 @@ class OpenAIClient:
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        base_url = os.getenv("OPENAI_BASE_URL") or None  # e.g. a local mock server
         if not self.api_key:
-            raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
+            if not is_local_base_url(base_url):
+                raise ValueError("OpenAI API key not found. Set OPENAI_API_KEY environment variable.")
+            self.api_key = "local"  # the local server ignores credentials
         
         # Initialize the new OpenAI client with increased timeout for O4 models
         self.client = OpenAI(
             api_key=self.api_key,
-            timeout=90.0,  # Increased timeout for O4 reasoning models
+            base_url=base_url,
+            timeout=REQUEST_TIMEOUT,  # Increased timeout for O4 reasoning models
             max_retries=0  # We handle retries ourselves
         )
-        self.model = os.getenv("OPENAI_MODEL", "o4-mini-2025-04-16")
+        self.model = os.getenv("OPENAI_MODEL", DEFAULT_MODEL)
         self.max_retries = 3
         self.retry_delay = 1  # seconds
+        # Completions of repeatable calls (analysis, suggestions, drafting)
+        self.cache = create_llm_cache()
+        # Identical concurrent requests share one call, across workers via leases beside the cache
+        self.single_flight = get_single_flight(
+            os.path.join(self.cache.store.directory, 'leases') if self.cache else None)
+        # Route calls through the process-wide async client (see async_openai_client)
+        self.use_async = os.getenv("OPENAI_ASYNC", "true").lower() == "true"
+        self._aio = None
         
         # Check if using a reasoning model (O1 or O4 series)
         self.is_reasoning_model = self.model.startswith(('o1-preview', 'o1-mini', 'o4-preview', 'o4-mini', 'o4-mini-2025'))
 
+    @property
+    def aio(self):
+        """Async variant sharing this client's model, request building, cache and error handling."""
+        if self._aio is None:
+            self._aio = AsyncOpenAIClient(self)
+        return self._aio
+
     def _handle_api_error(self, error: Exception, context: str) -> Dict:
         """Handle various OpenAI API errors with appropriate responses."""
         error_message = str(error)
@@ -91,9 +120,9 @@ class OpenAIClient:
             logger.error(f"Unexpected error during {context}: {error_message}", exc_info=True)
             return {"error": f"An unexpected error occurred: {error_message}"}
 
-    def _make_api_call(self, messages: List[Dict], temperature: float = 0.7, 
-                      max_tokens: Optional[int] = None, context: str = "API call") -> Dict:
-        """Make an API call with retry logic."""
+    def _build_request(self, messages: List[Dict], temperature: float = 0.7,
+                       max_tokens: Optional[int] = None) -> Dict:
+        """Build the chat completion arguments for the configured model."""
         # Prepare messages for reasoning models
         if self.is_reasoning_model:
             # O1 models don't support system messages, merge them into user messages
@@ -123,19 +152,73 @@ class OpenAIClient:
         else:
             logger.info(f"Using standard model {self.model}")
         
+        kwargs = {
+            "model": self.model,
+            "messages": messages
+        }
+        
+        # O1 models don't support temperature or max_tokens
+        if not self.is_reasoning_model:
+            kwargs["temperature"] = temperature
+            if max_tokens:
+                kwargs["max_tokens"] = max_tokens
+        
+        return kwargs
+
+    def _make_api_call(self, messages: List[Dict], temperature: float = 0.7, 
+                      max_tokens: Optional[int] = None, context: str = "API call",
+                      refresh: bool = False, timeout: Optional[float] = None) -> Dict:
+        """
+        Make an API call with retry logic.
+
+        Responses for contexts with a cache policy are served from the LLM
+        cache when an identical request was made before; refresh skips the
+        lookup but still stores the new response. Identical requests already
+        in flight are joined rather than repeated. With a timeout, a call on
+        the async loop that takes longer, retries included, is cancelled and
+        concurrent.futures.TimeoutError is raised.
+        """
+        kwargs = self._build_request(messages, temperature, max_tokens)
+        
+        if self.cache:
+            cached = self.cache.get(kwargs, context, refresh=refresh)
+            if cached is not None:
+                logger.info(f"Serving {context} from LLM response cache")
+                llm_telemetry.record_cache_hit(context, kwargs["model"])
+                return cached
+        
+        def send():
+            result = None
+            if self.use_async:
+                try:
+                    # Shared connection pool and concurrency limit; backoff does not block other calls
+                    result = self.aio.run(self.aio.complete(kwargs, context), timeout)
+                except LoopUnavailable as e:
+                    logger.warning(f"{e}; sending {context} synchronously")
+            if result is None:
+                result = self._complete(kwargs, context)
+            
+            if self.cache and "error" not in result and result.get("content"):
+                self.cache.set(kwargs, context, result)
+            return result
+        
+        # Another worker's result is only visible through the cache
+        lookup = None
+        if self.cache and self.cache.enabled_for(context):
+            lookup = lambda: self.cache.store.get(request_key(kwargs))
+        return self.single_flight.do(request_key(kwargs) + (":refresh" if refresh else ""), send, lookup)
+
+    def _complete(self, kwargs: Dict, context: str) -> Dict:
+        """Send a prepared request on this thread, retrying rate limits and timeouts."""
+        estimated = estimate_request_tokens(kwargs)
+        call = llm_telemetry.start(context, kwargs["model"])
         for attempt in range(self.max_retries):
+            if rate_limiter:
+                wait = rate_limiter.reserve(estimated)
+                while wait > 0:
+                    time.sleep(wait)
+                    wait = rate_limiter.reserve(estimated)
             try:
-                kwargs = {
-                    "model": self.model,
-                    "messages": messages
-                }
-                
-                # O1 models don't support temperature or max_tokens
-                if not self.is_reasoning_model:
-                    kwargs["temperature"] = temperature
-                    if max_tokens:
-                        kwargs["max_tokens"] = max_tokens
-                
                 # Log API call details
                 logger.info(f"Making OpenAI API call (attempt {attempt + 1}/{self.max_retries}) for {context}")
                 start_time = time.time()
@@ -145,24 +228,35 @@ class OpenAIClient:
                 # Log successful response time
                 elapsed_time = time.time() - start_time
                 logger.info(f"OpenAI API call completed in {elapsed_time:.2f}s for {context}")
+                if rate_limiter and getattr(response, 'usage', None):
+                    rate_limiter.adjust(response.usage.total_tokens - estimated)
+                call.succeeded(getattr(response, 'usage', None))
                 
                 return response.choices[0].message.model_dump()
                 
             except RateLimitError as e:
+                retry_after = retry_after_seconds(e)
+                if retry_after and rate_limiter:
+                    rate_limiter.block_for(retry_after)
                 if attempt < self.max_retries - 1:
-                    delay = self.retry_delay * (2 ** attempt)  # Exponential backoff
+                    delay = max(retry_after or 0, self.retry_delay * (2 ** attempt))  # Exponential backoff
                     logger.info(f"Rate limit hit, retrying in {delay} seconds...")
+                    call.retried()
                     time.sleep(delay)
                     continue
+                call.failed(e)
                 return self._handle_api_error(e, context)
                 
             except Exception as e:
                 if attempt < self.max_retries - 1 and "timeout" in str(e).lower():
                     logger.info(f"Timeout on attempt {attempt + 1}, retrying...")
+                    call.retried()
                     time.sleep(self.retry_delay)
                     continue
+                call.failed(e)
                 return self._handle_api_error(e, context)
         
+        call.failed("RetriesExhausted")
         return {"error": f"Failed after {self.max_retries} attempts"}
 
     def chat_completion(self, messages: List[Dict]) -> Dict:
@@ -178,119 +272,135 @@ class OpenAIClient:
             "content": result.get("content", "I understand. Please continue.")
         }
 
-    def analyze_achievements(self, messages: List[Dict], awardee_info: Dict, 
-                           refresh: bool = False) -> Dict:
+    def stream_chat_completion(self, messages: List[Dict], context: str = "chat stream") -> Iterator[str]:
         """
-        Enhanced analysis with better conversation processing and comprehensive extraction.
+        Stream a chat completion, yielding content fragments as they arrive.
+
+        Failures before the first fragment are retried like _make_api_call.
+        Otherwise the user-facing error message is yielded as the last
+        fragment, mirroring chat_completion. Closing the generator closes the
+        upstream stream.
         """
-        # Separate user content from assistant responses
-        user_content = []
-        conversation_flow = []
-        user_inputs = []
-        
-        for i, msg in enumerate(messages):
-            role = msg.get('role', 'unknown')
-            content = msg.get('content', '').strip()
-            
-            if role == 'user' and content:
-                user_content.append(content)
-                user_inputs.append(content)
-                conversation_flow.append(f"USER {i}: {content}")
-            elif role == 'assistant' and content:
-                conversation_flow.append(f"ASSISTANT {i}: {content}")
+        kwargs = self._build_request(messages, temperature=0.7)
+        estimated = estimate_request_tokens(kwargs)
+        call = llm_telemetry.start(context, kwargs["model"], streamed=True)
         
-        # Build comprehensive conversation text
-        conversation_text = '\n'.join(conversation_flow)
-        
-        # Enhanced prompt with comprehensive extraction
-        base_prompt = f"""
-You are an expert Coast Guard personnel analyst. Analyze this complete conversation 
-to extract ALL achievements, impacts, and award-relevant details.
+        for attempt in range(self.max_retries):
+            started = False
+            usage = None
+            if rate_limiter:
+                wait = rate_limiter.reserve(estimated)
+                while wait > 0:
+                    time.sleep(wait)
+                    wait = rate_limiter.reserve(estimated)
+            try:
+                logger.info(f"Making streaming OpenAI API call (attempt {attempt + 1}/{self.max_retries}) for {context}")
+                start_time = time.time()
+                
+                # The last chunk then carries token usage (and no choices)
+                stream = self.client.chat.completions.create(stream=True, stream_options={"include_usage": True},
+                                                             **kwargs)
+                try:
+                    for chunk in stream:
+                        if getattr(chunk, 'usage', None):
+                            usage = chunk.usage
+                        if not chunk.choices:
+                            continue
+                        delta = chunk.choices[0].delta.content
+                        if delta:
+                            if not started:
+                                started = True
+                                logger.info(f"First token after {time.time() - start_time:.2f}s for {context}")
+                            yield delta
+                except GeneratorExit:
+                    call.failed("ClientDisconnected")
+                    raise
+                finally:
+                    stream.close()
+                
+                logger.info(f"OpenAI stream completed in {time.time() - start_time:.2f}s for {context}")
+                if rate_limiter and usage:
+                    rate_limiter.adjust(usage.total_tokens - estimated)
+                call.succeeded(usage)
+                return
+                
+            except RateLimitError as e:
+                retry_after = retry_after_seconds(e)
+                if retry_after and rate_limiter:
+                    rate_limiter.block_for(retry_after)
+                if not started and attempt < self.max_retries - 1:
+                    delay = max(retry_after or 0, self.retry_delay * (2 ** attempt))  # Exponential backoff
+                    logger.info(f"Rate limit hit, retrying in {delay} seconds...")
+                    call.retried()
+                    time.sleep(delay)
+                    continue
+                call.failed(e)
+                yield self._handle_api_error(e, context)["error"]
+                return
+                
+            except Exception as e:
+                if not started and attempt < self.max_retries - 1 and "timeout" in str(e).lower():
+                    logger.info(f"Timeout on attempt {attempt + 1}, retrying...")
+                    call.retried()
+                    time.sleep(self.retry_delay)
+                    continue
+                call.failed(e)
+                yield self._handle_api_error(e, context)["error"]
+                return
 
-AWARDEE INFORMATION:
-{json.dumps(awardee_info, indent=2)}
+    def summarize_conversation(self, summary: str, messages: List[Dict]) -> Optional[str]:
+        """
+        Fold messages into the running summary of an interview.
+
+        Returns the new summary, or None if the call failed.
+        """
+        transcript = "\n".join(f"{msg.get('role', 'unknown').upper()}: {msg.get('content', '').strip()}"
+                               for msg in messages if msg.get('content'))
+        prompt = f"""
+Update the running summary of an interview documenting a Coast Guard member's achievements for an award.
+
+CURRENT SUMMARY:
+{summary or "None yet."}
+
+NEW MESSAGES:
+{transcript}
 
-FULL CONVERSATION:
-{conversation_text}
-
-Extract comprehensive data and return ONLY valid JSON with this EXACT structure:
-{{
-    "achievements": [
-        "List ALL significant accomplishments, projects, initiatives, and responsibilities mentioned"
-    ],
-    "impacts": [
-        "List ALL quantifiable results, outcomes, improvements, and benefits mentioned"
-    ],
-    "leadership_details": [
-        "List ALL leadership roles, supervision, training provided, and management responsibilities"
-    ],
-    "innovation_details": [
-        "List ALL creative solutions, new processes, improvements, and first-time initiatives"
-    ],
-    "challenges": [
-        "List ALL obstacles, difficulties, constraints, and complex situations overcome"
-    ],
-    "scope": "Detailed description of organizational reach (individual/unit/sector/district/area/coast guard-wide/national/international)",
-    "time_period": "Duration or timeframe of accomplishments (be specific: days/weeks/months/years)",
-    "valor_indicators": [
-        "List ONLY actual life-saving actions, rescue operations where lives were saved, or heroic acts during real emergencies (NOT prevention, planning, or potential hazards)"
-    ],
-    "quantifiable_metrics": [
-        "List ALL specific numbers, percentages, dollar amounts, time savings, or measurable results"
-    ],
-    "awards_received": [
-        "List ANY awards, commendations, recognitions, or formal acknowledgments mentioned"
-    ],
-    "collaboration": [
-        "List inter-agency work, joint operations, multi-unit coordination, or external partnerships"
-    ],
-    "training_provided": [
-        "List training delivered to others, knowledge transfer, mentoring, or skill development activities"
-    ],
-    "above_beyond_indicators": [
-        "List ANY voluntary overtime, extra duties, personal sacrifice, or exceptional effort beyond normal duties"
-    ],
-    "emergency_response": [
-        "List ANY emergency situations, crisis response, urgent missions, or time-critical operations"
-    ],
-    "justification": "Comprehensive summary explaining why these accomplishments are significant and noteworthy for Coast Guard awards"
-}}
-
-CRITICAL EXTRACTION INSTRUCTIONS:
-- Extract EVERY achievement mentioned, regardless of size or perceived importance
-- Include ALL quantifiable data: exact numbers, percentages, dollar amounts, timeframes, personnel counts
-- Capture leadership at ANY level: formal supervision, informal leadership, project management, team coordination
-- Note ANY innovation, process improvement, creative solution, or new approach
-- PRIORITIZE achievements with quantifiable impacts and measurable results
-- For each achievement, identify the ACTION (what was done), IMPACT (what changed), and RESULT (the measurable outcome)
-- Link achievements to their specific impacts whenever possible
-- Include ALL challenges: resource constraints, time pressure, difficult conditions, complex problems
-- Look for scope indicators: individual/team/unit/sector/district/area/coast guard-wide/national/international
-- Identify valor: life-saving, rescue operations, dangerous conditions, personal risk
-
-IMPORTANT CONTEXT - Coast Guard Rank Expectations:
-- Consider the awardee's rank when evaluating achievements
-- Junior enlisted (E-1 to E-4) are not expected to lead large teams or have organization-wide impact
-- Mid-level enlisted (E-5 to E-7) typically lead teams of 5-30 people and impact their unit
-- Senior enlisted (E-8 to E-9) lead larger groups and may have sector/district impact
-- Junior officers (O-1 to O-3) lead divisions/departments with unit-level impact
-- Senior officers (O-4+) are expected to have sector/district/area-wide impact
-- Be realistic about what constitutes exceptional performance for each rank level
-- Extract collaboration: inter-agency, joint operations, partnerships, coordination efforts
-- Find training activities: instruction given, mentoring provided, knowledge transfer
-- Identify above-and-beyond: voluntary work, extra hours, personal sacrifice, exceptional effort
-- Note emergency response: crisis situations, urgent missions, disaster response
-- Pay attention to IMPLIED accomplishments from context and follow-up details
-- Be specific and detailed - avoid generic statements
-
-Return ONLY the JSON object with no additional text, formatting, or explanations.
+Write the updated summary in at most 300 words. Keep every concrete fact: accomplishments, numbers,
+dates, people led, scope, and any document the user uploaded. Note open questions the assistant asked
+that are still unanswered. Return only the summary text.
 """
-        
-        if refresh:
-            base_prompt += "\n\nIMPORTANT: This is a REFRESH analysis. Provide alternative phrasing and extract any additional details that may have been missed in previous analysis. Look for subtle details, implied accomplishments, and context clues."
+        response = self._make_api_call(
+            messages=[
+                {"role": "system", "content": "You maintain concise, factual summaries of award interviews."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.2,
+            max_tokens=600,
+            context="conversation summary"
+        )
+        if "error" in response:
+            return None
+        return (response.get("content") or "").strip() or None
+
+    def analyze_achievements(self, messages: List[Dict], awardee_info: Dict, 
+                           refresh: bool = False, previous: Optional[Dict] = None,
+                           start: int = 0) -> Dict:
+        """
+        Enhanced analysis with better conversation processing and comprehensive extraction.
+
+        When previous data is given with start > 0, only messages[start:] are
+        analyzed and the new details are merged into previous. If that fails,
+        the whole conversation is analyzed instead.
+        """
+        incremental = previous is not None and start > 0
+        base_prompt, user_inputs = build_analysis_prompt(messages, awardee_info, refresh=refresh,
+                                                         previous=previous, start=start)
 
         try:
-            logger.info(f"Analyzing conversation with {len(conversation_flow)} exchanges")
+            if incremental:
+                logger.info(f"Analyzing {len(messages) - start} new messages of {len(messages)}")
+            else:
+                logger.info(f"Analyzing conversation with {len(messages)} messages")
             
             response = self._make_api_call(
                 messages=[
@@ -302,7 +412,8 @@ Return ONLY the JSON object with no additional text, formatting, or explanations
                 ],
                 temperature=0.1,  # Very low temperature for consistent extraction
                 max_tokens=3000,  # Increased token limit for comprehensive response
-                context="achievement analysis"
+                context="achievement analysis",
+                refresh=refresh
             )
             
             if "error" in response:
@@ -325,29 +436,13 @@ Return ONLY the JSON object with no additional text, formatting, or explanations
             # Parse the JSON response
             data = json.loads(content)
             
-            # Validate and ensure all required fields exist with proper defaults
-            required_fields = {
-                'achievements': [],
-                'impacts': [],
-                'leadership_details': [],
-                'innovation_details': [],
-                'challenges': [],
-                'scope': 'Not specified',
-                'time_period': 'Not specified',
-                'valor_indicators': [],
-                'quantifiable_metrics': [],
-                'awards_received': [],
-                'collaboration': [],
-                'training_provided': [],
-                'above_beyond_indicators': [],
-                'emergency_response': [],
-                'justification': 'Based on the provided accomplishments and their significance to Coast Guard operations'
-            }
+            if incremental:
+                data = merge_achievement_data(previous, data)
             
             # Ensure all fields exist and have proper values
-            for field, default_value in required_fields.items():
+            for field, default_value in ACHIEVEMENT_FIELDS.items():
                 if field not in data:
-                    data[field] = default_value
+                    data[field] = list(default_value) if isinstance(default_value, list) else default_value
                 elif not data[field] and isinstance(default_value, list):
                     data[field] = []
                 elif not data[field] and isinstance(default_value, str):
@@ -374,6 +469,10 @@ Return ONLY the JSON object with no additional text, formatting, or explanations
             if 'content' in locals():
                 logger.debug(f"Raw OpenAI response: {content[:500]}...")
             
+            if incremental:
+                logger.info("Incremental analysis failed, analyzing the full conversation")
+                return self.analyze_achievements(messages, awardee_info, refresh=refresh)
+            
             # Comprehensive fallback structure
             fallback_data = {
                 "achievements": user_inputs if user_inputs else ["No achievements specified"],
@@ -396,8 +495,13 @@ Return ONLY the JSON object with no additional text, formatting, or explanations
             return fallback_data
 
     def generate_improvement_suggestions(self, award: str, achievement_data: Dict, 
-                                       awardee_info: Dict) -> List[str]:
-        """Generate specific improvement suggestions based on current data."""
+                                       awardee_info: Dict, timeout: Optional[float] = None) -> List[str]:
+        """
+        Generate specific improvement suggestions based on current data.
+
+        A model call still running after timeout seconds is cancelled and the
+        rule-based suggestions are returned.
+        """
         prompt = f"""
 You are a Coast Guard award writing expert. Based on the current achievement data and recommended award level, provide specific, actionable suggestions for improvement.
 
@@ -451,7 +555,8 @@ Return ONLY the JSON array, no other text.
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,
-                context="improvement suggestions"
+                context="improvement suggestions",
+                timeout=timeout
             )
             
             if "error" in response:
@@ -0,0 +1,168 @@
+"""
+Concurrent execution of independent request stages.
+
+A flow such as ``/api/improve`` is a list of stages that do not depend on
+each other: an LLM call, local scoring, storing a document. FlowRunner
+starts them together on a per-process thread pool and waits for each up to
+its own timeout, counted from when the stage gets a thread (a stage still
+queued after its timeout is dropped). Only stages that wait on I/O, such as
+model calls, belong on the pool; quick pure-Python work runs inline in the
+request. A stage that times out or raises is replaced by its
+fallback, so the flow still returns partial results; stages without a
+fallback are required and their failure is raised. Each run
+records when every stage started and finished relative to the flow, which
+shows how much they overlapped. The timings are logged, and the latest run
+of each flow plus per-stage totals are available from ``stats()``.
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default time to wait for a stage that calls the model; below gunicorn's
+# 120s worker timeout so the request can still answer with the fallback
+LLM_STAGE_TIMEOUT = float(os.getenv('LLM_STAGE_TIMEOUT', '75'))
+
+OK = 'ok'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+
+class Stage(NamedTuple):
+    name: str
+    func: Callable[[], Any]
+    timeout: Optional[float] = None
+    # Called for the stage's result when it times out or raises; stages
+    # without one are required and their failure is raised from run()
+    fallback: Optional[Callable[[], Any]] = None
+
+
+class FlowResult(NamedTuple):
+    results: Dict[str, Any]
+    timings: List[Dict[str, Any]]
+    elapsed_ms: float
+
+    @property
+    def degraded(self) -> List[str]:
+        """Names of stages whose result came from a fallback."""
+        return [timing['stage'] for timing in self.timings if timing['status'] != OK]
+
+
+class FlowRunner:
+    """Runs the stages of a flow concurrently with per-stage timeouts and fallbacks."""
+
+    def __init__(self, max_workers: int = 8):
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._last: Dict[str, Dict[str, Any]] = {}
+        self._totals: Dict[str, Dict[str, Any]] = {}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Thread pool of this process (threads do not survive fork)."""
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='flow-stage')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def run(self, flow: str, stages: List[Stage]) -> FlowResult:
+        """Run stages concurrently and return their results once all finished or timed out."""
+        origin = time.perf_counter()
+        marks: Dict[str, List[float]] = {}
+        running = {stage.name: threading.Event() for stage in stages}
+
+        def timed(stage: Stage):
+            marks[stage.name] = [time.perf_counter() - origin]
+            running[stage.name].set()
+            try:
+                return stage.func()
+            finally:
+                marks[stage.name].append(time.perf_counter() - origin)
+
+        executor = self._get_executor()
+        futures = [(stage, executor.submit(timed, stage)) for stage in stages]
+
+        results = {}
+        timings = []
+        failure = None
+        for stage, future in futures:
+            status = OK
+            remaining = None
+            if stage.timeout is not None:
+                # The stage's clock starts when it gets a thread, not while queued
+                if running[stage.name].wait(stage.timeout):
+                    remaining = max(0.0, marks[stage.name][0] + stage.timeout - (time.perf_counter() - origin))
+                else:
+                    future.cancel()
+                    remaining = 0.0
+            try:
+                results[stage.name] = future.result(timeout=remaining)
+            except (FutureTimeout, CancelledError):
+                status = TIMEOUT
+                logger.warning(f"{flow}: stage {stage.name} timed out after {stage.timeout:.0f}s")
+                failure = failure or TimeoutError(f"{stage.name} did not finish within {stage.timeout:.0f}s")
+            except Exception as e:
+                status = ERROR
+                logger.error(f"{flow}: stage {stage.name} failed: {e}", exc_info=True)
+                failure = failure or e
+            if status != OK and stage.fallback is not None:
+                results[stage.name] = stage.fallback()
+
+            # A stage still running after its timeout has no end yet
+            started, finished = (marks.get(stage.name, []) + [None, None])[:2]
+            timings.append({
+                'stage': stage.name,
+                'status': status,
+                'start_ms': round(started * 1000, 1) if started is not None else None,
+                'end_ms': round(finished * 1000, 1) if finished is not None else None,
+            })
+
+        elapsed_ms = round((time.perf_counter() - origin) * 1000, 1)
+        logger.info(f"{flow} finished in {elapsed_ms:.0f} ms: " + ', '.join(
+            f"{t['stage']} {t['start_ms']}-{t['end_ms']} ms {t['status']}" for t in timings))
+        self._record(flow, timings, elapsed_ms)
+        if len(results) < len(stages):
+            raise failure
+        return FlowResult(results, timings, elapsed_ms)
+
+    def _record(self, flow: str, timings: List[Dict[str, Any]], elapsed_ms: float):
+        with self._lock:
+            self._last[flow] = {'elapsed_ms': elapsed_ms, 'stages': timings}
+            for timing in timings:
+                totals = self._totals.setdefault(f"{flow}.{timing['stage']}",
+                                                 {'runs': 0, 'timeouts': 0, 'errors': 0, 'finished': 0, 'total_ms': 0.0})
+                totals['runs'] += 1
+                totals['timeouts'] += timing['status'] == TIMEOUT
+                totals['errors'] += timing['status'] == ERROR
+                if timing['end_ms'] is not None:
+                    totals['finished'] += 1
+                    totals['total_ms'] += timing['end_ms'] - timing['start_ms']
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'last_run': {flow: dict(run) for flow, run in self._last.items()},
+                'stages': {
+                    name: {
+                        'runs': totals['runs'],
+                        'timeouts': totals['timeouts'],
+                        'errors': totals['errors'],
+                        # Over runs that finished; a timed-out stage has no duration
+                        'avg_ms': round(totals['total_ms'] / totals['finished'], 1) if totals['finished'] else None,
+                    }
+                    for name, totals in self._totals.items()
+                },
+            }
+
+
+# Global flow runner
+flow_runner = FlowRunner(max_workers=int(os.getenv('FLOW_STAGE_WORKERS', '16')))
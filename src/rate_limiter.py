@@ -0,0 +1,247 @@
+"""
+Client-side rate limiting for OpenAI calls.
+
+FileTokenBucket keeps request and token budgets (per minute by default) in
+one small state file, updated under an exclusive flock, so every gunicorn
+worker on the host draws from the same budget. A rate limit response with
+``Retry-After`` blocks the bucket for all workers until then, instead of
+each retrying on its own schedule.
+
+AdaptiveConcurrency limits how many calls one event loop has in flight
+(AIMD): the limit grows by about one per round of successful calls, and is
+cut multiplicatively on a 429 or when latency rises well above its running
+baseline.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+from disk_cache import CACHE_ROOT
+from retrieval import estimate_tokens
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; limits are then per process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+RPM_LIMIT = int(os.getenv('OPENAI_RPM_LIMIT', '500'))
+TPM_LIMIT = int(os.getenv('OPENAI_TPM_LIMIT', '200000'))
+# Length of the budget period in seconds (shortened only for load tests)
+LIMIT_PERIOD = float(os.getenv('OPENAI_RATE_LIMIT_PERIOD', '60'))
+STATE_FILE = os.getenv('OPENAI_RATE_LIMIT_FILE', os.path.join(CACHE_ROOT, 'openai_rate_limit.json'))
+ADAPTIVE = os.getenv('OPENAI_ADAPTIVE_CONCURRENCY', 'true').lower() == 'true'
+
+# Completion tokens assumed for calls without max_tokens
+DEFAULT_COMPLETION_TOKENS = 1000
+
+
+def estimate_request_tokens(kwargs: Dict[str, Any]) -> int:
+    """Estimated prompt plus completion tokens of a chat completion request."""
+    prompt = sum(estimate_tokens(message.get('content') or '') for message in kwargs.get('messages', []))
+    return prompt + (kwargs.get('max_tokens') or DEFAULT_COMPLETION_TOKENS)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by a rate limit error's Retry-After headers, if any."""
+    headers = getattr(getattr(error, 'response', None), 'headers', None) or {}
+    try:
+        if headers.get('retry-after-ms'):
+            return float(headers['retry-after-ms']) / 1000
+        value = headers.get('retry-after')
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class FileTokenBucket:
+    """Request and token buckets shared by all processes through a locked state file."""
+
+    def __init__(self, path: str, requests_per_period: int, tokens_per_period: int, period: float = 60.0):
+        self.path = path
+        self.requests_per_period = requests_per_period
+        self.tokens_per_period = tokens_per_period
+        self.period = period
+
+        self._lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.blocks = 0
+
+    def _open(self):
+        try:
+            return open(self.path, 'a+')
+        except FileNotFoundError:
+            # The state file's directory is created on first use
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            return open(self.path, 'a+')
+
+    def _update(self, change) -> Any:
+        """Apply change(state, now) to the refilled state under the file lock; returns its result."""
+        with self._lock, self._open() as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            f.seek(0)
+            now = time.time()
+            try:
+                state = json.loads(f.read() or '{}')
+            except ValueError:
+                state = {}
+
+            # Refill both buckets for the time since the last update
+            elapsed = max(0.0, now - state.get('updated', now))
+            state['requests'] = min(self.requests_per_period, state.get('requests', self.requests_per_period)
+                                    + elapsed * self.requests_per_period / self.period)
+            state['tokens'] = min(self.tokens_per_period, state.get('tokens', self.tokens_per_period)
+                                  + elapsed * self.tokens_per_period / self.period)
+            state['updated'] = now
+
+            result = change(state, now)
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps(state))
+            return result
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Take one request and tokens from the budget.
+
+        Returns 0 when granted, otherwise the seconds to wait before trying
+        again (nothing is taken).
+        """
+        tokens = min(tokens, self.tokens_per_period)  # larger requests could never fit
+
+        def take(state, now):
+            blocked = state.get('blocked_until', 0) - now
+            if blocked > 0:
+                return blocked
+            if state['requests'] >= 1 and state['tokens'] >= tokens:
+                state['requests'] -= 1
+                state['tokens'] -= tokens
+                return 0.0
+            request_wait = (1 - state['requests']) * self.period / self.requests_per_period
+            token_wait = (tokens - state['tokens']) * self.period / self.tokens_per_period
+            return max(request_wait, token_wait, 0.01)
+
+        wait = self._update(take)
+        if wait > 0:
+            with self._lock:
+                self.waits += 1
+                self.wait_seconds += wait
+        return wait
+
+    def adjust(self, tokens: int):
+        """Charge (or refund, if negative) tokens once a call's actual usage is known."""
+        def charge(state, now):
+            state['tokens'] -= tokens
+        self._update(charge)
+
+    def block_for(self, seconds: float):
+        """Hold every process's requests for seconds, e.g. for a Retry-After."""
+        def block(state, now):
+            state['blocked_until'] = max(state.get('blocked_until', 0), now + seconds)
+        self._update(block)
+        with self._lock:
+            self.blocks += 1
+
+    def stats(self) -> Dict[str, Any]:
+        state = self._update(lambda state, now: dict(state, blocked_for=max(0.0, state.get('blocked_until', 0) - now)))
+        with self._lock:
+            return {
+                'requests_available': round(state['requests'], 1),
+                'tokens_available': round(state['tokens']),
+                'blocked_for': round(state['blocked_for'], 1),
+                'waits': self.waits,
+                'wait_seconds': round(self.wait_seconds, 1),
+                'blocks': self.blocks,
+            }
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD limit on concurrent calls within one asyncio event loop.
+
+    A call counts as slow against the latency baseline of its own kind
+    (``key``, e.g. model and call site), since a long analysis on a
+    reasoning model is not a sign of overload next to short chat replies.
+    """
+
+    def __init__(self, maximum: int, minimum: int = 1, initial: Optional[int] = None,
+                 decrease: float = 0.5, slow_factor: float = 2.0, adaptive: bool = True):
+        self.maximum = maximum
+        self.minimum = minimum
+        # Adaptive limits start at half the maximum and probe upward
+        self.limit = float(initial or (max(minimum, maximum // 2) if adaptive else maximum))
+        self.decrease = decrease
+        self.slow_factor = slow_factor
+        self.adaptive = adaptive
+        self.in_flight = 0
+        self.baselines: Dict[str, float] = {}
+        self._waiters: deque = deque()
+        self.decreases = 0
+
+    async def acquire(self):
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+        self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False, key: str = ''):
+        self.in_flight -= 1
+        if self.adaptive:
+            baseline = self.baselines.get(key)
+            slow = latency is not None and baseline is not None and latency > self.slow_factor * baseline
+            if throttled or slow:
+                self.limit = max(self.minimum, self.limit * self.decrease)
+                self.decreases += 1
+                logger.info(f"Reducing OpenAI concurrency to {int(self.limit)} "
+                            f"({'rate limited' if throttled else f'latency {latency:.1f}s'})")
+            else:
+                # About +1 per round of successful calls
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if latency is not None and not throttled:
+                self.baselines[key] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+        self._wake()
+
+    def _wake(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'waiting': len(self._waiters),
+            'baseline_latency': {key: round(baseline, 2) for key, baseline in self.baselines.items()},
+            'decreases': self.decreases,
+        }
+
+
+def create_rate_limiter() -> Optional[FileTokenBucket]:
+    """Build the shared bucket from the environment (None when both limits are 0)."""
+    if RPM_LIMIT <= 0 and TPM_LIMIT <= 0:
+        return None
+    return FileTokenBucket(STATE_FILE, RPM_LIMIT if RPM_LIMIT > 0 else 10 ** 9,
+                           TPM_LIMIT if TPM_LIMIT > 0 else 10 ** 12, period=LIMIT_PERIOD)
+
+
+# Shared by every client in the process; the state file shares it between processes
+rate_limiter = create_rate_limiter()
@@ -0,0 +1,344 @@
+"""
+Minimal client for Redis-compatible key-value servers (RESP2 protocol).
+
+Only the pieces the session store needs are implemented: a bounded
+connection pool, single commands, pipelines and WATCH for optimistic
+transactions.
+"""
+
+import queue
+import socket
+import ssl
+import threading
+from contextlib import contextmanager
+from typing import Any, List, Optional
+from urllib.parse import urlparse, unquote
+
+
+class RespError(Exception):
+    """Error reply returned by the server."""
+
+
+class RespConnectionError(RespError):
+    """Raised when the server cannot be reached or the connection breaks."""
+
+
+def _encode_arg(arg: Any) -> bytes:
+    if isinstance(arg, bytes):
+        return arg
+    if isinstance(arg, str):
+        return arg.encode('utf-8')
+    if isinstance(arg, (int, float)):
+        return repr(arg).encode('ascii')
+    raise TypeError(f"Unsupported argument type: {type(arg).__name__}")
+
+
+def encode_command(*args) -> bytes:
+    """Encode a command as a RESP array of bulk strings."""
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        data = _encode_arg(arg)
+        parts.append(b'$%d\r\n' % len(data))
+        parts.append(data)
+        parts.append(b'\r\n')
+    return b''.join(parts)
+
+
+class RespConnection:
+    """A single socket connection to the server."""
+
+    def __init__(self, host: str, port: int, db: int = 0, password: Optional[str] = None,
+                 username: Optional[str] = None, use_ssl: bool = False,
+                 socket_timeout: float = 5.0):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.username = username
+        self.use_ssl = use_ssl
+        self.socket_timeout = socket_timeout
+        self._sock = None
+        self._reader = None
+
+    def connect(self):
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=self.socket_timeout)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            if self.use_ssl:
+                sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        except OSError as e:
+            raise RespConnectionError(f"Cannot connect to {self.host}:{self.port}: {e}") from e
+
+        self._sock = sock
+        self._reader = sock.makefile('rb')
+
+        if self.password:
+            if self.username:
+                self.execute('AUTH', self.username, self.password)
+            else:
+                self.execute('AUTH', self.password)
+        if self.db:
+            self.execute('SELECT', self.db)
+
+    def close(self):
+        for closable in (self._reader, self._sock):
+            try:
+                if closable is not None:
+                    closable.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    @property
+    def connected(self) -> bool:
+        return self._sock is not None
+
+    def send(self, payload: bytes):
+        if not self.connected:
+            self.connect()
+        try:
+            self._sock.sendall(payload)
+        except OSError as e:
+            self.close()
+            raise RespConnectionError(f"Error writing to server: {e}") from e
+
+    def read_response(self) -> Any:
+        """Read one reply. Error replies are returned (not raised) as RespError."""
+        try:
+            line = self._reader.readline()
+        except OSError as e:
+            self.close()
+            raise RespConnectionError(f"Error reading from server: {e}") from e
+        if not line:
+            self.close()
+            raise RespConnectionError("Connection closed by server")
+
+        prefix, body = line[:1], line[1:-2]
+        if prefix == b'+':
+            return body.decode('utf-8')
+        if prefix == b'-':
+            return RespError(body.decode('utf-8'))
+        if prefix == b':':
+            return int(body)
+        if prefix == b'$':
+            length = int(body)
+            if length == -1:
+                return None
+            data = self._reader.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            count = int(body)
+            if count == -1:
+                return None
+            return [self.read_response() for _ in range(count)]
+
+        self.close()
+        raise RespConnectionError(f"Protocol error, unexpected reply: {line[:50]!r}")
+
+    def execute(self, *args) -> Any:
+        self.send(encode_command(*args))
+        reply = self.read_response()
+        if isinstance(reply, RespError):
+            raise reply
+        return reply
+
+
+class RespConnectionPool:
+    """Thread-safe, bounded pool of connections that are created lazily."""
+
+    def __init__(self, host: str = 'localhost', port: int = 6379, db: int = 0,
+                 password: Optional[str] = None, username: Optional[str] = None,
+                 use_ssl: bool = False, max_connections: int = 10,
+                 socket_timeout: float = 5.0, pool_timeout: float = 10.0):
+        self.connection_kwargs = dict(host=host, port=port, db=db, password=password,
+                                      username=username, use_ssl=use_ssl,
+                                      socket_timeout=socket_timeout)
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RespConnectionPool':
+        """Build a pool from a redis://[user:password@]host:port/db URL."""
+        parsed = urlparse(url)
+        if parsed.scheme not in ('redis', 'rediss'):
+            raise ValueError(f"Unsupported URL scheme: {parsed.scheme}")
+
+        db = 0
+        if parsed.path and parsed.path != '/':
+            db = int(parsed.path.lstrip('/'))
+
+        return cls(
+            host=parsed.hostname or 'localhost',
+            port=parsed.port or 6379,
+            db=db,
+            username=unquote(parsed.username) if parsed.username else None,
+            password=unquote(parsed.password) if parsed.password else None,
+            use_ssl=parsed.scheme == 'rediss',
+            **kwargs
+        )
+
+    def acquire(self) -> RespConnection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.max_connections:
+                self._created += 1
+                return RespConnection(**self.connection_kwargs)
+
+        try:
+            return self._idle.get(timeout=self.pool_timeout)
+        except queue.Empty:
+            raise RespConnectionError("Timed out waiting for a free connection")
+
+    def release(self, conn: RespConnection):
+        self._idle.put(conn)
+
+    def discard(self, conn: RespConnection):
+        conn.close()
+        with self._lock:
+            self._created -= 1
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        except RespConnectionError:
+            self.discard(conn)
+            raise
+        except BaseException:
+            # Replies are read in full before errors are raised, so the
+            # connection is still in step with the server
+            self.release(conn)
+            raise
+        else:
+            self.release(conn)
+
+    def disconnect(self):
+        """Close idle connections, e.g. after a fork."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(conn)
+
+
+class Pipeline:
+    """Buffers commands and sends them to the server in a single round trip."""
+
+    def __init__(self, pool: RespConnectionPool, conn: Optional[RespConnection] = None):
+        self.pool = pool
+        # Set when the commands must run on a connection holding a WATCH
+        self.conn = conn
+        self.commands: List[tuple] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.commands = []
+
+    def __len__(self):
+        return len(self.commands)
+
+    def execute_command(self, *args) -> 'Pipeline':
+        self.commands.append(args)
+        return self
+
+    def __getattr__(self, name):
+        # pipe.hgetall(key) -> queues "HGETALL key"
+        if name.startswith('_'):
+            raise AttributeError(name)
+        command = name.upper()
+        return lambda *args: self.execute_command(command, *args)
+
+    def execute(self, raise_on_error: bool = True) -> List[Any]:
+        if not self.commands:
+            return []
+
+        payload = b''.join(encode_command(*args) for args in self.commands)
+        count = len(self.commands)
+        self.commands = []
+
+        if self.conn is not None:
+            self.conn.send(payload)
+            replies = [self.conn.read_response() for _ in range(count)]
+        else:
+            with self.pool.connection() as conn:
+                conn.send(payload)
+                replies = [conn.read_response() for _ in range(count)]
+
+        if raise_on_error:
+            for reply in replies:
+                if isinstance(reply, RespError):
+                    raise reply
+        return replies
+
+
+class RespClient:
+    """Small command wrapper around a connection pool."""
+
+    def __init__(self, pool: RespConnectionPool):
+        self.pool = pool
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RespClient':
+        return cls(RespConnectionPool.from_url(url, **kwargs))
+
+    def execute_command(self, *args) -> Any:
+        with self.pool.connection() as conn:
+            return conn.execute(*args)
+
+    def pipeline(self, conn: Optional[RespConnection] = None) -> Pipeline:
+        return Pipeline(self.pool, conn)
+
+    @contextmanager
+    def watch(self, *keys):
+        """
+        WATCH keys on a connection of the pool and yield it.
+
+        Reads sent with ``conn.execute`` and a transaction queued on
+        ``pipeline(conn)`` share the watch: the transaction's EXEC returns
+        None instead of running if another client changed a key since.
+        """
+        with self.pool.connection() as conn:
+            conn.execute('WATCH', *keys)
+            try:
+                yield conn
+            finally:
+                if conn.connected:
+                    conn.execute('UNWATCH')
+
+    def ping(self) -> bool:
+        return self.execute_command('PING') == 'PONG'
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute_command('GET', key)
+
+    def set(self, key: str, value, ex: Optional[int] = None, nx: bool = False) -> bool:
+        args = ['SET', key, value]
+        if ex:
+            args += ['EX', int(ex)]
+        if nx:
+            args.append('NX')
+        return self.execute_command(*args) == 'OK'
+
+    def mget(self, *keys) -> List[Optional[bytes]]:
+        return self.execute_command('MGET', *keys)
+
+    def delete(self, *keys) -> int:
+        return self.execute_command('DEL', *keys)
+
+    def expire(self, key: str, seconds: int) -> bool:
+        return self.execute_command('EXPIRE', key, int(seconds)) == 1
+
+    def ttl(self, key: str) -> int:
+        return self.execute_command('TTL', key)
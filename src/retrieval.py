@@ -0,0 +1,142 @@
+"""
+Lexical retrieval over uploaded documents.
+
+At upload time the document is split into overlapping passages and a BM25
+index is built over their tokens. The index is plain JSON, stored next to
+the document text in the session store, so each chat turn can load it and
+send the model only the passages relevant to the current question instead
+of a fixed prefix of the document.
+"""
+
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+import json_codec
+
+INDEX_VERSION = 1
+CHUNK_CHARS = 1000
+TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '6'))
+TOKEN_BUDGET = int(os.getenv('RETRIEVAL_TOKEN_BUDGET', '2000'))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+SENTENCE_BREAK = re.compile(r"(?<=[.!?;])\s+")
+STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have he her his i in is it its of on or our she "
+    "that the their them they this to was were what when where which who will with you your about did "
+    "does do document tell me please can could would should how".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)."""
+    return (len(text) + 3) // 4
+
+
+def chunk_text(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Split text into passages of about chunk_chars characters on sentence
+    boundaries, repeating the last sentence of each passage at the start of
+    the next so facts spanning a boundary stay retrievable.
+    """
+    sentences = []
+    for sentence in SENTENCE_BREAK.split(text.strip()):
+        # Hard-wrap sentences longer than a passage (tables, lists)
+        while len(sentence) > chunk_chars:
+            cut = sentence.rfind(' ', 0, chunk_chars)
+            cut = cut if cut > 0 else chunk_chars
+            sentences.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            sentences.append(sentence)
+
+    chunks = []
+    current: List[str] = []
+    length = 0
+    for sentence in sentences:
+        if current and length + len(sentence) > chunk_chars:
+            chunks.append(' '.join(current))
+            current = [current[-1]] if len(current) > 1 else []
+            length = sum(len(part) + 1 for part in current)
+        current.append(sentence)
+        length += len(sentence) + 1
+    if current:
+        chunks.append(' '.join(current))
+    return chunks
+
+
+class DocumentIndex:
+    """BM25 index over the passages of one document."""
+
+    def __init__(self, chunks: List[str], term_freqs: List[Dict[str, int]]):
+        self.chunks = chunks
+        self.term_freqs = term_freqs
+        self.lengths = [sum(tf.values()) for tf in term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        doc_freqs = Counter()
+        for tf in term_freqs:
+            doc_freqs.update(tf.keys())
+        count = len(chunks)
+        self.idf = {term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in doc_freqs.items()}
+
+    @classmethod
+    def build(cls, text: str, chunk_chars: int = CHUNK_CHARS) -> 'DocumentIndex':
+        chunks = chunk_text(text, chunk_chars)
+        return cls(chunks, [dict(Counter(tokenize(chunk))) for chunk in chunks])
+
+    def to_json(self) -> str:
+        return json_codec.dumps({'version': INDEX_VERSION, 'chunks': self.chunks, 'tf': self.term_freqs})
+
+    @classmethod
+    def from_json(cls, data: str) -> 'DocumentIndex':
+        payload: Dict[str, Any] = json_codec.loads(data)
+        if payload.get('version') != INDEX_VERSION:
+            raise ValueError(f"Unsupported document index version {payload.get('version')}")
+        return cls(payload['chunks'], payload['tf'])
+
+    def scores(self, query: str) -> List[float]:
+        terms = [term for term in set(tokenize(query)) if term in self.idf]
+        results = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.avg_length) if self.avg_length else BM25_K1
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (BM25_K1 + 1) / (freq + norm)
+            results.append(score)
+        return results
+
+    def search(self, query: str, top_k: int = TOP_K, token_budget: int = TOKEN_BUDGET) -> List[Tuple[int, str]]:
+        """
+        Return up to top_k ``(position, passage)`` pairs relevant to query,
+        within token_budget, in document order.
+
+        When nothing matches (for example "summarize it"), the opening
+        passages are returned instead so the model still sees some context.
+        """
+        scores = self.scores(query)
+        ranked = sorted((i for i, score in enumerate(scores) if score > 0), key=lambda i: -scores[i])
+        if not ranked:
+            ranked = list(range(len(self.chunks)))
+
+        selected = []
+        used = 0
+        for i in ranked:
+            cost = estimate_tokens(self.chunks[i])
+            if used + cost > token_budget:
+                continue
+            selected.append(i)
+            used += cost
+            if len(selected) >= top_k:
+                break
+        return [(i, self.chunks[i]) for i in sorted(selected)]
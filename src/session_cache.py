@@ -0,0 +1,108 @@
+"""
+In-process LRU cache of decoded session payloads.
+
+Entries carry a version stamp supplied by the storage backend (file
+mtime/inode/size, or a version counter in Redis). A lookup only returns the
+cached payload when the caller's current stamp matches, so a write from
+another worker invalidates the entry without reading the payload itself.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def copy_json(value: Any) -> Any:
+    """Copy a JSON-shaped value. Strings are immutable and shared, so large
+    fields such as document_text cost nothing to copy."""
+    value_type = type(value)
+    if value_type is dict:
+        return {key: copy_json(item) for key, item in value.items()}
+    if value_type is list:
+        return [copy_json(item) for item in value]
+    return value
+
+
+class SessionCache:
+    """Bounded LRU of decoded sessions, evicting by payload size in bytes."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, stamp: Hashable) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached payload if it matches the current stamp."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != stamp:
+                self.stale += 1
+                self.misses += 1
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            payload = entry[1]
+        return copy_json(payload)
+
+    def peek(self, key: Hashable, stamp: Hashable) -> Optional[Dict[str, Any]]:
+        """Like get(), but without touching recency or hit/miss counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            payload = entry[1]
+        return copy_json(payload)
+
+    def put(self, key: Hashable, stamp: Hashable, payload: Dict[str, Any], size: int):
+        """Cache a payload whose encoded size is ``size`` bytes."""
+        if size > self.max_bytes:
+            self.invalidate(key)
+            return
+
+        payload = copy_json(payload)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (stamp, payload, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit ratio and memory footprint for the metrics endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stale': self.stale,
+                'evictions': self.evictions,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
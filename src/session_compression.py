@@ -0,0 +1,170 @@
+"""
+Transparent compression of large session values.
+
+Only values whose JSON encoding exceeds a threshold are compressed, and each
+compressed value is tagged with its codec, so sessions written before
+compression was enabled (or with another codec) still load.
+
+In JSON session files a compressed value is stored as
+``{"__compressed__": "<codec>", "data": "<base64>"}``. In the Redis backend,
+where fields are raw bytes, it is ``b"\\x00" + <codec id> + <compressed bytes>``;
+JSON text never starts with a NUL byte.
+"""
+
+import base64
+import logging
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import json_codec
+
+logger = logging.getLogger(__name__)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+COMPRESSED_TAG = '__compressed__'
+BINARY_MARKER = b'\x00'
+
+
+class _Codec:
+    def __init__(self, name: str, binary_id: bytes, compress, decompress):
+        self.name = name
+        self.binary_id = binary_id
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _available_codecs() -> Dict[str, _Codec]:
+    codecs = {
+        'zlib': _Codec('zlib', b'z', lambda data: zlib.compress(data, 1), zlib.decompress),
+    }
+    if zstandard is not None:
+        compressor = zstandard.ZstdCompressor(level=3)
+        decompressor = zstandard.ZstdDecompressor()
+        codecs['zstd'] = _Codec('zstd', b's', compressor.compress, decompressor.decompress)
+    if lz4_frame is not None:
+        codecs['lz4'] = _Codec('lz4', b'l', lz4_frame.compress, lz4_frame.decompress)
+    return codecs
+
+
+CODECS = _available_codecs()
+CODECS_BY_ID = {codec.binary_id: codec for codec in CODECS.values()}
+
+
+class ValueCompressor:
+    """Compresses JSON-encoded values above ``threshold`` bytes with a fast codec."""
+
+    def __init__(self, codec: str = 'auto', threshold: int = 2048, min_saving: float = 0.1):
+        if codec == 'auto':
+            codec = next(name for name in ('zstd', 'lz4', 'zlib') if name in CODECS)
+        if codec not in CODECS:
+            raise ValueError(f"Compression codec '{codec}' is not available")
+        self.codec = CODECS[codec]
+        self.threshold = threshold
+        self.min_saving = min_saving
+
+    def _compress(self, raw: bytes) -> Optional[bytes]:
+        """Compress raw bytes, or return None when it is not worth it."""
+        if len(raw) < self.threshold:
+            return None
+        compressed = self.codec.compress(raw)
+        if len(compressed) > len(raw) * (1 - self.min_saving):
+            return None
+        return compressed
+
+    # JSON files -----------------------------------------------------------
+
+    def pack_text(self, encoded: str) -> str:
+        """Return JSON text for a value: the original, or a tagged compressed form."""
+        if len(encoded) < self.threshold:
+            return encoded
+        compressed = self._compress(encoded.encode('utf-8'))
+        if compressed is None:
+            return encoded
+        return json_codec.dumps({COMPRESSED_TAG: self.codec.name,
+                                 'data': base64.b64encode(compressed).decode('ascii')})
+
+    # Redis fields ---------------------------------------------------------
+
+    def pack_bytes(self, encoded: bytes) -> bytes:
+        compressed = self._compress(encoded)
+        if compressed is None:
+            return encoded
+        return BINARY_MARKER + self.codec.binary_id + compressed
+
+
+def is_packed(value: Any) -> bool:
+    return type(value) is dict and len(value) == 2 and COMPRESSED_TAG in value
+
+
+def unpack_value(value: Any) -> Tuple[Any, int]:
+    """Decode a value read from a JSON session file.
+
+    Returns ``(value, inflated_bytes)``, where inflated_bytes is how much
+    larger the decoded JSON is than its stored form.
+    """
+    if not is_packed(value):
+        return value, 0
+    codec = CODECS.get(value[COMPRESSED_TAG])
+    if codec is None:
+        raise ValueError(f"Session value uses unavailable codec '{value[COMPRESSED_TAG]}'")
+    raw = codec.decompress(base64.b64decode(value['data']))
+    return json_codec.loads(raw), len(raw) - len(value['data'])
+
+
+def unpack_bytes(stored: bytes) -> bytes:
+    """Return the JSON bytes of a Redis field, decompressing if it is tagged."""
+    if not stored.startswith(BINARY_MARKER):
+        return stored
+    codec = CODECS_BY_ID.get(stored[1:2])
+    if codec is None:
+        raise ValueError(f"Session value uses unknown codec id {stored[1:2]!r}")
+    return codec.decompress(stored[2:])
+
+
+def encode_session(session_data: Dict[str, Any], compressor: Optional[ValueCompressor]) -> Tuple[str, int]:
+    """
+    Encode a file session, compressing large data values.
+
+    Each value is JSON-encoded once and the file keeps the same overall
+    layout as an unpacked session. Returns ``(text, raw_size)`` where raw_size
+    is the length before compression.
+    """
+    if compressor is None:
+        text = json_codec.dumps(session_data)
+        return text, len(text)
+
+    header = {key: value for key, value in session_data.items() if key != 'data'}
+    parts = []
+    raw_size = 0
+    for key, value in session_data.get('data', {}).items():
+        encoded = json_codec.dumps(value)
+        raw_size += len(encoded)
+        parts.append(f"{json_codec.dumps(key)}: {compressor.pack_text(encoded)}")
+
+    prefix = json_codec.dumps(header)[:-1]
+    if header:
+        prefix += ', '
+    text = f'{prefix}"data": {{{", ".join(parts)}}}}}'
+    return text, raw_size + len(prefix)
+
+
+def decode_session_data(data: Dict[str, Any]) -> int:
+    """Decompress tagged values of a loaded file session in place.
+
+    Returns the number of extra bytes the decoded values take up.
+    """
+    inflated = 0
+    for key, value in data.items():
+        if is_packed(value):
+            data[key], extra = unpack_value(value)
+            inflated += extra
+    return inflated
@@ -3,29 +3,68 @@ Session manager for handling large session data using file storage.
 """
 
 import os
-import json
 import uuid
 import time
 import logging
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional
 from datetime import datetime
 import hashlib
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process locking is available
+    fcntl = None
+
+import json_codec
+from blob_store import FileBlobStore, content_digest
+from resp_client import RespClient
+from retrieval import DocumentIndex
+from session_cache import SessionCache
+from session_compression import ValueCompressor, encode_session, decode_session_data, unpack_bytes
+from session_sweeper import SessionSweeper, TEMP_FILE_PREFIX
 
 logger = logging.getLogger(__name__)
 
+# Number of lock stripes used to serialize writes to the same session
+LOCK_STRIPES = 256
+LOCK_FILE_NAME = '.session.lock'
+BLOB_DIR_NAME = 'blobs'
+BLOB_CACHE_PREFIX = 'blob:'
+# Attempts of an optimistic Redis transaction before giving up under contention
+MUTATE_ATTEMPTS = 10
+
 
 class FileSessionManager:
     """Manages session data using file storage to avoid cookie size limits."""
     
-    def __init__(self, session_dir: str = "sessions", max_age_hours: int = 24):
+    def __init__(self, session_dir: str = "sessions", max_age_hours: int = 24,
+                 cache: Optional[SessionCache] = None, sweep_interval: float = 300,
+                 sweep_batch_size: int = 200, compressor: Optional[ValueCompressor] = None):
         self.session_dir = session_dir
         self.max_age_hours = max_age_hours
+        self.cache = cache
+        self.compressor = compressor
         
         # Create session directory if it doesn't exist
         os.makedirs(self.session_dir, exist_ok=True)
         
-        # Clean up old sessions on init
-        self.cleanup_old_sessions()
+        # Expired sessions are removed by a background sweeper, started lazily
+        # in each worker so startup does not depend on the number of sessions
+        self.sweeper = SessionSweeper(self, interval=sweep_interval, batch_size=sweep_batch_size)
+        
+        # Per-session write locks (see _locked)
+        self._stripe_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self._lock_fd_guard = threading.Lock()
+        self._lock_fd = None
+        self._lock_pid = None
+        
+        # Large shared values (document text) are stored once by content hash
+        self.blobs = FileBlobStore(os.path.join(self.session_dir, BLOB_DIR_NAME),
+                                   compressor=compressor, lock=self._locked)
     
     def _get_session_path(self, session_id: str) -> str:
         """Get the file path for a session."""
@@ -33,6 +72,108 @@ class FileSessionManager:
         safe_id = hashlib.sha256(session_id.encode()).hexdigest()
         return os.path.join(self.session_dir, f"{safe_id}.json")
     
+    @staticmethod
+    def _stamp(stat_result: os.stat_result) -> tuple:
+        """Cheap version stamp: changes whenever any process rewrites the file."""
+        return (stat_result.st_mtime_ns, stat_result.st_ino, stat_result.st_size)
+    
+    @staticmethod
+    def _last_access(stat_result: os.stat_result) -> float:
+        """Reads bump atime and writes bump mtime, so the later one is the last access."""
+        return max(stat_result.st_atime, stat_result.st_mtime)
+    
+    def _read_session_file(self, path: str, touch: bool = False) -> Optional[Dict[str, Any]]:
+        """Read a session file, serving it from the cache when unchanged on disk."""
+        try:
+            f = open(path, 'r', encoding='utf-8')
+        except FileNotFoundError:
+            if self.cache:
+                self.cache.invalidate(path)
+            return None
+        
+        with f:
+            # Stat the open file so the stamp matches exactly what we read, even
+            # if another writer replaces the path in the meantime
+            stat_result = os.fstat(f.fileno())
+            
+            if touch:
+                # Record the access in atime only; mtime is part of the cache stamp
+                target = f.fileno() if os.utime in os.supports_fd else path
+                os.utime(target, ns=(time.time_ns(), stat_result.st_mtime_ns))
+            
+            stamp = self._stamp(stat_result)
+            if self.cache:
+                session_data = self.cache.get(path, stamp)
+                if session_data is not None:
+                    return session_data
+            
+            session_data = json_codec.loads(f.read())
+        
+        # Decompressed size is what the cached copy costs in memory
+        inflated = decode_session_data(session_data.get('data', {}))
+        if self.cache:
+            self.cache.put(path, stamp, session_data, stat_result.st_size + inflated)
+        return session_data
+    
+    def _write_session_file(self, path: str, session_data: Dict[str, Any]):
+        """
+        Atomically replace a session file and remember the payload in the cache.
+        
+        The data goes to a temporary file in the same directory first, so
+        readers only ever see a complete old or new version.
+        """
+        text, raw_size = encode_session(session_data, self.compressor)
+        fd, tmp_path = tempfile.mkstemp(dir=self.session_dir, prefix=TEMP_FILE_PREFIX)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                stat_result = os.fstat(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        
+        if self.cache:
+            # rename keeps the inode and mtime, so this is the stamp readers will see
+            self.cache.put(path, self._stamp(stat_result), session_data, raw_size)
+    
+    @contextmanager
+    def _locked(self, path: str):
+        """
+        Serialize read-modify-write cycles on one session.
+        
+        Sessions are spread over LOCK_STRIPES thread locks, and the same stripe
+        index is locked as one byte of a shared lock file for other processes,
+        so unrelated sessions almost never wait on each other.
+        """
+        stripe = zlib.crc32(os.path.basename(path).encode()) % LOCK_STRIPES
+        with self._stripe_locks[stripe]:
+            lock_fd = self._get_lock_fd()
+            if lock_fd is None:
+                yield
+                return
+            fcntl.lockf(lock_fd, fcntl.LOCK_EX, 1, stripe)
+            try:
+                yield
+            finally:
+                fcntl.lockf(lock_fd, fcntl.LOCK_UN, 1, stripe)
+    
+    def _get_lock_fd(self) -> Optional[int]:
+        """Open the shared lock file once per process."""
+        if fcntl is None:
+            return None
+        if self._lock_pid != os.getpid():
+            with self._lock_fd_guard:
+                if self._lock_pid != os.getpid():
+                    self._lock_fd = os.open(os.path.join(self.session_dir, LOCK_FILE_NAME),
+                                            os.O_RDWR | os.O_CREAT, 0o600)
+                    self._lock_pid = os.getpid()
+        return self._lock_fd
+    
     def create_session(self) -> str:
         """Create a new session and return its ID."""
         session_id = str(uuid.uuid4())
@@ -43,8 +184,9 @@ class FileSessionManager:
         }
         
         path = self._get_session_path(session_id)
-        with open(path, 'w') as f:
-            json.dump(session_data, f)
+        self._write_session_file(path, session_data)
+        self.sweeper.track(os.path.basename(path), session_data['last_accessed'])
+        self.sweeper.start()
         
         logger.info(f"Created new session: {session_id}")
         return session_id
@@ -55,17 +197,12 @@ class FileSessionManager:
             return None
         
         path = self._get_session_path(session_id)
-        if not os.path.exists(path):
-            return None
+        self.sweeper.start()
         
         try:
-            with open(path, 'r') as f:
-                session_data = json.load(f)
-            
-            # Update last accessed time
-            session_data['last_accessed'] = time.time()
-            with open(path, 'w') as f:
-                json.dump(session_data, f)
+            session_data = self._read_session_file(path, touch=True)
+            if session_data is None:
+                return None
             
             return session_data['data']
         except Exception as e:
@@ -74,30 +211,61 @@ class FileSessionManager:
     
     def update_session_data(self, session_id: str, data: Dict[str, Any]) -> bool:
         """Update session data."""
+        return self.mutate_session(session_id, lambda current: data) is not None
+    
+    def mutate_session(self, session_id: str,
+                       fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Update a session based on its current data, atomically.
+        
+        fn receives the current data and returns the keys to store. It runs
+        under the session's write lock, so no other update lands between the
+        read and the write. Returns fn's updates, or None on failure.
+        """
         if not session_id:
-            return False
+            return None
         
         path = self._get_session_path(session_id)
+        self.sweeper.start()
         
         try:
-            # Read existing session or create new one
-            if os.path.exists(path):
-                with open(path, 'r') as f:
-                    session_data = json.load(f)
-            else:
-                session_data = {
-                    'created_at': time.time(),
-                    'data': {}
-                }
-            
-            # Update data
-            session_data['last_accessed'] = time.time()
-            session_data['data'].update(data)
-            
-            # Write back
-            with open(path, 'w') as f:
-                json.dump(session_data, f)
+            with self._locked(path):
+                # Read existing session or create new one
+                session_data = self._read_session_file(path)
+                if session_data is None:
+                    session_data = {
+                        'created_at': time.time(),
+                        'data': {}
+                    }
+                    self.sweeper.track(os.path.basename(path), session_data['created_at'])
+                
+                # Update data
+                updates = fn(session_data['data'])
+                session_data['last_accessed'] = time.time()
+                session_data['data'].update(updates)
+                
+                # Write back
+                self._write_session_file(path, session_data)
             
+            return updates
+        except Exception as e:
+            logger.error(f"Error updating session {session_id}: {e}")
+            return None
+    
+    def delete_session_keys(self, session_id: str, keys: List[str]) -> bool:
+        """Remove data keys from a session."""
+        if not session_id:
+            return False
+        
+        path = self._get_session_path(session_id)
+        try:
+            with self._locked(path):
+                session_data = self._read_session_file(path)
+                if session_data is None or not any(key in session_data['data'] for key in keys):
+                    return True
+                for key in keys:
+                    session_data['data'].pop(key, None)
+                self._write_session_file(path, session_data)
             return True
         except Exception as e:
             logger.error(f"Error updating session {session_id}: {e}")
@@ -109,6 +277,8 @@ class FileSessionManager:
             return False
         
         path = self._get_session_path(session_id)
+        if self.cache:
+            self.cache.invalidate(path)
         if os.path.exists(path):
             try:
                 os.remove(path)
@@ -119,28 +289,57 @@ class FileSessionManager:
         
         return False
     
+    def _remove_session_file(self, path: str, cutoff: float) -> bool:
+        """Remove a session file not accessed since cutoff; used by the sweeper."""
+        if self.cache:
+            self.cache.invalidate(path)
+        try:
+            with self._locked(path):
+                # Re-check under the lock in case a request just updated it
+                if self._last_access(os.stat(path)) >= cutoff:
+                    return False
+                os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.error(f"Error cleaning up session file {os.path.basename(path)}: {e}")
+            return False
+    
     def cleanup_old_sessions(self):
-        """Remove sessions older than max_age_hours."""
-        cutoff_time = time.time() - (self.max_age_hours * 3600)
-        cleaned = 0
-        
-        for filename in os.listdir(self.session_dir):
-            if not filename.endswith('.json'):
-                continue
-            
-            path = os.path.join(self.session_dir, filename)
-            try:
-                with open(path, 'r') as f:
-                    session_data = json.load(f)
-                
-                if session_data.get('last_accessed', 0) < cutoff_time:
-                    os.remove(path)
-                    cleaned += 1
-            except Exception as e:
-                logger.error(f"Error cleaning up session file {filename}: {e}")
-        
-        if cleaned > 0:
-            logger.info(f"Cleaned up {cleaned} old sessions")
+        """Remove sessions older than max_age_hours in one synchronous pass."""
+        self.sweeper.sweep(rescan=True)
+    
+    def put_blob(self, session_id: str, content: str) -> str:
+        """Store a large value once, referenced by this session; returns its digest."""
+        owner = os.path.basename(self._get_session_path(session_id))[:-len('.json')]
+        digest = self.blobs.put(content, owner)
+        if self.cache:
+            self.cache.put(BLOB_CACHE_PREFIX + digest, digest, content, len(content))
+        return digest
+    
+    def get_blob(self, digest: str) -> Optional[str]:
+        """Get a stored blob by digest, or None if it was collected."""
+        # Blobs are immutable, so the digest doubles as the cache stamp
+        if self.cache:
+            content = self.cache.get(BLOB_CACHE_PREFIX + digest, digest)
+            if content is not None:
+                return content
+        try:
+            content = self.blobs.get(digest)
+        except Exception as e:
+            logger.error(f"Error reading blob {digest[:12]}: {e}")
+            return None
+        if content is not None and self.cache:
+            self.cache.put(BLOB_CACHE_PREFIX + digest, digest, content, len(content))
+        return content
+    
+    def _collect_blobs(self) -> int:
+        """Delete blobs no longer referenced by any session file; used by the sweeper."""
+        def is_live(owner):
+            return os.path.exists(os.path.join(self.session_dir, f"{owner}.json"))
+        # Cached copies of collected blobs are still correct and age out of the LRU
+        return self.blobs.collect_garbage(is_live)
     
     def get_session_size(self, session_id: str) -> int:
         """Get the size of session data in bytes."""
@@ -152,9 +351,389 @@ class FileSessionManager:
             return os.path.getsize(path)
         return 0
 
+    def get_many_session_data(self, session_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Get data for several sessions at once."""
+        return {session_id: self.get_session_data(session_id) for session_id in session_ids}
+
+    def update_many_session_data(self, updates: Dict[str, Dict[str, Any]]) -> bool:
+        """Update several sessions at once."""
+        results = [self.update_session_data(session_id, data) for session_id, data in updates.items()]
+        return all(results)
+
+
+class RedisSessionManager:
+    """
+    Manages session data in a Redis-compatible key-value server so that every
+    app instance sees the same sessions.
+
+    Each session is a hash: ``created_at``/``last_accessed``, a ``version``
+    counter bumped on every write, and one ``d:<key>`` field per data key
+    holding the JSON-encoded value. Updates only touch the fields that changed,
+    and expiry is handled by the server's TTL instead of scanning for stale
+    sessions.
+    """
+
+    DATA_PREFIX = 'd:'
+
+    def __init__(self, url: str = "redis://localhost:6379/0", max_age_hours: int = 24,
+                 pool_size: int = 10, key_prefix: str = "cgaward:session:",
+                 cache: Optional[SessionCache] = None, compressor: Optional[ValueCompressor] = None,
+                 blob_prefix: str = "cgaward:blob:"):
+        self.client = RespClient.from_url(url, max_connections=pool_size)
+        self.max_age_hours = max_age_hours
+        self.ttl = int(max_age_hours * 3600)
+        # Blobs outlive any session that touched them within the last two lifetimes
+        self.blob_ttl = 2 * self.ttl
+        self.key_prefix = key_prefix
+        self.blob_prefix = blob_prefix
+        self.cache = cache
+        self.compressor = compressor
+
+    def _get_session_key(self, session_id: str) -> str:
+        """Get the storage key for a session."""
+        # Hash the session ID for security
+        safe_id = hashlib.sha256(session_id.encode()).hexdigest()
+        return f"{self.key_prefix}{safe_id}"
+
+    def _decode_session(self, flat: List[bytes]) -> Optional[tuple]:
+        """
+        Turn a flat HGETALL reply into ``(data, version, sizes)``, where sizes
+        maps each data key to its decoded JSON length.
+        """
+        if not flat:
+            return None
+        data = {}
+        sizes = {}
+        version = None
+        for field, value in zip(flat[::2], flat[1::2]):
+            field = field.decode('utf-8')
+            if field.startswith(self.DATA_PREFIX):
+                name = field[len(self.DATA_PREFIX):]
+                value = unpack_bytes(value)
+                data[name] = json_codec.loads(value)
+                sizes[name] = len(value)
+            elif field == 'version':
+                version = int(value)
+        return data, version, sizes
+
+    def _cache_put(self, key: str, version: int, data: Dict[str, Any], sizes: Dict[str, int]):
+        self.cache.put(key, version, {'data': data, 'sizes': sizes}, sum(sizes.values()))
+
+    def create_session(self) -> str:
+        """Create a new session and return its ID."""
+        session_id = str(uuid.uuid4())
+        now = time.time()
+        key = self._get_session_key(session_id)
+
+        pipe = self.client.pipeline()
+        pipe.hset(key, 'created_at', repr(now), 'last_accessed', repr(now), 'version', 1)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+        if self.cache:
+            self._cache_put(key, 1, {}, {})
+
+        logger.info(f"Created new session: {session_id}")
+        return session_id
+
+    def get_session_data(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get session data by ID."""
+        if not session_id:
+            return None
+        return self.get_many_session_data([session_id])[session_id]
+
+    def get_many_session_data(self, session_ids: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get data for several sessions with pipelined round trips.
+
+        Reading a session slides its expiry forward, which replaces the
+        last_accessed bookkeeping of the file backend. With a cache, only the
+        version counters are fetched first and full payloads are read just
+        for sessions whose cached copy is missing or stale.
+        """
+        session_ids = [session_id for session_id in session_ids if session_id]
+        if not session_ids:
+            return {}
+
+        keys = {session_id: self._get_session_key(session_id) for session_id in session_ids}
+        results = {}
+        pending = session_ids
+
+        try:
+            if self.cache:
+                pipe = self.client.pipeline()
+                for session_id in session_ids:
+                    pipe.hget(keys[session_id], 'version')
+                    pipe.expire(keys[session_id], self.ttl)
+                replies = pipe.execute()
+
+                pending = []
+                for i, session_id in enumerate(session_ids):
+                    version, exists = replies[i * 2], replies[i * 2 + 1]
+                    if not exists:
+                        results[session_id] = None
+                        continue
+                    cached = self.cache.get(keys[session_id], int(version)) if version is not None else None
+                    if cached is not None:
+                        results[session_id] = cached['data']
+                    else:
+                        pending.append(session_id)
+
+            if pending:
+                pipe = self.client.pipeline()
+                for session_id in pending:
+                    pipe.hgetall(keys[session_id])
+                    pipe.expire(keys[session_id], self.ttl)
+                replies = pipe.execute()
+        except Exception as e:
+            logger.error(f"Error reading sessions {session_ids}: {e}")
+            return {session_id: None for session_id in session_ids}
+
+        for i, session_id in enumerate(pending):
+            try:
+                decoded = self._decode_session(replies[i * 2])
+            except Exception as e:
+                logger.error(f"Error decoding session {session_id}: {e}")
+                decoded = None
+            if decoded is None:
+                results[session_id] = None
+                continue
+            data, version, sizes = decoded
+            if self.cache and version is not None:
+                self._cache_put(keys[session_id], version, data, sizes)
+            results[session_id] = data
+
+        return results
+
+    def update_session_data(self, session_id: str, data: Dict[str, Any]) -> bool:
+        """Update session data."""
+        if not session_id:
+            return False
+        return self.update_many_session_data({session_id: data})
+
+    def update_many_session_data(self, updates: Dict[str, Dict[str, Any]]) -> bool:
+        """Update several sessions in one atomic, pipelined round trip."""
+        updates = {session_id: data for session_id, data in updates.items() if session_id}
+        if not updates:
+            return False
+
+        now = repr(time.time())
+        encoded = {}
+        try:
+            pipe = self.client.pipeline()
+            pipe.multi()
+            for session_id, data in updates.items():
+                encoded[session_id] = self._queue_update(pipe, self._get_session_key(session_id), data, now)
+            pipe.exec()
+            results = pipe.execute()[-1]
+        except Exception as e:
+            logger.error(f"Error updating sessions {list(updates)}: {e}")
+            return False
+
+        if self.cache:
+            for i, (session_id, data) in enumerate(updates.items()):
+                self._cache_merge(self._get_session_key(session_id), results[i * 4 + 2],
+                                  data, encoded[session_id])
+        return True
+
+    def _queue_update(self, pipe, key: str, data: Dict[str, Any], now: str) -> Dict[str, bytes]:
+        """Queue the four commands writing data to a session; returns the encoded values."""
+        encoded = {name: json_codec.dumps(value).encode('utf-8') for name, value in data.items()}
+        fields = ['last_accessed', now]
+        for name, value in encoded.items():
+            if self.compressor:
+                value = self.compressor.pack_bytes(value)
+            fields += [self.DATA_PREFIX + name, value]
+        pipe.hset(key, *fields)
+        pipe.hsetnx(key, 'created_at', now)
+        pipe.hincrby(key, 'version', 1)
+        pipe.expire(key, self.ttl)
+        return encoded
+
+    def mutate_session(self, session_id: str,
+                       fn: Callable[[Dict[str, Any]], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Update a session based on its current data, atomically.
+
+        fn receives the current data and returns the keys to store. The
+        session is read under WATCH and written with MULTI/EXEC; if another
+        client wrote it in between, the transaction does not run and fn is
+        called again on the new data. Returns fn's updates, or None on failure.
+        """
+        if not session_id:
+            return None
+
+        key = self._get_session_key(session_id)
+        try:
+            for _ in range(MUTATE_ATTEMPTS):
+                with self.client.watch(key) as conn:
+                    decoded = self._decode_session(conn.execute('HGETALL', key))
+                    updates = fn(decoded[0] if decoded else {})
+                    pipe = self.client.pipeline(conn)
+                    pipe.multi()
+                    encoded = self._queue_update(pipe, key, updates, repr(time.time()))
+                    pipe.exec()
+                    results = pipe.execute()[-1]
+                if results is not None:
+                    if self.cache:
+                        self._cache_merge(key, results[2], updates, encoded)
+                    return updates
+            logger.warning(f"Giving up updating session {session_id} after {MUTATE_ATTEMPTS} conflicting writes")
+        except Exception as e:
+            logger.error(f"Error updating session {session_id}: {e}")
+        return None
+
+    def delete_session_keys(self, session_id: str, keys: List[str]) -> bool:
+        """Remove data keys from a session."""
+        if not session_id or not keys:
+            return False
+
+        key = self._get_session_key(session_id)
+        if self.cache:
+            self.cache.invalidate(key)
+        pipe = self.client.pipeline()
+        pipe.multi()
+        pipe.hdel(key, *[self.DATA_PREFIX + name for name in keys])
+        pipe.hincrby(key, 'version', 1)
+        pipe.expire(key, self.ttl)
+        pipe.exec()
+        try:
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error updating session {session_id}: {e}")
+            return False
+        return True
+
+    def _cache_merge(self, key: str, version: int, data: Dict[str, Any], encoded: Dict[str, bytes]):
+        """Apply our own write to the cached copy if it was current just before it."""
+        previous = self.cache.peek(key, version - 1)
+        if previous is None:
+            self.cache.invalidate(key)
+            return
+        previous['data'].update(data)
+        previous['sizes'].update({name: len(value) for name, value in encoded.items()})
+        self._cache_put(key, version, previous['data'], previous['sizes'])
+
+    def delete_session(self, session_id: str) -> bool:
+        """Delete a session."""
+        if not session_id:
+            return False
+
+        key = self._get_session_key(session_id)
+        if self.cache:
+            self.cache.invalidate(key)
+        try:
+            deleted = self.client.delete(key)
+        except Exception as e:
+            logger.error(f"Error deleting session {session_id}: {e}")
+            return False
+
+        if deleted:
+            logger.info(f"Deleted session: {session_id}")
+        return bool(deleted)
+
+    def cleanup_old_sessions(self):
+        """Expired sessions are removed by the server's TTL; nothing to do."""
+
+    def put_blob(self, session_id: str, content: str) -> str:
+        """
+        Store a large value once, referenced by this session; returns its digest.
+
+        The blob and its ``:refs`` hash (one field per referencing session)
+        expire like sessions do, and every put or get slides the expiry, so a
+        blob is dropped once no session has used it for two lifetimes.
+        """
+        digest = content_digest(content)
+        key = self.blob_prefix + digest
+        refs_key = key + ':refs'
+
+        pipe = self.client.pipeline()
+        pipe.expire(key, self.blob_ttl)
+        pipe.hset(refs_key, self._get_session_key(session_id), repr(time.time()))
+        pipe.expire(refs_key, self.blob_ttl)
+        exists = pipe.execute()[0]
+
+        if not exists:
+            raw = content.encode('utf-8')
+            if self.compressor:
+                raw = self.compressor.pack_bytes(raw)
+            self.client.set(key, raw, ex=self.blob_ttl, nx=True)
+        else:
+            logger.info(f"Reusing stored blob {digest[:12]}")
+
+        if self.cache:
+            self.cache.put(BLOB_CACHE_PREFIX + digest, digest, content, len(content))
+        return digest
+
+    def get_blob(self, digest: str) -> Optional[str]:
+        """Get a stored blob by digest, or None if it expired."""
+        key = self.blob_prefix + digest
+        if self.cache:
+            content = self.cache.get(BLOB_CACHE_PREFIX + digest, digest)
+            if content is not None:
+                self.client.expire(key, self.blob_ttl)
+                return content
+
+        try:
+            pipe = self.client.pipeline()
+            pipe.get(key)
+            pipe.expire(key, self.blob_ttl)
+            pipe.expire(key + ':refs', self.blob_ttl)
+            raw = pipe.execute()[0]
+        except Exception as e:
+            logger.error(f"Error reading blob {digest[:12]}: {e}")
+            return None
+        if raw is None:
+            return None
+
+        content = unpack_bytes(raw).decode('utf-8')
+        if self.cache:
+            self.cache.put(BLOB_CACHE_PREFIX + digest, digest, content, len(content))
+        return content
+
+    def get_session_size(self, session_id: str) -> int:
+        """Get the size of session data in bytes."""
+        if not session_id:
+            return 0
+
+        flat = self.client.execute_command('HGETALL', self._get_session_key(session_id)) or []
+        return sum(len(part) for part in flat)
+
+
+def create_session_manager():
+    """Build the session manager selected by the SESSION_TYPE environment variable."""
+    session_type = os.getenv('SESSION_TYPE', 'filesystem').lower()
+    max_age_hours = max(1, int(os.getenv('SESSION_LIFETIME', '86400')) // 3600)
+
+    cache_bytes = int(os.getenv('SESSION_CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    cache = SessionCache(cache_bytes) if cache_bytes > 0 else None
+
+    codec = os.getenv('SESSION_COMPRESSION', 'auto').lower()
+    compressor = None
+    if codec != 'none':
+        threshold = int(os.getenv('SESSION_COMPRESSION_THRESHOLD', '2048'))
+        compressor = ValueCompressor(codec, threshold=threshold)
+
+    if session_type == 'redis':
+        url = os.getenv('SESSION_REDIS_URL', 'redis://localhost:6379/0')
+        pool_size = int(os.getenv('SESSION_REDIS_POOL_SIZE', '10'))
+        logger.info(f"Using Redis session backend with pool size {pool_size}")
+        return RedisSessionManager(url, max_age_hours=max_age_hours, pool_size=pool_size,
+                                   cache=cache, compressor=compressor)
+
+    session_dir = os.getenv('SESSION_FILE_DIR', 'sessions')
+    return FileSessionManager(
+        session_dir,
+        max_age_hours=max_age_hours,
+        cache=cache,
+        compressor=compressor,
+        sweep_interval=float(os.getenv('SESSION_SWEEP_INTERVAL', '300')),
+        sweep_batch_size=int(os.getenv('SESSION_SWEEP_BATCH_SIZE', '200'))
+    )
+
 
 # Global session manager instance
-session_manager = FileSessionManager()
+session_manager = create_session_manager()
 
 
 def get_or_create_session_id(flask_session) -> str:
@@ -170,9 +749,20 @@ def get_or_create_session_id(flask_session) -> str:
 def store_session_data(flask_session, key: str, value: Any) -> bool:
     """Store data in file-based session."""
     session_id = get_or_create_session_id(flask_session)
-    data = session_manager.get_session_data(session_id) or {}
-    data[key] = value
-    return session_manager.update_session_data(session_id, data)
+    # Only send the changed key so concurrent updates to other keys are kept
+    return session_manager.update_session_data(session_id, {key: value})
+
+
+def append_messages(session_id: str, new_messages: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Append messages to a session's conversation in one atomic update.
+
+    Messages stored by other requests since the conversation was read are
+    kept. Returns the stored conversation, or None on failure.
+    """
+    updates = session_manager.mutate_session(
+        session_id, lambda data: {'messages': (data.get('messages') or []) + list(new_messages)})
+    return updates['messages'] if updates else None
 
 
 def get_session_data(flask_session, key: str = None) -> Any:
@@ -190,6 +780,51 @@ def get_session_data(flask_session, key: str = None) -> Any:
     return data
 
 
+def store_document_text(flask_session, text: str) -> bool:
+    """Store extracted document text in the shared blob store and keep a reference in the session."""
+    session_id = get_or_create_session_id(flask_session)
+    try:
+        digest = session_manager.put_blob(session_id, text)
+    except Exception as e:
+        logger.error(f"Error storing document blob for session {session_id}: {e}")
+        return False
+    return session_manager.update_session_data(session_id, {'document_ref': digest})
+
+
+def get_document_text(flask_session) -> Optional[str]:
+    """Get the document text of a session, following its blob reference."""
+    data = get_session_data(flask_session)
+    if not data:
+        return None
+    if data.get('document_ref'):
+        return session_manager.get_blob(data['document_ref'])
+    # Sessions written before the blob store keep the text inline
+    return data.get('document_text')
+
+
+def get_document_index(flask_session) -> Optional[DocumentIndex]:
+    """Get the retrieval index of the session's document, building it for older sessions."""
+    data = get_session_data(flask_session)
+    if not data:
+        return None
+    if data.get('document_index_ref'):
+        serialized = session_manager.get_blob(data['document_index_ref'])
+        if serialized is not None:
+            try:
+                return DocumentIndex.from_json(serialized)
+            except ValueError as e:
+                logger.warning(f"Rebuilding document index: {e}")
+
+    document_text = get_document_text(flask_session)
+    if not document_text:
+        return None
+    index = DocumentIndex.build(document_text)
+    session_id = flask_session['sid']
+    session_manager.update_session_data(
+        session_id, {'document_index_ref': session_manager.put_blob(session_id, index.to_json())})
+    return index
+
+
 def clear_session_data(flask_session) -> bool:
     """Clear all session data."""
     session_id = flask_session.get('sid')
@@ -0,0 +1,152 @@
+"""
+Expiry index and background sweeper for file-backed sessions.
+
+The index is a min-heap of (last access, filename) rebuilt from file
+timestamps, so finding expired sessions never requires opening or parsing
+session files. The sweeper deletes them from a daemon thread in bounded
+batches instead of blocking worker startup on a full scan.
+"""
+
+import heapq
+import logging
+import os
+import threading
+import time
+from typing import Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+TEMP_FILE_PREFIX = '.tmp-'
+ORPHAN_TEMP_FILE_AGE = 3600  # seconds
+
+
+class ExpiryIndex:
+    """Min-heap of session files keyed by their last access time."""
+
+    def __init__(self):
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._heap)
+
+    def push(self, last_access: float, name: str):
+        with self._lock:
+            heapq.heappush(self._heap, (last_access, name))
+
+    def rebuild(self, entries: Iterable[Tuple[float, str]]):
+        heap = list(entries)
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap = heap
+
+    def pop_expired(self, cutoff: float, limit: int) -> List[str]:
+        """Pop up to ``limit`` names whose indexed access time is before cutoff."""
+        names = []
+        with self._lock:
+            while self._heap and len(names) < limit and self._heap[0][0] < cutoff:
+                names.append(heapq.heappop(self._heap)[1])
+        return names
+
+
+class SessionSweeper:
+    """Incrementally removes expired session files for a FileSessionManager."""
+
+    def __init__(self, manager, interval: float = 300, batch_size: int = 200,
+                 batch_pause: float = 0.05, rescan_interval: float = 3600):
+        self.manager = manager
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.rescan_interval = rescan_interval
+        self.index = ExpiryIndex()
+        self._last_rescan = 0.0
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def start(self):
+        """Start the sweeper thread once per process (threads do not survive fork)."""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._last_rescan = 0.0
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='session-sweeper', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def track(self, name: str, last_access: float):
+        """Index a session file created by this process."""
+        self.index.push(last_access, name)
+
+    def rescan(self):
+        """Rebuild the index from file timestamps (stat only, no parsing)."""
+        entries = []
+        orphan_cutoff = time.time() - ORPHAN_TEMP_FILE_AGE
+        with os.scandir(self.manager.session_dir) as it:
+            for entry in it:
+                try:
+                    if entry.name.endswith('.json'):
+                        entries.append((self.manager._last_access(entry.stat()), entry.name))
+                    elif entry.name.startswith(TEMP_FILE_PREFIX) and entry.stat().st_mtime < orphan_cutoff:
+                        # Left behind by a worker that died mid-write
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+        self.index.rebuild(entries)
+        self._last_rescan = time.time()
+
+    def sweep(self, max_batches: int = None, rescan: bool = False) -> int:
+        """Delete expired sessions in batches; returns the number removed."""
+        rescanned = rescan or time.time() - self._last_rescan >= self.rescan_interval
+        if rescanned:
+            self.rescan()
+
+        cutoff = time.time() - self.manager.max_age_hours * 3600
+        removed = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            names = self.index.pop_expired(cutoff, self.batch_size)
+            if not names:
+                break
+            for name in names:
+                removed += self._expire(name, cutoff)
+            batches += 1
+            if self.batch_pause and not self._stop.is_set():
+                self._stop.wait(self.batch_pause)
+
+        if removed:
+            logger.info(f"Cleaned up {removed} old sessions")
+        if removed or rescanned:
+            # Release blobs that only expired (or deleted) sessions referenced
+            self.manager._collect_blobs()
+        return removed
+
+    def _expire(self, name: str, cutoff: float) -> int:
+        path = os.path.join(self.manager.session_dir, name)
+        try:
+            last_access = self.manager._last_access(os.stat(path))
+        except FileNotFoundError:
+            return 0
+
+        if last_access >= cutoff:
+            # Accessed since it was indexed; check again when it could expire
+            self.index.push(last_access, name)
+            return 0
+
+        return 1 if self.manager._remove_session_file(path, cutoff) else 0
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Error sweeping sessions: {e}")
+            self._stop.wait(self.interval)
@@ -0,0 +1,159 @@
+"""
+Coalescing of identical in-flight calls.
+
+Within a process, the first caller for a key runs the call and later callers
+with the same key wait for its result instead of repeating it. Across worker
+processes, the running call holds a lease: a file created exclusively in a
+shared directory next to the LLM cache. Another process that finds the lease
+waits for it to be released and then reads the result from the cache.
+Uncacheable results are not visible to other processes, so such a caller
+makes the call itself after the wait. Leases older than ``lease_ttl`` are
+assumed abandoned by a crashed worker and taken over.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+LEASE_SUFFIX = '.lease'
+# Longest a call may hold a lease (three attempts of a 90s request, plus slack)
+LEASE_TTL = float(os.getenv('LLM_LEASE_TTL', '300'))
+POLL_INTERVAL = 0.1
+
+
+class SingleFlight:
+    """Runs one call per key at a time and shares its result with concurrent callers."""
+
+    def __init__(self, lease_dir: Optional[str] = None, lease_ttl: float = LEASE_TTL,
+                 poll_interval: float = POLL_INTERVAL):
+        self.lease_dir = lease_dir
+        self.lease_ttl = lease_ttl
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.cross_process_coalesced = 0
+        self.lease_takeovers = 0
+
+    def do(self, key: str, func: Callable[[], Any], lookup: Optional[Callable[[], Any]] = None) -> Any:
+        """
+        Return func() for key, sharing one execution with concurrent callers.
+
+        lookup returns the stored result of a call finished by another
+        process, or None; without it only callers in this process are
+        coalesced.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info("Waiting for identical in-flight request")
+            return future.result()
+
+        try:
+            result = self._run_with_lease(key, func, lookup)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def _lease_path(self, key: str) -> str:
+        return os.path.join(self.lease_dir, hashlib.sha256(key.encode('utf-8')).hexdigest() + LEASE_SUFFIX)
+
+    def _acquire(self, path: str) -> bool:
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        except FileNotFoundError:
+            # The lease directory is created by the first lease
+            os.makedirs(self.lease_dir, exist_ok=True)
+            return self._acquire(path)
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+
+    def _run_with_lease(self, key: str, func: Callable[[], Any], lookup: Optional[Callable[[], Any]]) -> Any:
+        if not self.lease_dir or lookup is None:
+            with self._lock:
+                self.calls += 1
+            return func()
+
+        path = self._lease_path(key)
+        waited = False
+        while not self._acquire(path):
+            try:
+                age = time.time() - os.path.getmtime(path)
+            except FileNotFoundError:
+                continue  # released just now; try again
+            if age > self.lease_ttl:
+                logger.warning(f"Taking over abandoned lease {os.path.basename(path)}")
+                with self._lock:
+                    self.lease_takeovers += 1
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                continue
+            if not waited:
+                logger.info("Identical request in flight in another worker; waiting for its result")
+                waited = True
+            time.sleep(self.poll_interval)
+
+        try:
+            if waited:
+                result = lookup()
+                if result is not None:
+                    with self._lock:
+                        self.cross_process_coalesced += 1
+                    return result
+            with self._lock:
+                self.calls += 1
+            return func()
+        finally:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'cross_process_coalesced': self.cross_process_coalesced,
+                'lease_takeovers': self.lease_takeovers,
+                'in_flight': len(self._in_flight),
+            }
+
+
+_shared: Optional[SingleFlight] = None
+_shared_lock = threading.Lock()
+
+
+def get_single_flight(lease_dir: Optional[str] = None) -> SingleFlight:
+    """The process-wide instance, created with lease_dir on first use."""
+    global _shared
+    if _shared is None:
+        with _shared_lock:
+            if _shared is None:
+                _shared = SingleFlight(lease_dir)
+    return _shared
@@ -220,12 +220,12 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     function handleFileUpload(e) {
-        const file = e.target.files[0];
-        if (!file) return;
+        const files = Array.from(e.target.files);
+        if (!files.length) return;
         
-        // Check file type
+        // Check file types
         const allowedTypes = ['application/pdf', 'application/msword', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'];
-        if (!allowedTypes.includes(file.type)) {
+        if (!files.every(file => allowedTypes.includes(file.type))) {
             alert('Please upload a PDF or Word document');
             fileInput.value = '';
             return;
@@ -233,7 +233,7 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Check file size (max 10MB)
         const maxSize = 10 * 1024 * 1024; // 10MB
-        if (file.size > maxSize) {
+        if (files.some(file => file.size > maxSize)) {
             alert('File size must be less than 10MB');
             fileInput.value = '';
             return;
@@ -242,22 +242,29 @@ document.addEventListener('DOMContentLoaded', function() {
         // Show uploading message
         const uploadMsg = {
             role: 'user',
-            content: `📎 Uploading ${file.name}...`,
+            content: `📎 Uploading ${files.map(file => file.name).join(', ')}...`,
             timestamp: new Date().toISOString(),
             isFileUpload: true
         };
         addMessage(uploadMsg);
         
-        // Create FormData
+        // Create FormData; several files go to the batch endpoint and are analyzed together
         const formData = new FormData();
-        formData.append('file', file);
+        const endpoint = files.length > 1 ? '/api/upload/batch' : '/api/upload';
+        files.forEach(file => formData.append(files.length > 1 ? 'files' : 'file', file));
         
-        // Upload file
-        fetch('/api/upload', {
+        // Upload file; extraction and analysis continue in a background job
+        fetch(endpoint, {
             method: 'POST',
             body: formData
         })
         .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                return data;
+            }
+            return pollUploadJob(data.status_url);
+        })
         .then(data => {
             if (data.success) {
                 // Add success message with extracted content
@@ -311,6 +318,42 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
     
+    function pollUploadJob(statusUrl) {
+        // Resolves with the final job status once it has completed or failed
+        return new Promise((resolve, reject) => {
+            let lastStage = '';
+            const check = () => {
+                fetch(statusUrl)
+                .then(response => response.json())
+                .then(job => {
+                    if (!job.success || job.status === 'failed') {
+                        resolve({ success: false, error: job.error || 'Upload failed' });
+                        return;
+                    }
+                    if (job.status === 'completed') {
+                        resolve(job);
+                        return;
+                    }
+                    
+                    // Show progress once per stage
+                    if (job.status !== lastStage && job.status !== 'queued') {
+                        lastStage = job.status;
+                        addMessage({
+                            role: 'assistant',
+                            content: job.status === 'analyzing'
+                                ? `📄 Extracted ${job.filename}, analyzing achievements...`
+                                : `📄 Reading ${job.filename}...`,
+                            timestamp: new Date().toISOString()
+                        });
+                    }
+                    setTimeout(check, 1000);
+                })
+                .catch(reject);
+            };
+            setTimeout(check, 500);
+        });
+    }
+    
     function sendMessage() {
         const message = userInput.value.trim();
         if (!message) return;
@@ -325,8 +368,8 @@ document.addEventListener('DOMContentLoaded', function() {
         // Clear input
         userInput.value = '';
         
-        // Send message to server
-        fetch('/api/chat', {
+        // Send message to server and show the reply as it streams in
+        fetch('/api/chat/stream', {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -336,22 +379,47 @@ document.addEventListener('DOMContentLoaded', function() {
                 workflow_state: workflowState
             })
         })
-        .then(response => response.json())
-        .then(data => {
-            // Add assistant message to chat
-            addMessage({
+        .then(response => {
+            if (!response.ok || !response.body) {
+                throw new Error(`Streaming failed with status ${response.status}`);
+            }
+            
+            const contentDiv = addMessage({
                 role: 'assistant',
-                content: data.message,
+                content: '',
                 timestamp: new Date().toISOString()
             });
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let content = '';
             
-            // Update session ID if provided
-            if (data.session_id) {
-                sessionId = data.session_id;
-            }
-            
-            // Scroll to bottom
-            chatMessages.scrollTop = chatMessages.scrollHeight;
+            const read = () => reader.read().then(({ done, value }) => {
+                if (done) return;
+                buffer += decoder.decode(value, { stream: true });
+                
+                // Events are separated by a blank line
+                const events = buffer.split('\n\n');
+                buffer = events.pop();
+                events.forEach(block => {
+                    const event = /^event: (.*)$/m.exec(block);
+                    const data = /^data: (.*)$/m.exec(block);
+                    if (!event || !data) return;
+                    const payload = JSON.parse(data[1]);
+                    if (event[1] === 'delta') {
+                        content += payload.content;
+                    } else if (event[1] === 'done') {
+                        content = payload.message;
+                    } else if (event[1] === 'error') {
+                        content += (content ? '\n\n' : '') +
+                            'Sorry, there was an error processing your message. Please try again.';
+                    }
+                    contentDiv.innerHTML = parseMarkdown(content);
+                    chatMessages.scrollTop = chatMessages.scrollHeight;
+                });
+                return read();
+            });
+            return read();
         })
         .catch(error => {
             console.error('Error sending message:', error);
@@ -392,6 +460,8 @@ document.addEventListener('DOMContentLoaded', function() {
         
         // Scroll to bottom
         chatMessages.scrollTop = chatMessages.scrollHeight;
+        
+        return contentDiv;
     }
     
     function generateRecommendation() {
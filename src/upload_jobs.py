@@ -0,0 +1,279 @@
+"""
+Background processing of document uploads.
+
+The upload request only validates and spools the file, then returns a job
+id. Extraction and analysis run in a per-process thread pool, and the job's
+status lives in the session store under ``upload_job:<id>``, so whichever
+worker receives a polling request can answer it. The document text and its
+passage index are stored while the analysis runs, and when the job
+completes, the analysis, the document references and the chat message are
+written into the session in one atomic update. Analysis is not cut off by
+LLM_STAGE_TIMEOUT, which only bounds stages of a request; a job waits for
+the client's own request timeout and retries, and completes without
+analysis only if the call fails. A finished job is removed
+once it has been polled, or when a later upload finds it unpolled after
+FINISHED_JOB_TTL.
+"""
+
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from orchestration import Stage, flow_runner
+from retrieval import DocumentIndex
+from session_cache import copy_json
+
+logger = logging.getLogger(__name__)
+
+JOB_KEY_PREFIX = 'upload_job:'
+# Minimum seconds between progress writes to the session store
+PROGRESS_INTERVAL = 0.5
+# A job not updated for this long was lost with its worker process
+STALE_AFTER = 600
+# Finished jobs nobody polled are dropped after this many seconds
+FINISHED_JOB_TTL = 3600
+# Files of one batch extracted at the same time, and the characters kept
+# across all of them (split evenly between distinct files)
+BATCH_EXTRACT_WORKERS = int(os.getenv('BATCH_EXTRACT_WORKERS', '4'))
+BATCH_TEXT_BUDGET = int(os.getenv('BATCH_TEXT_BUDGET', '50000'))
+
+QUEUED = 'queued'
+EXTRACTING = 'extracting'
+ANALYZING = 'analyzing'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class UploadJobRunner:
+    """Runs upload jobs on a thread pool and records their status in the session store."""
+
+    def __init__(self, manager, processor=None, max_workers: int = 4, flows=None):
+        self.manager = manager
+        self._processor = processor
+        self.flows = flows or flow_runner
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    @property
+    def processor(self):
+        if self._processor is None:
+            from document_processor import document_processor
+            self._processor = document_processor
+        return self._processor
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Thread pool of this process (threads do not survive fork)."""
+        if self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='upload-job')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _set_status(self, session_id: str, job: Dict[str, Any], **changes) -> Dict[str, Any]:
+        job.update(changes, updated_at=time.time())
+        self.manager.update_session_data(session_id, {JOB_KEY_PREFIX + job['job_id']: job})
+        return job
+
+    def _prune_jobs(self, session_id: str):
+        """Remove finished (or lost) jobs that were never polled."""
+        now = time.time()
+        expired = [key for key, job in (self.manager.get_session_data(session_id) or {}).items()
+                   if key.startswith(JOB_KEY_PREFIX) and now - job['updated_at'] > (
+                       FINISHED_JOB_TTL if job['status'] in (COMPLETED, FAILED) else STALE_AFTER)]
+        if expired:
+            self.manager.delete_session_keys(session_id, expired)
+
+    def submit(self, session_id: str, upload) -> Dict[str, Any]:
+        """Queue a spooled upload for extraction and analysis; returns the job status."""
+        self._prune_jobs(session_id)
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'filename': upload.filename,
+            'status': QUEUED,
+            'pages_extracted': 0,
+            'total_pages': None,
+            'created_at': time.time(),
+        }
+        self._set_status(session_id, job)
+        snapshot = dict(job)
+        try:
+            self._get_executor().submit(self._run, session_id, job, upload)
+        except Exception:
+            upload.buffer.close()
+            raise
+        return snapshot
+
+    def submit_batch(self, session_id: str, uploads: List) -> Dict[str, Any]:
+        """Queue several spooled uploads to be extracted together and analyzed once."""
+        self._prune_jobs(session_id)
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'filename': f"{len(uploads)} files",
+            'status': QUEUED,
+            'files': [{'filename': upload.filename, 'sha256': upload.sha256, 'status': QUEUED}
+                      for upload in uploads],
+            'created_at': time.time(),
+        }
+        self._set_status(session_id, job)
+        snapshot = copy_json(job)
+        try:
+            self._get_executor().submit(self._run_batch, session_id, job, uploads)
+        except Exception:
+            for upload in uploads:
+                upload.buffer.close()
+            raise
+        return snapshot
+
+    def get_status(self, session_id: str, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status of a job; a finished job is returned once and then removed from the session."""
+        data = self.manager.get_session_data(session_id)
+        job = (data or {}).get(JOB_KEY_PREFIX + job_id)
+        if job and job['status'] not in (COMPLETED, FAILED) and time.time() - job['updated_at'] > STALE_AFTER:
+            job = dict(job, status=FAILED, error='Processing was interrupted. Please upload the file again.')
+        if job and job['status'] in (COMPLETED, FAILED):
+            self.manager.delete_session_keys(session_id, [JOB_KEY_PREFIX + job_id])
+        return job
+
+    def _run(self, session_id: str, job: Dict[str, Any], upload):
+        try:
+            self._set_status(session_id, job, status=EXTRACTING)
+            last_write = [time.monotonic()]
+
+            def progress(pages_read, total_pages):
+                now = time.monotonic()
+                if now - last_write[0] >= PROGRESS_INTERVAL or pages_read == total_pages:
+                    last_write[0] = now
+                    self._set_status(session_id, job, pages_extracted=pages_read, total_pages=total_pages)
+
+            success, message, text = self.processor.extract_upload(upload, progress=progress)
+            if not success:
+                logger.warning(f"Failed to process file: {message}")
+                self._set_status(session_id, job, status=FAILED, error=message)
+                return
+
+            logger.info(f"Successfully processed file: {upload.filename}")
+            self._set_status(session_id, job, status=ANALYZING, message=message)
+            flow = self.flows.run('upload', [
+                Stage('analysis', lambda: self.processor.analyze_document_for_achievements(text),
+                      fallback=lambda: None),
+                Stage('store', lambda: self._store_document(session_id, text)),
+            ])
+            self._complete(session_id, job, flow.results['store'], flow.results['analysis'])
+        except Exception as e:
+            logger.error(f"Upload job {job['job_id']} failed: {e}", exc_info=True)
+            self._set_status(session_id, job, status=FAILED, error=f"Error processing file: {e}")
+
+    def _run_batch(self, session_id: str, job: Dict[str, Any], uploads: List):
+        """
+        Extract the files of a batch in parallel and analyze them with one call.
+
+        Identical files (same SHA-256) are extracted once, and the text
+        budget is split between the distinct files so every document is
+        represented in the combined context.
+        """
+        try:
+            files = job['files']
+            unique = {}
+            for upload, entry in zip(uploads, files):
+                if upload.sha256 in unique:
+                    entry.update(status='duplicate', duplicate_of=unique[upload.sha256][0].filename)
+                    upload.buffer.close()
+                else:
+                    unique[upload.sha256] = (upload, entry)
+
+            budget = BATCH_TEXT_BUDGET // len(unique)
+            self._set_status(session_id, job, status=EXTRACTING, files_extracted=0)
+
+            def extract(upload):
+                start = time.perf_counter()
+                result = self.processor.extract_upload(upload, max_length=budget)
+                return result, time.perf_counter() - start
+
+            texts = {}
+            with ThreadPoolExecutor(max_workers=min(len(unique), BATCH_EXTRACT_WORKERS),
+                                    thread_name_prefix='batch-extract') as pool:
+                futures = {pool.submit(extract, upload): (upload, entry) for upload, entry in unique.values()}
+                for future in as_completed(futures):
+                    upload, entry = futures[future]
+                    (success, message, text), elapsed = future.result()
+                    entry.update(status=COMPLETED if success else FAILED, extract_ms=round(elapsed * 1000, 1))
+                    if success:
+                        texts[upload.sha256] = text
+                        entry['chars'] = len(text)
+                    else:
+                        entry['error'] = message
+                    self._set_status(session_id, job, files_extracted=job['files_extracted'] + 1)
+
+            extracted = [(upload.filename, texts[upload.sha256])
+                         for upload, _ in unique.values() if upload.sha256 in texts]
+            if not extracted:
+                self._set_status(session_id, job, status=FAILED,
+                                 error="Could not extract text from any of the files")
+                return
+
+            self._set_status(session_id, job, status=ANALYZING)
+            combined = self.processor.combine_documents(extracted)
+            flow = self.flows.run('upload_batch', [
+                Stage('analysis', lambda: self.processor.analyze_documents(extracted),
+                      fallback=lambda: None),
+                Stage('store', lambda: self._store_document(session_id, combined)),
+            ])
+            analysis_timing = flow.timings[0]
+            if analysis_timing['end_ms'] is not None:
+                job['analysis_ms'] = round(analysis_timing['end_ms'] - analysis_timing['start_ms'], 1)
+            self._complete(session_id, job, flow.results['store'], flow.results['analysis'])
+        except Exception as e:
+            logger.error(f"Upload job {job['job_id']} failed: {e}", exc_info=True)
+            self._set_status(session_id, job, status=FAILED, error=f"Error processing files: {e}")
+        finally:
+            for upload in uploads:
+                upload.buffer.close()
+
+    def _store_document(self, session_id: str, text: str) -> Dict[str, str]:
+        """Store the document text and its passage index; returns the session keys referencing them."""
+        return {
+            # Identical uploads share one copy; the session only keeps its digest
+            'document_ref': self.manager.put_blob(session_id, text),
+            # Passage index for retrieving chat context
+            'document_index_ref': self.manager.put_blob(session_id, DocumentIndex.build(text).to_json()),
+        }
+
+    def _complete(self, session_id: str, job: Dict[str, Any], document_refs: Dict[str, str],
+                  analysis: Optional[str]):
+        """Store the results in the session together with the final job status."""
+        job.update(status=COMPLETED, analysis=analysis, updated_at=time.time())
+        updates = {JOB_KEY_PREFIX + job['job_id']: job, **document_refs}
+        if analysis:
+            updates['document_analysis'] = analysis
+        message = {
+            "role": "user",
+            "content": f"Document content and analysis: {analysis}",
+            "timestamp": datetime.now().isoformat()
+        }
+
+        def add_results(data):
+            # Appended to the conversation as stored now, under the session's
+            # lock, so chat turns saved meanwhile are kept
+            if analysis:
+                return dict(updates, messages=(data.get('messages') or []) + [message])
+            return updates
+
+        self.manager.mutate_session(session_id, add_results)
+
+
+def create_upload_job_runner() -> UploadJobRunner:
+    from session_manager import session_manager
+    return UploadJobRunner(session_manager, max_workers=int(os.getenv('UPLOAD_JOB_WORKERS', '4')))
+
+
+# Global upload job runner
+upload_jobs = create_upload_job_runner()
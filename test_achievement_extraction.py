@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Tests for incremental achievement extraction prompts and merging.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from achievement_extraction import build_analysis_prompt, merge_achievement_data
+
+MESSAGES = [
+    {'role': 'user', 'content': 'Led 12 boardings of fishing vessels.'},
+    {'role': 'assistant', 'content': 'How many people were on your team?'},
+    {'role': 'user', 'content': 'Six boarding team members; we found $40k in violations.'},
+]
+
+
+def test_incremental_prompt_covers_only_new_messages():
+    full, full_inputs = build_analysis_prompt(MESSAGES, {'rank': 'BM2'})
+    assert 'FULL CONVERSATION:\nUSER 0: Led 12 boardings' in full
+    assert len(full_inputs) == 2
+
+    previous = {'achievements': ['Led 12 boardings of fishing vessels'], 'scope': 'Unit'}
+    prompt, inputs = build_analysis_prompt(MESSAGES, {'rank': 'BM2'}, previous=previous, start=2)
+    assert 'USER 0:' not in prompt
+    assert 'ASSISTANT 1: How many people' in prompt  # context for the new answer
+    assert 'NEW MESSAGES:\nUSER 2: Six boarding team members' in prompt
+    assert 'achievements: Led 12 boardings of fishing vessels' in prompt
+    assert 'INCREMENTAL analysis' in prompt
+    assert inputs == ['Six boarding team members; we found $40k in violations.']
+
+
+def test_merge_dedups_and_prefers_detailed_items():
+    previous = {
+        'achievements': ['Led 12 boardings', 'Trained new crew'],
+        'impacts': ['Found $40k in violations'],
+        'scope': 'Unit',
+        'time_period': '6 months',
+    }
+    delta = {
+        'achievements': ['led 12 boardings.', 'Led 12 boardings of fishing vessels', 'Qualified as coxswain'],
+        'impacts': ['found $40K in violations!'],
+        'scope': 'Sector',
+        'time_period': 'Not specified',
+    }
+    merged = merge_achievement_data(previous, delta)
+    assert merged['achievements'] == ['Led 12 boardings of fishing vessels', 'Trained new crew',
+                                      'Qualified as coxswain']
+    assert merged['impacts'] == ['Found $40k in violations']
+    assert merged['scope'] == 'Sector'
+    assert merged['time_period'] == '6 months'
+    assert merged['leadership_details'] == []
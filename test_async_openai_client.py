@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Tests for the async OpenAI client against the local mock API: retries with
+backoff, the blocking fallback and cancellation of abandoned calls.
+"""
+
+import asyncio
+import concurrent.futures
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+import pytest
+
+import async_openai_client
+from llm_telemetry import llm_telemetry
+from mock_llm_server import MockLLMServer
+from openai_client import OpenAIClient
+
+MESSAGES = [{"role": "user", "content": "I led a boarding team of six through 14 inspections."}]
+
+
+def start_server(**options):
+    return MockLLMServer(think=0, token_delay=0, reply='Noted the inspections.', **options).start()
+
+
+@pytest.fixture
+def make_client(monkeypatch):
+    """OpenAIClient for a mock server, without response cache or shared rate limiter."""
+    monkeypatch.delenv('OPENAI_API_KEY', raising=False)
+    monkeypatch.setenv('LLM_CACHE_MAX_BYTES', '0')
+    monkeypatch.setattr(async_openai_client, 'rate_limiter', None)
+    monkeypatch.setattr('openai_client.rate_limiter', None)
+
+    def make(server):
+        monkeypatch.setenv('OPENAI_BASE_URL', server.base_url)
+        client = OpenAIClient()
+        client.retry_delay = 0.05
+        return client
+    return make
+
+
+def test_rate_limited_call_is_retried_after_backoff(make_client):
+    server = start_server(rpm=1, quota_period=0.5)
+    try:
+        client = make_client(server)
+        kwargs = client._build_request(MESSAGES)
+        retries = client.aio.stats()['retries']
+
+        assert client.aio.run(client.aio.complete(kwargs, 'retry test'))['content'] == 'Noted the inspections.'
+        start = time.perf_counter()
+        assert client.aio.run(client.aio.complete(kwargs, 'retry test'))['content'] == 'Noted the inspections.'
+
+        # The second call was answered 429 and waited out the Retry-After
+        assert server.rate_limited == 1
+        assert time.perf_counter() - start >= 0.3
+        assert client.aio.stats()['retries'] == retries + 1
+        site = llm_telemetry.stats()['retry test']
+        assert site['retries'] == 1 and site['errors'] == {}
+    finally:
+        server.stop()
+
+
+def test_falls_back_to_blocking_call_when_loop_is_unavailable(make_client, monkeypatch):
+    server = start_server()
+    try:
+        client = make_client(server)
+
+        # Called from the loop's own thread, waiting on the loop would deadlock
+        async def from_loop_thread():
+            return client._make_api_call(MESSAGES, context='fallback test')
+
+        result = client.aio.run(from_loop_thread(), timeout=10)
+        assert result['content'] == 'Noted the inspections.'
+
+        # A loop that is not running
+        stopped = asyncio.new_event_loop()
+        monkeypatch.setitem(async_openai_client._state, 'loop', stopped)
+        assert client._make_api_call(MESSAGES, context='fallback test')['content'] == 'Noted the inspections.'
+        stopped.close()
+        assert server.served == 2
+    finally:
+        server.stop()
+
+
+def test_rate_limiter_state_file_is_not_read_on_the_loop(make_client, monkeypatch):
+    server = start_server()
+    try:
+        client = make_client(server)
+        kwargs = client._build_request(MESSAGES)
+        threads = []
+
+        class SlowLimiter:
+            def reserve(self, tokens):
+                threads.append(threading.current_thread().name)
+                time.sleep(0.3)  # a contended file lock
+                return 0.0
+
+            def adjust(self, tokens):
+                threads.append(threading.current_thread().name)
+
+        monkeypatch.setattr(async_openai_client, 'rate_limiter', SlowLimiter())
+
+        async def ticks():
+            # Loop iterations until the call has reserved and adjusted
+            count = 0
+            while len(threads) < 2 and count < 500:
+                await asyncio.sleep(0.01)
+                count += 1
+            return count
+
+        async def both():
+            return await asyncio.gather(client.aio.complete(kwargs, 'limiter test'), ticks())
+
+        result, ticked = client.aio.run(both(), timeout=10)
+        assert result['content'] == 'Noted the inspections.'
+        assert 'openai-async' not in threads
+        assert ticked >= 10  # the loop kept running during the 0.3s reserve
+    finally:
+        server.stop()
+
+
+def test_call_is_cancelled_when_the_caller_times_out(make_client):
+    server = start_server(timeout_rate=1.0, hang=5)
+    try:
+        client = make_client(server)
+        kwargs = client._build_request(MESSAGES)
+
+        with pytest.raises(concurrent.futures.TimeoutError):
+            client.aio.run(client.aio.complete(kwargs, 'cancel test'), timeout=0.3)
+
+        # The cancelled call gives its concurrency slot back and is recorded
+        async def settled():
+            while llm_telemetry.stats().get('cancel test', {}).get('calls') != 1:
+                await asyncio.sleep(0.01)
+        client.aio.run(settled(), timeout=2)
+        assert client.aio.stats()['concurrency']['in_flight'] == 0
+        assert llm_telemetry.stats()['cancel test']['errors'] == {'Cancelled': 1}
+    finally:
+        server.stop()
+
+
+def test_timed_out_suggestions_cancel_the_model_call(make_client):
+    server = start_server(timeout_rate=1.0, hang=5)
+    try:
+        client = make_client(server)
+        achievement_data = {'impacts': [], 'leadership_details': []}
+
+        start = time.perf_counter()
+        suggestions = client.generate_improvement_suggestions('Achievement Medal', achievement_data, {},
+                                                              timeout=0.3)
+        assert time.perf_counter() - start < 2
+        assert suggestions == client._generate_fallback_suggestions(achievement_data)
+
+        async def settled():
+            while client.aio.stats()['concurrency']['in_flight']:
+                await asyncio.sleep(0.01)
+        client.aio.run(settled(), timeout=2)
+    finally:
+        server.stop()
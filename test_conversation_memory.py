@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Tests for the rolling conversation summary used to bound chat prompts.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+os.environ.setdefault('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'cgaward-test-sessions'))
+
+from conversation_memory import SUMMARY_KEY, ConversationMemory
+from session_manager import FileSessionManager
+
+
+def conversation(count, words=5):
+    return [{'role': 'user' if i % 2 == 0 else 'assistant', 'content': f"message {i} " + 'detail ' * words}
+            for i in range(count)]
+
+
+def test_older_turns_are_summarized_in_background(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    session_id = manager.create_session()
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append((summary, [msg['content'].split()[1] for msg in messages]))
+        return f"{summary} covered {len(messages)}".strip()
+
+    memory = ConversationMemory(manager, summarize, verbatim_messages=4, summary_batch=2)
+    messages = conversation(5)
+    assert memory.maybe_refresh(session_id, messages) is None
+    assert calls == []  # still within the verbatim window plus batch
+
+    messages = conversation(8)
+    memory.maybe_refresh(session_id, messages).result(timeout=5)
+    assert manager.get_session_data(session_id)[SUMMARY_KEY]['covered'] == 4
+    context = memory.build_context(session_id, 'You are helpful.', messages)
+    assert 'SUMMARY OF THE EARLIER CONVERSATION:\ncovered 4' in context[0]['content']
+    assert [msg['content'].split()[1] for msg in context[1:]] == ['4', '5', '6', '7']
+
+    messages = conversation(14)
+    memory.maybe_refresh(session_id, messages).result(timeout=5)
+    assert manager.get_session_data(session_id)[SUMMARY_KEY]['covered'] == 10
+    assert calls[1] == ('covered 4', ['4', '5', '6', '7', '8', '9'])
+
+    # A different conversation does not reuse the old summary
+    replaced = [{'role': 'user', 'content': 'new topic'}] * 12
+    assert memory.summary_for(session_id, replaced) == ('', 0)
+
+
+def test_refresh_requested_during_a_refresh_runs_after_it(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    session_id = manager.create_session()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def summarize(summary, messages):
+        calls.append(len(messages))
+        started.set()
+        release.wait(5)
+        return f"{summary} covered {len(messages)}".strip()
+
+    memory = ConversationMemory(manager, summarize, verbatim_messages=4, summary_batch=2)
+    first = memory.maybe_refresh(session_id, conversation(8))
+    started.wait(5)
+    # Two more turns arrive while the first refresh is still running
+    second = memory.maybe_refresh(session_id, conversation(10))
+    third = memory.maybe_refresh(session_id, conversation(12))
+    assert first is second is third
+    release.set()
+
+    first.result(timeout=5)
+    assert calls == [4, 4]
+    assert manager.get_session_data(session_id)[SUMMARY_KEY]['covered'] == 8
+    assert memory.maybe_refresh(session_id, conversation(12)) is None
+
+
+def test_prompt_budget_drops_oldest_unsummarized_messages(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    session_id = manager.create_session()
+    memory = ConversationMemory(manager, lambda summary, messages: None, verbatim_messages=50, token_budget=200)
+
+    messages = conversation(20, words=40)  # about 60 tokens each
+    context = memory.build_context(session_id, 'You are helpful.', messages)
+    assert 1 < len(context) < 6
+    assert context[-1]['content'] == messages[-1]['content']
+
+    # A failed summary keeps whatever was stored before
+    memory._refresh(session_id, messages)
+    assert SUMMARY_KEY not in manager.get_session_data(session_id)
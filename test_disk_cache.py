@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent on-disk LRU cache.
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from disk_cache import DiskLRUCache
+
+
+def test_values_persist_across_instances(tmp_path):
+    cache = DiskLRUCache(str(tmp_path))
+    cache.set('extract:v1:pdf:abc', 'Qualified as coxswain.')
+    cache.set('analysis:v1:model:abc', {'achievements': ['a', 'b']})
+
+    other = DiskLRUCache(str(tmp_path))
+    assert other.get('extract:v1:pdf:abc') == 'Qualified as coxswain.'
+    assert other.get('analysis:v1:model:abc') == {'achievements': ['a', 'b']}
+    assert other.get('missing') is None
+    assert other.stats()['hits'] == 2 and other.stats()['misses'] == 1
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = DiskLRUCache(str(tmp_path), max_bytes=6000)
+    value = 'x' * 900
+    for i in range(5):
+        cache.set(f'key-{i}', value)
+        # Make the ordering independent of timestamp resolution
+        stamp = time.time() - 100 + i
+        os.utime(cache._path(f'key-{i}'), (stamp, stamp))
+    assert cache.get('key-0') == value  # now the most recently used
+
+    for i in range(5, 8):
+        cache.set(f'key-{i}', value)
+
+    assert cache.get('key-0') == value
+    assert cache.get('key-1') is None
+    assert cache.get('key-7') == value
+    assert cache.stats()['evictions'] > 0
+    assert cache.stats()['bytes'] <= 6000
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = DiskLRUCache(str(tmp_path))
+    cache.set('short', 'value', ttl=0.01)
+    cache.set('long', 'value', ttl=60)
+    time.sleep(0.05)
+    assert cache.get('short') is None
+    assert cache.get('long') == 'value'
+
+
+def test_directory_is_created_on_first_write(tmp_path):
+    directory = tmp_path / 'cache' / 'documents'
+    cache = DiskLRUCache(str(directory))
+    assert cache.get('extract:v1:pdf:abc') is None
+    cache.clear()
+    assert not directory.exists()
+
+    cache.set('extract:v1:pdf:abc', 'Qualified as coxswain.')
+    assert cache.get('extract:v1:pdf:abc') == 'Qualified as coxswain.'
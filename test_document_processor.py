@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Tests for upload spooling and PDF text extraction in the document processor.
+"""
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+os.environ.setdefault('DOCUMENT_CACHE_MAX_BYTES', '0')
+
+import PyPDF2
+import pytest
+
+import document_processor
+from document_processor import DocumentProcessor, UploadTooLarge
+
+
+def _pdf(pages):
+    """A minimal PDF with one line of Helvetica text per page."""
+    objects = ['<< /Type /Catalog /Pages 2 0 R >>', None,
+               '<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>']
+    kids = []
+    for text in pages:
+        stream = f'BT /F1 12 Tf 72 720 Td ({text}) Tj ET'
+        objects.append(f'<< /Length {len(stream)} >>\nstream\n{stream}\nendstream')
+        objects.append(f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] '
+                       f'/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>')
+        kids.append(f'{len(objects)} 0 R')
+    objects[1] = f'<< /Type /Pages /Kids [{" ".join(kids)}] /Count {len(pages)} >>'
+
+    out = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f'{number} 0 obj\n{body}\nendobj\n'.encode('latin-1')
+    xref = len(out)
+    out += f'xref\n0 {len(objects) + 1}\n0000000000 65535 f \n'.encode('latin-1')
+    out += ''.join(f'{offset:010d} 00000 n \n' for offset in offsets).encode('latin-1')
+    out += f'trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode('latin-1')
+    return out
+
+
+class Upload:
+    def __init__(self, filename, content):
+        self.filename = filename
+        self.stream = io.BytesIO(content)
+
+
+class DictCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries[key] = value
+
+
+@pytest.fixture
+def pages_read(monkeypatch):
+    """Texts of the pages whose text was extracted, in order."""
+    read = []
+    extract_text = PyPDF2.PageObject.extract_text
+
+    def counting(page, *args, **kwargs):
+        text = extract_text(page, *args, **kwargs)
+        read.append(text)
+        return text
+
+    monkeypatch.setattr(PyPDF2.PageObject, 'extract_text', counting)
+    return read
+
+
+def test_pdf_extraction_stops_at_max_length(pages_read):
+    pages = [f'Page {number} boarding team inspection report' for number in range(1, 11)]
+    source = io.BytesIO(_pdf(pages))
+    progress = []
+
+    text = DocumentProcessor().extract_text_from_pdf(source, max_length=100,
+                                                     progress=lambda done, total: progress.append((done, total)))
+
+    assert len(pages_read) == 3
+    assert text.startswith('Page 1 boarding team')
+    assert text.endswith('... [Content truncated]')
+    assert 'Page 4' not in text
+    assert progress == [(1, 10), (2, 10), (3, 10)]
+
+
+def test_short_pdf_is_extracted_whole(pages_read):
+    pages = ['Summary of Action', 'Led 14 fisheries boardings']
+    progress = []
+
+    text = DocumentProcessor().extract_text_from_pdf(io.BytesIO(_pdf(pages)),
+                                                     progress=lambda done, total: progress.append((done, total)))
+
+    assert text == 'Summary of Action\nLed 14 fisheries boardings'
+    assert len(pages_read) == 2
+    assert progress == [(1, 2), (2, 2)]
+
+
+def test_spool_upload_rejects_files_over_the_cap():
+    processor = DocumentProcessor(spool_size=1024, max_file_size=200 * 1024)
+
+    with pytest.raises(UploadTooLarge):
+        processor.spool_upload(io.BytesIO(b'x' * (200 * 1024 + 1)))
+    buffer, _ = processor.spool_upload(io.BytesIO(b'x' * (200 * 1024)))
+    buffer.close()
+
+    success, message, upload = processor.spool_file(Upload('big.pdf', b'x' * (200 * 1024 + 1)))
+    assert not success and upload is None
+    assert message.startswith('File too large')
+
+
+def test_spool_upload_moves_to_disk_past_spool_size():
+    processor = DocumentProcessor(spool_size=1024)
+
+    small, _ = processor.spool_upload(io.BytesIO(b'a' * 1024))
+    large, _ = processor.spool_upload(io.BytesIO(b'b' * 1025))
+
+    with small, large:
+        assert not small._rolled
+        assert large._rolled
+        assert small.read() == b'a' * 1024
+        assert large.read() == b'b' * 1025
+
+
+def test_extraction_cache_key_uses_the_upload_sha256(pages_read):
+    content = _pdf(['Led 14 fisheries boardings'])
+    processor = DocumentProcessor(cache=DictCache())
+
+    buffer, sha256 = processor.spool_upload(io.BytesIO(content))
+    buffer.close()
+    assert sha256 == hashlib.sha256(content).hexdigest()
+
+    success, _, upload = processor.spool_file(Upload('eval.pdf', content))
+    assert success and upload.sha256 == sha256
+    assert processor.extract_upload(upload, max_length=500)[2] == 'Led 14 fisheries boardings'
+    assert list(processor.cache.entries) == [f'extract:v{document_processor.EXTRACTION_VERSION}:pdf:500:{sha256}']
+
+    # The same bytes under another name are served from the cache
+    success, _, upload = processor.spool_file(Upload('copy.pdf', content))
+    assert processor.extract_upload(upload, max_length=500)[2] == 'Led 14 fisheries boardings'
+    assert len(pages_read) == 1
+
+
+class BrokenPool:
+    """Stands in for a process pool whose processes died."""
+
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool('A child process terminated abruptly')
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def parallel(monkeypatch):
+    """Extract PDFs of four or more pages with a pool of two processes, three pages per task."""
+    monkeypatch.setattr(document_processor, 'PDF_EXTRACTION_WORKERS', 2)
+    monkeypatch.setattr(document_processor, 'PDF_PARALLEL_MIN_PAGES', 4)
+    monkeypatch.setattr(document_processor, 'PDF_PAGES_PER_TASK', 3)
+    yield
+    pool = document_processor._pool
+    if pool is not None and document_processor._pool_pid == os.getpid():
+        document_processor.discard_extraction_pool(pool)
+
+
+def test_parallel_pdf_extraction_matches_sequential(parallel, tmp_path, monkeypatch):
+    monkeypatch.setattr(tempfile, 'tempdir', str(tmp_path / 'tmp'))
+    os.mkdir(tempfile.tempdir)
+    pages = [f'Page {number} boarding team inspection report' for number in range(1, 14)]
+    path = tmp_path / 'evaluation.pdf'
+    path.write_bytes(_pdf(pages))
+    processor = DocumentProcessor()
+    progress = []
+
+    from_path = processor.extract_text_from_pdf(str(path))
+    from_buffer = processor.extract_text_from_pdf(io.BytesIO(_pdf(pages)),
+                                                  progress=lambda done, total: progress.append(done))
+
+    assert document_processor._pool is not None
+    assert from_path == from_buffer == '\n'.join(pages)
+    assert progress == list(range(1, 14))
+    # The temporary copy handed to the pool is removed
+    assert not [name for name in os.listdir(tempfile.tempdir) if name.endswith('.pdf')]
+
+
+def test_parallel_pages_are_yielded_in_order(parallel, monkeypatch):
+    pages = [f'Page {number}' for number in range(1, 14)]
+    content = _pdf(pages)
+    extract_range = document_processor.extract_pdf_page_range
+    finished = []
+    lock = threading.Lock()  # the threads share one parsed reader
+
+    def slow_early_ranges(path, start, stop, max_length):
+        # Earlier ranges finish last
+        time.sleep(0.05 * (13 - start) / 13)
+        with lock:
+            finished.append(start)
+            return extract_range(path, start, stop, max_length)
+
+    monkeypatch.setattr(document_processor, 'extract_pdf_page_range', slow_early_ranges)
+    processor = DocumentProcessor()
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        texts = list(processor.iter_pdf_pages_parallel(pool, io.BytesIO(content),
+                                                       PyPDF2.PdfReader(io.BytesIO(content)), 10000))
+
+    assert texts == pages
+    assert finished != sorted(finished)
+
+
+def test_broken_pool_falls_back_to_sequential_extraction(parallel, monkeypatch):
+    pages = [f'Page {number} boarding team' for number in range(1, 9)]
+    pool = BrokenPool()
+    monkeypatch.setattr(document_processor, 'get_extraction_pool', lambda: pool)
+
+    text = DocumentProcessor().extract_text_from_pdf(io.BytesIO(_pdf(pages)))
+
+    assert text == '\n'.join(pages)
+    assert pool.shut_down
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for the streaming DOCX text extractor.
+"""
+
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from docx_text import iter_docx_text
+
+W = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def _paragraph(text):
+    return f'<w:p><w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+
+def _table(rows):
+    return '<w:tbl>' + ''.join(
+        '<w:tr>' + ''.join(f'<w:tc>{_paragraph(cell)}</w:tc>' for cell in row) + '</w:tr>'
+        for row in rows) + '</w:tbl>'
+
+
+def _docx(body):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('word/document.xml',
+                         f'<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="{W}"><w:body>'
+                         f'{body}<w:sectPr/></w:body></w:document>')
+    buffer.seek(0)
+    return buffer
+
+
+def test_paragraphs_and_tables_in_document_order():
+    source = _docx(
+        _paragraph('Summary of Action')
+        + _table([['Name', 'BM2 Smith'], ['Unit', '']])
+        + _paragraph('')
+        + '<w:p><w:r><w:t>Led</w:t><w:tab/><w:t>boarding team</w:t></w:r></w:p>'
+    )
+    assert list(iter_docx_text(source)) == [
+        'Summary of Action',
+        'Name BM2 Smith ',
+        'Unit ',
+        'Led\tboarding team',
+    ]
+
+
+def test_nested_tables_fold_into_their_cell():
+    inner = _table([['Cases', '14']])
+    source = _docx(f'<w:tbl><w:tr><w:tc>{_paragraph("Metrics")}{inner}</w:tc></w:tr></w:tbl>')
+    assert list(iter_docx_text(source)) == ['Metrics\nCases 14  ']
+
+
+def test_stops_parsing_when_consumer_stops():
+    source = _docx(''.join(_paragraph(f'Paragraph {i}') for i in range(10000)))
+    blocks = iter_docx_text(source)
+    assert [next(blocks) for _ in range(3)] == ['Paragraph 0', 'Paragraph 1', 'Paragraph 2']
+    blocks.close()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests that the JSON codec writes exactly what the standard library writes.
+"""
+
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+import pytest
+
+import json_codec
+
+PAYLOAD = {
+    'messages': [{'role': 'user', 'content': 'Led the crew of USCGC Münro — 12 boardings 🚤', 'n': 3}],
+    'scores': {'total': 87.5, 'tiny': 1e-07, 'big': 1e16, 'huge': 2 ** 70},
+    'flags': [True, False, None],
+    'control': 'tab\there\x7f',
+    'empty': {'list': [], 'dict': {}},
+}
+
+
+@pytest.mark.parametrize('options', [{}, {'sort_keys': True}, {'indent': 2, 'default': str}])
+def test_encoding_is_identical_with_both_backends(monkeypatch, options):
+    payload = dict(PAYLOAD, when=datetime(2026, 10, 19, 7, 30)) if 'default' in options else PAYLOAD
+    fast = json_codec.dumps(payload, **options)
+    monkeypatch.setattr(json_codec, 'orjson', None)
+    assert fast.encode('utf-8') == json_codec.dumps(payload, **options).encode('utf-8')
+    assert fast == json.dumps(payload, **options)
+
+
+def test_decoding_is_identical_with_both_backends(monkeypatch):
+    text = json.dumps(PAYLOAD) + ' '
+    fast = json_codec.loads(text)
+    monkeypatch.setattr(json_codec, 'orjson', None)
+    assert fast == json_codec.loads(text) == PAYLOAD
+    assert json_codec.loads('{"x": NaN}')['x'] != 0  # stdlib-only syntax still decodes
+
+
+def test_flask_provider_matches_default():
+    flask = pytest.importorskip('flask')
+    from flask.json.provider import DefaultJSONProvider
+
+    app = flask.Flask(__name__)
+    payload = dict(PAYLOAD, when=datetime(2026, 10, 19, 7, 30))
+    for compact, sort_keys in ((None, True), (False, False)):
+        app.json = json_codec.FastJSONProvider(app)
+        app.json.compact, app.json.sort_keys = compact, sort_keys
+        expected = DefaultJSONProvider(app)
+        expected.compact, expected.sort_keys = compact, sort_keys
+        with app.app_context():
+            assert app.json.response(payload).get_data() == expected.response(payload).get_data()
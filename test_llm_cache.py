@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM response cache.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from disk_cache import DiskLRUCache
+from llm_cache import LLMResponseCache, request_key
+
+
+def make_request(content, temperature=0.1):
+    return {
+        'model': 'gpt-4o',
+        'messages': [
+            {'role': 'system', 'content': 'You are an analyst.'},
+            {'role': 'user', 'content': content},
+        ],
+        'temperature': temperature,
+    }
+
+
+def test_equivalent_requests_share_a_key():
+    request = make_request('Led 12 boardings.')
+    reordered = {
+        'temperature': 0.1,
+        'messages': [
+            {'content': 'You are an analyst.', 'role': 'system', 'timestamp': '2025-01-01T00:00:00'},
+            {'content': 'Led 12 boardings.', 'role': 'user'},
+        ],
+        'model': 'gpt-4o',
+    }
+    assert request_key(request) == request_key(reordered)
+    assert request_key(request) != request_key(make_request('Led 13 boardings.'))
+    assert request_key(request) != request_key(make_request('Led 12 boardings.', temperature=0.3))
+
+
+def test_policy_and_refresh(tmp_path):
+    cache = LLMResponseCache(DiskLRUCache(str(tmp_path)), policies={'achievement analysis': 60})
+    request = make_request('Led 12 boardings.')
+    response = {'role': 'assistant', 'content': '{"achievements": []}'}
+
+    assert cache.get(request, 'achievement analysis') is None
+    cache.set(request, 'achievement analysis', response)
+    assert cache.get(request, 'achievement analysis') == response
+
+    # Refresh skips the lookup; the refreshed answer replaces the entry
+    assert cache.get(request, 'achievement analysis', refresh=True) is None
+    cache.set(request, 'achievement analysis', {'role': 'assistant', 'content': 'new'})
+    assert cache.get(request, 'achievement analysis')['content'] == 'new'
+
+    # Contexts without a policy are never stored
+    cache.set(request, 'chat', response)
+    assert cache.get(request, 'chat') is None
+
+    stats = cache.stats()
+    assert stats['contexts']['achievement analysis'] == {'hits': 2, 'misses': 1, 'refreshes': 1}
+    assert 'chat' not in stats['contexts']
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tests for per-call LLM telemetry.
+"""
+
+import json
+import multiprocessing
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from llm_telemetry import CallRecord, Histogram, LLMTelemetry
+
+
+def test_records_aggregate_per_call_site():
+    telemetry = LLMTelemetry()
+    call = telemetry.start('achievement analysis', 'o4-mini')
+    call.retried()
+    call.succeeded(SimpleNamespace(prompt_tokens=1800, completion_tokens=900,
+                                   completion_tokens_details=SimpleNamespace(reasoning_tokens=600)))
+    telemetry.start('achievement analysis', 'o4-mini').failed(TimeoutError('timed out'))
+    telemetry.record_cache_hit('achievement analysis', 'o4-mini')
+    telemetry.start('chat', 'o4-mini', streamed=True).succeeded({'prompt_tokens': 300, 'completion_tokens': 40})
+
+    stats = telemetry.stats()
+    analysis = stats['achievement analysis']
+    assert (analysis['calls'], analysis['cache_hits'], analysis['retries']) == (3, 1, 1)
+    assert analysis['errors'] == {'TimeoutError': 1}
+    assert analysis['tokens'] == {'prompt': 1800, 'completion': 900, 'reasoning': 600}
+    assert analysis['latency_ms']['count'] == 2  # cache hits are not API latency
+    assert analysis['prompt_tokens']['buckets']['le_2000'] == 1
+    assert stats['chat']['tokens'] == {'prompt': 300, 'completion': 40, 'reasoning': 0}
+
+
+def test_histogram_percentiles():
+    histogram = Histogram((100, 1000, 10000))
+    for value in [50] * 90 + [800] * 9 + [20000]:
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert (snapshot['p50'], snapshot['p95'], snapshot['p99']) == (100, 1000, 1000)
+    assert snapshot['buckets'] == {'le_100': 90, 'le_1000': 9, 'le_10000': 0, 'overflow': 1}
+    assert histogram.percentile(1.0) is None  # beyond the last bound
+
+
+def test_jsonl_log_rolls_over(tmp_path):
+    path = tmp_path / 'llm_calls.jsonl'
+    telemetry = LLMTelemetry(str(path), log_max_bytes=1000, log_backups=2)
+    for i in range(30):
+        telemetry.record(CallRecord(timestamp=i, context='chat', model='o4-mini', latency_ms=1200.0))
+
+    files = sorted(p.name for p in tmp_path.iterdir())
+    assert files == ['llm_calls.jsonl', 'llm_calls.jsonl.1', 'llm_calls.jsonl.2']
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert records[-1]['timestamp'] == 29 and records[-1]['context'] == 'chat'
+    assert all(path.with_name(name).stat().st_size <= 1000 for name in files)
+
+
+def _write_records(path, writer, count):
+    telemetry = LLMTelemetry(path, log_max_bytes=2000, log_backups=1000)
+    for i in range(count):
+        telemetry.record(CallRecord(timestamp=i, context=writer, model='o4-mini', latency_ms=1200.0))
+
+
+def test_two_writers_lose_no_lines_across_rollovers(tmp_path):
+    path = str(tmp_path / 'llm_calls.jsonl')
+    context = multiprocessing.get_context('fork')
+    writers = [context.Process(target=_write_records, args=(path, name, 1000)) for name in ('first', 'second')]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join(30)
+        assert writer.exitcode == 0
+
+    records = [json.loads(line) for name in tmp_path.iterdir() for line in name.read_text().splitlines()]
+    for name in ('first', 'second'):
+        assert sorted(r['timestamp'] for r in records if r['context'] == name) == list(range(1000))
+    # Each rollover moved a full log, not one another writer had just started
+    backups = [p.stat().st_size for p in tmp_path.iterdir() if p.name != 'llm_calls.jsonl']
+    assert all(1500 < size <= 2000 for size in backups)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Tests for the local stand-in of the chat completions API.
+"""
+
+import json
+import sys
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+import pytest
+
+from achievement_extraction import ACHIEVEMENT_FIELDS, build_analysis_prompt
+from mock_llm_server import MockLLMServer, prompt_hash
+
+
+@pytest.fixture
+def server():
+    server = MockLLMServer(think=0, token_delay=0, reply='Noted three rescues.').start()
+    yield server
+    server.stop()
+
+
+def post(server, payload):
+    request = urllib.request.Request(server.base_url + '/chat/completions', data=json.dumps(payload).encode(),
+                                     headers={'Content-Type': 'application/json'})
+    return urllib.request.urlopen(request, timeout=5)
+
+
+def test_completion(server):
+    with post(server, {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'hi'}]}) as response:
+        body = json.loads(response.read())
+    assert body['object'] == 'chat.completion'
+    assert body['choices'][0]['message'] == {'role': 'assistant', 'content': 'Noted three rescues.'}
+
+
+def test_streamed_completion(server):
+    payload = {'model': 'gpt-4o', 'stream': True, 'messages': [{'role': 'user', 'content': 'hi'}]}
+    with post(server, payload) as response:
+        assert response.headers['Content-Type'] == 'text/event-stream'
+        events = [line[len('data: '):] for line in response.read().decode().split('\n\n') if line]
+
+    assert events[-1] == '[DONE]'
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert all(chunk['object'] == 'chat.completion.chunk' for chunk in chunks)
+    assert ''.join(chunk['choices'][0]['delta'].get('content', '') for chunk in chunks) == 'Noted three rescues.'
+    assert chunks[-1]['choices'][0]['finish_reason'] == 'stop'
+
+
+def test_quota_returns_retry_after():
+    server = MockLLMServer(think=0, token_delay=0, rpm=2, quota_period=30).start()
+    try:
+        payload = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'hi'}]}
+        for _ in range(2):
+            post(server, payload).close()
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            post(server, payload)
+    finally:
+        server.stop()
+
+    assert excinfo.value.code == 429
+    assert 0 < int(excinfo.value.headers['Retry-After']) <= 30
+    assert json.loads(excinfo.value.read())['error']['code'] == 'rate_limit_exceeded'
+    assert (server.served, server.rate_limited) == (2, 1)
+
+
+def test_fixture_replay_and_synthesized_analysis(tmp_path):
+    replay = [{'role': 'user', 'content': 'Draft the citation.'}]
+    (tmp_path / f"{prompt_hash(replay)}.json").write_text(json.dumps({'content': 'Recorded citation.'}))
+    server = MockLLMServer(think=0, token_delay=0, fixtures=str(tmp_path)).start()
+    try:
+        with post(server, {'model': 'o4-mini', 'messages': replay}) as response:
+            assert json.loads(response.read())['choices'][0]['message']['content'] == 'Recorded citation.'
+
+        messages = [{'role': 'user', 'content': 'I led 6 people through 14 inspections.'},
+                    {'role': 'assistant', 'content': 'Great, tell me more.'}]
+        prompt, _ = build_analysis_prompt(messages, {'name': 'Jordan Smith', 'rank': 'BM2'})
+        with post(server, {'model': 'o4-mini', 'messages': [{'role': 'user', 'content': prompt}]}) as response:
+            analysis = json.loads(json.loads(response.read())['choices'][0]['message']['content'])
+    finally:
+        server.stop()
+
+    assert set(analysis) == set(ACHIEVEMENT_FIELDS)
+    assert analysis['achievements'] == ['I led 6 people through 14 inspections.']
+    assert analysis['quantifiable_metrics'] == analysis['leadership_details'] == analysis['achievements']
+    assert server.stats()['fixture'] == 1 and server.stats()['synthesized'] == 1
+
+
+def test_injected_faults():
+    server = MockLLMServer(think=0, token_delay=0, rate_limit_rate=1.0).start()
+    try:
+        with pytest.raises(urllib.error.HTTPError) as excinfo:
+            post(server, {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'hi'}]})
+        assert excinfo.value.code == 429 and excinfo.value.headers['Retry-After'] == '1'
+
+        server.rate_limit_rate, server.timeout_rate, server.hang = 0.0, 1.0, 0.3
+        with pytest.raises(Exception):  # the connection closes without a response
+            post(server, {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'hi'}]})
+    finally:
+        server.stop()
+    assert server.stats()['injected_rate_limits'] == 1 and server.stats()['injected_timeouts'] == 1
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for concurrent flow stages with timeouts and fallbacks.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+import pytest
+
+from orchestration import ERROR, OK, TIMEOUT, FlowRunner, Stage
+
+
+def test_stages_overlap_and_fall_back():
+    runner = FlowRunner(max_workers=4)
+
+    def slow_suggestions():
+        time.sleep(0.5)
+        return ['from the model']
+
+    def scoring():
+        time.sleep(0.1)
+        return {'leadership': 4}
+
+    def failing():
+        raise RuntimeError('boom')
+
+    start = time.perf_counter()
+    flow = runner.run('improve', [
+        Stage('suggestions', slow_suggestions, timeout=0.2, fallback=lambda: ['rule based']),
+        Stage('scoring', scoring),
+        Stage('explanation', failing, fallback=lambda: ''),
+    ])
+    assert time.perf_counter() - start < 0.4  # did not wait for the timed-out stage
+
+    assert flow.results == {'suggestions': ['rule based'], 'scoring': {'leadership': 4}, 'explanation': ''}
+    assert [t['status'] for t in flow.timings] == [TIMEOUT, OK, ERROR]
+    assert flow.degraded == ['suggestions', 'explanation']
+    suggestions, scoring_timing, _ = flow.timings
+    assert suggestions['end_ms'] is None
+    assert scoring_timing['start_ms'] < 50 and scoring_timing['end_ms'] >= 100  # ran alongside suggestions
+
+    stats = runner.stats()
+    assert stats['stages']['improve.suggestions']['timeouts'] == 1
+    assert stats['stages']['improve.suggestions']['avg_ms'] is None  # no timed-out run in the average
+    assert stats['stages']['improve.scoring']['avg_ms'] >= 100
+    assert stats['last_run']['improve']['stages'][1]['stage'] == 'scoring'
+
+
+def test_required_stage_failure_is_raised():
+    runner = FlowRunner(max_workers=2)
+
+    def failing():
+        raise ValueError('no achievements')
+
+    with pytest.raises(ValueError):
+        runner.run('recommend', [Stage('ok', lambda: 1), Stage('explanation', failing)])
+    assert runner.stats()['stages']['recommend.explanation']['errors'] == 1
+
+
+def test_stage_timeout_counts_from_when_it_starts():
+    runner = FlowRunner(max_workers=1)
+
+    def slow(value):
+        time.sleep(0.3)
+        return value
+
+    # The second stage waits 0.3s for the only thread, longer than its timeout
+    flow = runner.run('queued', [
+        Stage('first', lambda: slow('a')),
+        Stage('second', lambda: slow('b'), timeout=0.5, fallback=lambda: 'fallback'),
+    ])
+    assert flow.results == {'first': 'a', 'second': 'b'}
+    assert flow.degraded == []
+
+    # A stage that never gets a thread within its timeout is dropped
+    flow = runner.run('starved', [
+        Stage('first', lambda: slow('a')),
+        Stage('second', lambda: slow('b'), timeout=0.1, fallback=lambda: 'fallback'),
+    ])
+    assert flow.results == {'first': 'a', 'second': 'fallback'}
+    assert [t['status'] for t in flow.timings] == [OK, TIMEOUT]
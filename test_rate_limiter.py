@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared OpenAI rate limiter and adaptive concurrency limit.
+"""
+
+import asyncio
+import multiprocessing
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from rate_limiter import AdaptiveConcurrency, FileTokenBucket, retry_after_seconds
+
+
+def grab(path, results):
+    bucket = FileTokenBucket(path, requests_per_period=10, tokens_per_period=10000, period=3600)
+    results.put(sum(bucket.reserve(100) == 0 for _ in range(10)))
+
+
+def test_bucket_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'limits.json')
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=grab, args=(path, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sum(results.get() for _ in workers) == 10
+    bucket = FileTokenBucket(path, requests_per_period=10, tokens_per_period=10000, period=3600)
+    assert bucket.reserve(100) > 0
+
+
+def test_state_directory_is_created_on_first_use(tmp_path):
+    directory = tmp_path / 'cache'
+    bucket = FileTokenBucket(str(directory / 'limits.json'), requests_per_period=10,
+                             tokens_per_period=10000, period=60)
+    assert not directory.exists()
+    assert bucket.reserve(100) == 0
+    assert (directory / 'limits.json').exists()
+
+
+def test_token_budget_and_retry_after(tmp_path):
+    bucket = FileTokenBucket(str(tmp_path / 'limits.json'), requests_per_period=100,
+                             tokens_per_period=1000, period=60)
+    assert bucket.reserve(800) == 0
+    assert 10 < bucket.reserve(800) <= 40  # 600 tokens short at 1000/min
+
+    bucket.adjust(-800)  # the call used far fewer tokens than estimated
+    assert bucket.reserve(800) == 0
+
+    bucket.block_for(5)
+    assert 4 < bucket.reserve(1) <= 5
+
+    error = SimpleNamespace(response=SimpleNamespace(headers={'retry-after': '7'}))
+    assert retry_after_seconds(error) == 7
+    error.response.headers = {'retry-after-ms': '1500', 'retry-after': '2'}
+    assert retry_after_seconds(error) == 1.5
+    assert retry_after_seconds(ValueError('no response')) is None
+
+
+def test_adaptive_concurrency():
+    limiter = AdaptiveConcurrency(maximum=8, initial=4)
+
+    async def scenario():
+        for _ in range(4):
+            await limiter.acquire()
+        blocked = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not blocked.done()
+
+        limiter.release(latency=1.0)
+        await asyncio.sleep(0)
+        assert blocked.done()
+
+        for _ in range(4):
+            limiter.release(latency=1.0)
+
+    asyncio.run(scenario())
+    assert limiter.limit > 4  # additive increase
+
+    before = limiter.limit
+    limiter.in_flight = 1
+    limiter.release(throttled=True)
+    assert limiter.limit == before / 2  # multiplicative decrease
+
+    limiter.in_flight = 1
+    limit = limiter.limit
+    limiter.release(latency=10.0)  # far above the 1s baseline
+    assert limiter.limit == max(1, limit / 2)
+
+
+def test_adaptive_concurrency_keeps_a_baseline_per_kind_of_call():
+    limiter = AdaptiveConcurrency(maximum=8, initial=4)
+    limiter.in_flight = 3
+    limiter.release(latency=1.0, key='gpt-4o-mini:chat')
+    limiter.release(latency=30.0, key='o3:achievement analysis')
+    limit = limiter.limit
+
+    # A slow analysis is not slow next to earlier analyses, and sets no chat baseline
+    limiter.release(latency=35.0, key='o3:achievement analysis')
+    assert limiter.limit > limit
+    assert limiter.decreases == 0
+    assert limiter.stats()['baseline_latency'] == {'gpt-4o-mini:chat': 1.0, 'o3:achievement analysis': 30.5}
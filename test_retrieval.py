@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for passage chunking and BM25 retrieval over uploaded documents.
+"""
+
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from retrieval import DocumentIndex, chunk_text, estimate_tokens
+
+FILLER = "Stood watch as the officer of the deck during routine patrols in the district. " * 300
+NEEDLE = "Directed the rescue of 27 passengers from the sinking ferry Northern Star near Kodiak."
+
+
+def test_chunks_are_bounded_and_overlap():
+    chunks = chunk_text(FILLER, chunk_chars=500)
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    first_sentence_of_second = chunks[1].split('. ')[0]
+    assert chunks[0].endswith(first_sentence_of_second + '.')
+
+
+def test_finds_passages_past_the_old_20k_prefix():
+    text = FILLER + NEEDLE + " " + FILLER
+    assert text.index(NEEDLE) > 20000
+
+    index = DocumentIndex.from_json(DocumentIndex.build(text).to_json())
+    passages = index.search("How many passengers were rescued from the ferry?", top_k=3)
+    assert any(NEEDLE in passage for _, passage in passages)
+    assert [position for position, _ in passages] == sorted(position for position, _ in passages)
+
+
+def test_results_fit_the_token_budget():
+    index = DocumentIndex.build(FILLER + NEEDLE)
+    passages = index.search("patrols in the district", top_k=50, token_budget=600)
+    assert passages
+    assert sum(estimate_tokens(passage) for _, passage in passages) <= 600
+
+    # Nothing matches: fall back to the opening passages
+    assert index.search("summarize it", top_k=1)[0][0] == 0
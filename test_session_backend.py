@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Tests for the Redis-compatible session backend, run against the in-process
+stand-in server.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+os.environ.setdefault('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'cgaward-test-sessions'))
+
+import pytest
+
+import json_codec
+from mock_resp_server import MockRespServer
+from resp_client import RespClient, RespError
+from session_cache import SessionCache
+from session_compression import COMPRESSED_TAG, ValueCompressor
+from session_manager import FileSessionManager, RedisSessionManager
+
+
+@pytest.fixture
+def server():
+    server = MockRespServer().start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def manager(server):
+    return RedisSessionManager(server.url, max_age_hours=1, pool_size=4)
+
+
+def test_client_commands_and_pipeline(server):
+    client = RespClient.from_url(server.url, max_connections=2)
+    assert client.ping()
+    assert client.set('a', 'one')
+    assert client.get('a') == b'one'
+    assert client.mget('a', 'missing') == [b'one', None]
+
+    pipe = client.pipeline()
+    pipe.set('b', b'two', 'EX', 60).get('b').ttl('b').incr('counter')
+    assert pipe.execute() == ['OK', b'two', 60, 1]
+
+    with pytest.raises(RespError):
+        client.execute_command('NOPE')
+    # The connection stays usable after an error reply
+    assert client.delete('a', 'b') == 2
+
+
+def test_pool_is_bounded(server):
+    client = RespClient.from_url(server.url, max_connections=2, pool_timeout=0.1)
+    first = client.pool.acquire()
+    second = client.pool.acquire()
+    with pytest.raises(RespError):
+        client.pool.acquire()
+    client.pool.release(first)
+    client.pool.release(second)
+    assert client.ping()
+
+
+def test_session_round_trip(manager):
+    session_id = manager.create_session()
+    assert manager.get_session_data(session_id) == {}
+
+    assert manager.update_session_data(session_id, {'messages': [{'role': 'user', 'content': 'Led 25 people'}]})
+    assert manager.update_session_data(session_id, {'awardee_info': {'rank': 'BM2'}})
+
+    data = manager.get_session_data(session_id)
+    assert data['messages'][0]['content'] == 'Led 25 people'
+    assert data['awardee_info'] == {'rank': 'BM2'}
+    assert manager.get_session_size(session_id) > 0
+
+    assert manager.delete_session(session_id)
+    assert manager.get_session_data(session_id) is None
+    assert manager.get_session_data('never-created') is None
+
+
+def test_pipelined_multi_session_access(manager):
+    ids = [manager.create_session() for _ in range(5)]
+    assert manager.update_many_session_data({sid: {'index': i} for i, sid in enumerate(ids)})
+
+    results = manager.get_many_session_data(ids + ['unknown'])
+    assert [results[sid]['index'] for sid in ids] == list(range(5))
+    assert results['unknown'] is None
+
+
+def test_unserializable_update_returns_false(manager, tmp_path):
+    for store in (manager, FileSessionManager(str(tmp_path))):
+        session_id = store.create_session()
+        store.update_session_data(session_id, {'index': 1})
+        assert store.update_many_session_data({session_id: {'index': 2, 'bad': object()}}) is False
+        assert store.get_session_data(session_id) == {'index': 1}
+
+
+def test_mutate_session_retries_when_another_client_writes(server):
+    manager = RedisSessionManager(server.url, max_age_hours=1, pool_size=4, cache=SessionCache())
+    other = RedisSessionManager(server.url, max_age_hours=1, pool_size=4)
+    session_id = manager.create_session()
+    manager.update_session_data(session_id, {'messages': ['first']})
+    calls = []
+
+    def append(data):
+        calls.append(list(data['messages']))
+        if len(calls) == 1:
+            # Lands between this client's read and its EXEC
+            other.update_session_data(session_id, {'messages': data['messages'] + ['from chat']})
+        return {'messages': data['messages'] + ['from upload']}
+
+    assert manager.mutate_session(session_id, append) == {'messages': ['first', 'from chat', 'from upload']}
+    assert calls == [['first'], ['first', 'from chat']]
+    assert other.get_session_data(session_id)['messages'] == ['first', 'from chat', 'from upload']
+    assert manager.get_session_data(session_id)['messages'] == ['first', 'from chat', 'from upload']
+
+
+def test_session_keys_are_deleted(manager, tmp_path):
+    for store in (manager, FileSessionManager(str(tmp_path))):
+        session_id = store.create_session()
+        store.update_session_data(session_id, {'upload_job:a': {'status': 'completed'}, 'messages': []})
+        assert store.delete_session_keys(session_id, ['upload_job:a', 'missing'])
+        assert store.get_session_data(session_id) == {'messages': []}
+
+
+def test_ttl_expiry_replaces_cleanup(manager):
+    manager.ttl = 1
+    session_id = manager.create_session()
+    manager.update_session_data(session_id, {'k': 'v'})
+    assert manager.client.ttl(manager._get_session_key(session_id)) == 1
+
+    time.sleep(1.2)
+    assert manager.get_session_data(session_id) is None
+
+
+def test_cache_evicts_by_bytes():
+    cache = SessionCache(max_bytes=100)
+    cache.put('a', 1, {'data': {}}, 60)
+    cache.put('b', 1, {'data': {}}, 30)
+    cache.get('a', 1)  # 'a' becomes most recently used
+    cache.put('c', 1, {'data': {}}, 30)
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is not None
+    stats = cache.stats()
+    assert stats['bytes'] == 90
+    assert stats['evictions'] == 1
+
+
+def test_cached_payloads_are_copies():
+    cache = SessionCache()
+    cache.put('a', 1, {'messages': []}, 10)
+    cache.get('a', 1)['messages'].append('mutated')
+    assert cache.get('a', 1) == {'messages': []}
+
+
+def test_file_cache_sees_other_workers_writes(tmp_path):
+    worker_a = FileSessionManager(str(tmp_path), cache=SessionCache())
+    worker_b = FileSessionManager(str(tmp_path), cache=SessionCache())
+
+    session_id = worker_a.create_session()
+    worker_a.update_session_data(session_id, {'award': 'Achievement Medal'})
+    assert worker_a.get_session_data(session_id)['award'] == 'Achievement Medal'
+    assert worker_a.cache.stats()['hits'] >= 1
+
+    worker_b.update_session_data(session_id, {'award': 'Commendation Medal'})
+    assert worker_a.get_session_data(session_id)['award'] == 'Commendation Medal'
+    assert worker_a.cache.stats()['stale'] >= 1
+
+
+def test_redis_cache_uses_version_counter(server):
+    worker_a = RedisSessionManager(server.url, cache=SessionCache())
+    worker_b = RedisSessionManager(server.url, cache=SessionCache())
+
+    session_id = worker_a.create_session()
+    worker_a.update_session_data(session_id, {'messages': ['one']})
+    assert worker_a.get_session_data(session_id) == {'messages': ['one']}
+    assert worker_a.cache.stats()['hits'] == 1
+
+    worker_b.update_session_data(session_id, {'awardee_info': {'rank': 'LT'}})
+    assert worker_a.get_session_data(session_id) == {'messages': ['one'], 'awardee_info': {'rank': 'LT'}}
+    assert worker_a.cache.stats()['stale'] == 1
+
+
+def test_sweeper_expires_by_last_access_without_parsing(tmp_path):
+    (tmp_path / 'corrupt.json').write_text('{not json')
+    manager = FileSessionManager(str(tmp_path), max_age_hours=1, sweep_interval=3600)
+
+    stale, touched, fresh = (manager.create_session() for _ in range(3))
+    two_hours_ago = time.time() - 7200
+    for session_id in (stale, touched):
+        os.utime(manager._get_session_path(session_id), (two_hours_ago, two_hours_ago))
+    os.utime(tmp_path / 'corrupt.json', (two_hours_ago, two_hours_ago))
+
+    # A read records the access without rewriting the file
+    assert manager.get_session_data(touched) == {}
+
+    manager.cleanup_old_sessions()
+    assert manager.get_session_data(stale) is None
+    assert manager.get_session_data(touched) == {}
+    assert manager.get_session_data(fresh) == {}
+    assert not (tmp_path / 'corrupt.json').exists()
+
+
+def test_large_values_are_compressed_and_old_files_still_load(tmp_path):
+    manager = FileSessionManager(str(tmp_path), compressor=ValueCompressor('zlib', threshold=1024))
+    document_text = "Coordinated 14 search and rescue cases as operations petty officer. " * 400
+
+    session_id = manager.create_session()
+    manager.update_session_data(session_id, {'document_text': document_text, 'session_name': 'BM2 Smith'})
+    path = manager._get_session_path(session_id)
+
+    stored = json.loads(Path(path).read_text())
+    assert stored['data']['document_text'][COMPRESSED_TAG] == 'zlib'
+    assert stored['data']['session_name'] == 'BM2 Smith'
+    assert os.path.getsize(path) < len(document_text) / 4
+    assert manager.get_session_data(session_id)['document_text'] == document_text
+
+    # A session written before compression existed
+    legacy_id = 'legacy-session'
+    Path(manager._get_session_path(legacy_id)).write_text(json.dumps(
+        {'created_at': 0, 'last_accessed': time.time(), 'data': {'document_text': document_text}}))
+    assert manager.get_session_data(legacy_id)['document_text'] == document_text
+
+
+def test_redis_values_are_compressed_transparently(server):
+    plain = RedisSessionManager(server.url)
+    compressing = RedisSessionManager(server.url, compressor=ValueCompressor('zlib', threshold=1024))
+    messages = [{'role': 'user', 'content': 'Qualified 6 new coxswains during the patrol season.'}] * 100
+
+    session_id = plain.create_session()
+    plain.update_session_data(session_id, {'messages': messages[:1]})
+    compressing.update_session_data(session_id, {'recommendation': {'messages': messages}})
+
+    data = compressing.get_session_data(session_id)
+    assert data == {'messages': messages[:1], 'recommendation': {'messages': messages}}
+    assert compressing.get_session_size(session_id) < len(json.dumps(messages)) / 4
+
+
+def test_session_files_stay_readable_by_stdlib_json(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    payload = {'awardee_info': {'name': 'José Núñez', 'rank': 'MK1'}, 'scores': {'leadership': 8.5}, 'count': 3}
+
+    session_id = manager.create_session()
+    manager.update_session_data(session_id, payload)
+
+    with open(manager._get_session_path(session_id), encoding='utf-8') as f:
+        assert json.load(f)['data'] == payload
+    assert json_codec.loads(json.dumps(payload)) == payload
+
+
+def test_identical_documents_are_stored_once_and_collected(tmp_path):
+    manager = FileSessionManager(str(tmp_path), max_age_hours=1, sweep_interval=3600,
+                                 compressor=ValueCompressor('zlib', threshold=1024))
+    document_text = "Served as boarding officer for 42 fisheries boardings. " * 800
+
+    first, second = manager.create_session(), manager.create_session()
+    digest = manager.put_blob(first, document_text)
+    assert manager.put_blob(second, document_text) == digest
+    assert len(list((tmp_path / 'blobs').glob('*.blob'))) == 1
+    assert manager.blobs.refcount(digest) == 2
+    assert FileSessionManager(str(tmp_path)).get_blob(digest) == document_text
+
+    two_hours_ago = time.time() - 7200
+    os.utime(manager._get_session_path(first), (two_hours_ago, two_hours_ago))
+    manager.cleanup_old_sessions()
+    assert manager.blobs.refcount(digest) == 1
+    assert manager.blobs.get(digest) == document_text
+
+    manager.delete_session(second)
+    manager.cleanup_old_sessions()
+    assert manager.blobs.get(digest) is None
+    assert list((tmp_path / 'blobs').iterdir()) == []
+
+
+def test_redis_blobs_are_shared_and_expire(server):
+    manager = RedisSessionManager(server.url, max_age_hours=1, cache=SessionCache())
+    document_text = "Led a 12-person boat crew through 300 underway hours. " * 800
+
+    first, second = manager.create_session(), manager.create_session()
+    digest = manager.put_blob(first, document_text)
+    assert manager.put_blob(second, document_text) == digest
+    assert RedisSessionManager(server.url, max_age_hours=1).get_blob(digest) == document_text
+
+    client = RespClient.from_url(server.url)
+    assert client.execute_command('HLEN', manager.blob_prefix + digest + ':refs') == 2
+    assert 0 < client.ttl(manager.blob_prefix + digest) <= 7200
+    assert manager.get_blob('0' * 64) is None
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Stress test for concurrent session writes from threads and processes, the
+way gunicorn runs with several workers of several threads each.
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import zlib
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+os.environ.setdefault('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'cgaward-test-sessions'))
+
+from session_cache import SessionCache
+from session_manager import FileSessionManager, LOCK_STRIPES
+
+PROCESSES = 4
+THREADS = 8
+WRITES = 40
+
+
+def _hammer(session_dir, session_id, worker, errors):
+    manager = FileSessionManager(session_dir, cache=SessionCache())
+
+    def write(thread):
+        for i in range(WRITES):
+            if not manager.update_session_data(session_id, {f"w{worker}-t{thread}": i}):
+                errors.put(f"update failed in worker {worker}")
+            if manager.get_session_data(session_id) is None:
+                errors.put(f"torn read in worker {worker}")
+
+    threads = [threading.Thread(target=write, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def test_no_lost_updates_across_threads_and_processes(tmp_path):
+    session_dir = str(tmp_path)
+    manager = FileSessionManager(session_dir)
+    session_id = manager.create_session()
+
+    ctx = multiprocessing.get_context('fork')
+    errors = ctx.Queue()
+    procs = [ctx.Process(target=_hammer, args=(session_dir, session_id, w, errors)) for w in range(PROCESSES)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+
+    assert all(proc.exitcode == 0 for proc in procs)
+    assert errors.empty(), errors.get()
+
+    data = manager.get_session_data(session_id)
+    expected = {f"w{w}-t{t}": WRITES - 1 for w in range(PROCESSES) for t in range(THREADS)}
+    assert data == expected
+    # No temporary files left behind
+    assert sorted(os.listdir(session_dir)) == sorted(['.session.lock', os.path.basename(manager._get_session_path(session_id))])
+
+
+def test_unrelated_sessions_do_not_share_a_lock(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    first, second = manager.create_session(), manager.create_session()
+    while _stripe(manager, first) == _stripe(manager, second):
+        second = manager.create_session()
+
+    # Holding one session's lock must not block writes to another
+    with manager._locked(manager._get_session_path(first)):
+        done = threading.Event()
+        thread = threading.Thread(target=lambda: (manager.update_session_data(second, {'k': 1}), done.set()))
+        thread.start()
+        assert done.wait(timeout=5)
+        thread.join()
+
+
+def _stripe(manager, session_id):
+    return zlib.crc32(os.path.basename(manager._get_session_path(session_id)).encode()) % LOCK_STRIPES
+
+
+def test_concurrent_appends_are_all_kept(tmp_path):
+    manager = FileSessionManager(str(tmp_path), cache=SessionCache())
+    session_id = manager.create_session()
+
+    def append(thread):
+        for i in range(WRITES):
+            manager.mutate_session(session_id, lambda data: {
+                'messages': (data.get('messages') or []) + [f"t{thread}-{i}"]})
+
+    threads = [threading.Thread(target=append, args=(t,)) for t in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    messages = manager.get_session_data(session_id)['messages']
+    assert sorted(messages) == sorted(f"t{t}-{i}" for t in range(THREADS) for i in range(WRITES))
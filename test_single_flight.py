@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for coalescing identical in-flight calls within and across processes.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from single_flight import SingleFlight
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    def slow_call():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'content': 'citation'}
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        results = list(pool.map(lambda _: flight.do('llm:v1:abc', slow_call), range(5)))
+
+    assert results == [{'content': 'citation'}] * 5
+    assert len(calls) == 1
+    assert flight.stats()['coalesced'] == 4
+    # Finished keys run again
+    flight.do('llm:v1:abc', slow_call)
+    assert len(calls) == 2
+
+
+def test_lease_shares_result_between_processes(tmp_path):
+    # Two instances on one lease directory stand in for two workers
+    store = {}
+    first = SingleFlight(str(tmp_path), poll_interval=0.01)
+    second = SingleFlight(str(tmp_path), poll_interval=0.01)
+    calls = []
+
+    def call():
+        calls.append(1)
+        time.sleep(0.2)
+        store['key'] = 'result'
+        return 'result'
+
+    thread = threading.Thread(target=first.do, args=('key', call, lambda: store.get('key')))
+    thread.start()
+    time.sleep(0.05)
+    assert second.do('key', call, lambda: store.get('key')) == 'result'
+    thread.join()
+
+    assert len(calls) == 1
+    assert second.stats()['cross_process_coalesced'] == 1
+    assert os.listdir(tmp_path) == []
+
+
+def test_abandoned_lease_is_taken_over(tmp_path):
+    flight = SingleFlight(str(tmp_path), lease_ttl=1, poll_interval=0.01)
+    lease = flight._lease_path('key')
+    with open(lease, 'w') as f:
+        f.write('12345')
+    stale = time.time() - 60
+    os.utime(lease, (stale, stale))
+
+    assert flight.do('key', lambda: 'fresh', lambda: None) == 'fresh'
+    assert flight.stats()['lease_takeovers'] == 1
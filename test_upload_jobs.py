@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Tests for background upload jobs and their status in the session store.
+"""
+
+import hashlib
+import io
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+os.environ.setdefault('SESSION_FILE_DIR', os.path.join(tempfile.gettempdir(), 'cgaward-test-sessions'))
+
+from session_manager import FileSessionManager
+import upload_jobs
+from upload_jobs import UploadJobRunner, COMPLETED, FAILED, JOB_KEY_PREFIX
+
+
+class Upload:
+    def __init__(self, filename, content):
+        self.filename = filename
+        self.buffer = io.BytesIO(content)
+        self.sha256 = hashlib.sha256(content).hexdigest()
+
+
+class TextProcessor:
+    """Treats uploads as plain text so jobs can run without PDF libraries."""
+
+    def __init__(self):
+        self.extracted = []
+        self.analyses = 0
+
+    def extract_upload(self, upload, max_length=50000, progress=None):
+        self.extracted.append(upload.filename)
+        with upload.buffer:
+            text = upload.buffer.read().decode('utf-8')[:max_length]
+        if not text:
+            return False, "Could not extract text from file", None
+        for page in range(1, 4):
+            if progress:
+                progress(page, 3)
+        return True, f"Successfully extracted {len(text.split())} words from {upload.filename}", text
+
+    def analyze_document_for_achievements(self, text):
+        self.analyses += 1
+        return f"Achievements: {text[:20]}"
+
+    @staticmethod
+    def combine_documents(documents, per_document=None):
+        return "\n\n".join(f"=== Document: {name} ===\n{text[:per_document]}" for name, text in documents)
+
+    def analyze_documents(self, documents):
+        return self.analyze_document_for_achievements(self.combine_documents(documents))
+
+
+def _wait(runner, session_id, job_id):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        job = runner.get_status(session_id, job_id)
+        if job['status'] in (COMPLETED, FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+
+def test_job_writes_results_into_session(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    runner = UploadJobRunner(manager, processor=TextProcessor(), max_workers=2)
+    session_id = manager.create_session()
+    text = 'Rescued 12 mariners during Hurricane Ian as boat crew member.'
+
+    job = runner.submit(session_id, Upload('eval.pdf', text.encode()))
+    assert job['status'] == 'queued'
+
+    job = _wait(runner, session_id, job['job_id'])
+    assert job['status'] == COMPLETED
+    assert job['pages_extracted'] == 3 and job['total_pages'] == 3
+
+    # Any worker can read the results from the shared store
+    data = FileSessionManager(str(tmp_path)).get_session_data(session_id)
+    assert data['document_analysis'] == job['analysis']
+    assert manager.get_blob(data['document_ref']) == text
+    assert data['messages'][-1]['content'].startswith('Document content and analysis:')
+
+
+def test_failed_extraction_is_reported(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    runner = UploadJobRunner(manager, processor=TextProcessor())
+    session_id = manager.create_session()
+
+    job = _wait(runner, session_id, runner.submit(session_id, Upload('empty.docx', b''))['job_id'])
+    assert job['status'] == FAILED
+    assert job['error'] == 'Could not extract text from file'
+    assert 'document_analysis' not in manager.get_session_data(session_id)
+    assert runner.get_status(session_id, 'unknown') is None
+
+
+def test_batch_dedupes_and_analyzes_once(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    processor = TextProcessor()
+    runner = UploadJobRunner(manager, processor=processor)
+    session_id = manager.create_session()
+    evaluation = b'Qualified 8 boat crew members in one quarter.'
+    uploads = [Upload('eval.pdf', evaluation), Upload('sitrep.docx', b'Coordinated 3 SAR cases.'),
+               Upload('eval-copy.pdf', evaluation), Upload('blank.docx', b'')]
+
+    job = _wait(runner, session_id, runner.submit_batch(session_id, uploads)['job_id'])
+    assert job['status'] == COMPLETED
+    assert sorted(processor.extracted) == ['blank.docx', 'eval.pdf', 'sitrep.docx']
+    assert processor.analyses == 1
+
+    files = {entry['filename']: entry for entry in job['files']}
+    assert files['eval-copy.pdf']['status'] == 'duplicate'
+    assert files['eval-copy.pdf']['duplicate_of'] == 'eval.pdf'
+    assert files['blank.docx']['status'] == FAILED
+    assert files['sitrep.docx']['status'] == COMPLETED and files['sitrep.docx']['extract_ms'] >= 0
+
+    text = manager.get_blob(manager.get_session_data(session_id)['document_ref'])
+    assert '=== Document: eval.pdf ===' in text and 'Coordinated 3 SAR cases.' in text
+
+
+def test_chat_turns_saved_during_analysis_are_kept(tmp_path):
+    manager = FileSessionManager(str(tmp_path))
+    session_id = manager.create_session()
+    manager.update_session_data(session_id, {'messages': [{'role': 'user', 'content': 'Hello'}]})
+
+    class ChattyProcessor(TextProcessor):
+        def analyze_document_for_achievements(self, text):
+            # A chat request stores its turn while the analysis runs
+            messages = manager.get_session_data(session_id)['messages']
+            manager.update_session_data(session_id, {'messages': messages + [{'role': 'assistant', 'content': 'Hi'}]})
+            return super().analyze_document_for_achievements(text)
+
+    runner = UploadJobRunner(manager, processor=ChattyProcessor())
+    _wait(runner, session_id, runner.submit(session_id, Upload('eval.pdf', b'Led 6 boardings.'))['job_id'])
+
+    contents = [message['content'] for message in manager.get_session_data(session_id)['messages']]
+    assert contents[:2] == ['Hello', 'Hi']
+    assert contents[2].startswith('Document content and analysis:')
+
+
+def test_finished_jobs_are_removed(tmp_path, monkeypatch):
+    manager = FileSessionManager(str(tmp_path))
+    runner = UploadJobRunner(manager, processor=TextProcessor())
+    session_id = manager.create_session()
+
+    # Polled once after finishing
+    job_id = runner.submit(session_id, Upload('eval.pdf', b'Led 6 boardings.'))['job_id']
+    assert _wait(runner, session_id, job_id)['status'] == COMPLETED
+    assert runner.get_status(session_id, job_id) is None
+    assert JOB_KEY_PREFIX + job_id not in manager.get_session_data(session_id)
+
+    # Never polled: dropped by a later upload once expired
+    job_id = runner.submit(session_id, Upload('sitrep.pdf', b'Coordinated 3 SAR cases.'))['job_id']
+    deadline = time.time() + 5
+    while manager.get_session_data(session_id)[JOB_KEY_PREFIX + job_id]['status'] != COMPLETED:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    monkeypatch.setattr(upload_jobs, 'FINISHED_JOB_TTL', 0)
+    runner.submit(session_id, Upload('award.pdf', b'Qualified as coxswain.'))
+    assert JOB_KEY_PREFIX + job_id not in manager.get_session_data(session_id)
+
+
+def test_slow_analysis_is_not_cut_off_by_the_request_stage_timeout(tmp_path, monkeypatch):
+    monkeypatch.setattr('orchestration.LLM_STAGE_TIMEOUT', 0.05)
+
+    class SlowProcessor(TextProcessor):
+        def analyze_document_for_achievements(self, text):
+            time.sleep(0.3)
+            return super().analyze_document_for_achievements(text)
+
+    manager = FileSessionManager(str(tmp_path))
+    runner = UploadJobRunner(manager, processor=SlowProcessor(), max_workers=2)
+    session_id = manager.create_session()
+
+    job = runner.submit(session_id, Upload('eval.pdf', b'Qualified as coxswain in record time.'))
+    job = _wait(runner, session_id, job['job_id'])
+    assert job['status'] == COMPLETED
+    assert job['analysis'] == 'Achievements: Qualified as coxswai'